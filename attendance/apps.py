@@ -14,3 +14,6 @@ Các thuộc tính:
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
+
+    def ready(self):
+        from . import signals  # noqa: F401  Đăng ký các signal vô hiệu hóa cache
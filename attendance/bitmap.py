@@ -0,0 +1,385 @@
+import datetime
+from collections import namedtuple
+from django.conf import settings
+from django.db import transaction
+from main.models import Student
+from main.pagination import count_cache
+from main.signals import on_commit_and_now
+from .models import Attendance, AttendanceRoster, AttendanceSession
+
+
+Session = namedtuple('Session', ['date', 'members', 'present'])
+
+Headcount = namedtuple('Headcount', ['date', 'present', 'absent'])
+
+# Số lần thử lại khi một lần gửi điểm danh khác cập nhật cùng buổi (hoặc cùng roster) trước
+MAX_RETRIES = 5
+
+
+def enabled():
+    """Kiểm tra điểm danh có được lưu dưới dạng bitmap theo buổi hay không (ATTENDANCE_STORAGE = 'bitmap')."""
+    return getattr(settings, 'ATTENDANCE_STORAGE', 'rows') == 'bitmap'
+
+
+def decode(data):
+    """Chuyển bitmap đã lưu (bytes little-endian) thành số nguyên."""
+    return int.from_bytes(bytes(data or b''), 'little')
+
+
+def encode(bitmap):
+    """Chuyển số nguyên bitmap thành bytes little-endian để lưu."""
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, 'little')
+
+
+def popcount(bitmap):
+    """Số bit 1 của bitmap."""
+    return bin(bitmap).count('1')
+
+
+def bits(bitmap):
+    """Các vị trí bit 1 của bitmap, theo thứ tự tăng dần."""
+    return [index for index, bit in enumerate(reversed(bin(bitmap)[2:])) if bit == '1']
+
+
+def bitmap_of(student_ids, slots):
+    """Tạo bitmap từ các mã sinh viên theo ánh xạ student_id -> vị trí bit."""
+    bitmap = 0
+    for student_id in student_ids:
+        bitmap |= 1 << slots[student_id]
+    return bitmap
+
+
+class ConversionError(Exception):
+    """Dữ liệu điểm danh của khóa học không thể được chuyển đổi mà không mất thông tin."""
+
+
+class StaleWrite(Exception):
+    """Một lần ghi khác đã cập nhật roster hoặc buổi điểm danh trước; cần đọc lại và thử lại."""
+
+
+def roster(course_id):
+    """Danh sách mã sinh viên theo thứ tự bit của khóa học (rỗng nếu chưa có)."""
+    return AttendanceRoster.objects.filter(course_id = course_id).values_list('students', flat = True).first() or []
+
+
+def ensure_slots(course_id, student_ids):
+    """
+    Bảo đảm mỗi sinh viên có một vị trí bit trong roster của khóa học, nối thêm các sinh viên mới vào cuối.
+
+    Returns:
+        dict: Ánh xạ student_id -> vị trí bit của mọi sinh viên trong roster.
+
+    Raises:
+        StaleWrite: Nếu roster vừa được một lần ghi khác nối thêm.
+    """
+    current, _ = AttendanceRoster.objects.get_or_create(course_id = course_id)
+    slots = {student_id: index for index, student_id in enumerate(current.students)}
+    new = [student_id for student_id in dict.fromkeys(student_ids) if student_id not in slots]
+    if new:
+        students = current.students + new
+        # So sánh và cập nhật: chỉ ghi nếu roster chưa bị thay đổi kể từ lúc đọc
+        if not AttendanceRoster.objects.filter(course_id = course_id, size = current.size).update(students = students, size = len(students)):
+            raise StaleWrite('Roster of course %s changed' % course_id)
+        slots.update((student_id, index) for index, student_id in enumerate(new, len(current.students)))
+    return slots
+
+
+def _retrying(func):
+    # Đọc lại và thử lại toàn bộ transaction khi gặp xung đột ghi
+    for attempt in range(MAX_RETRIES):
+        try:
+            with transaction.atomic():
+                return func()
+        except StaleWrite:
+            if attempt == MAX_RETRIES - 1:
+                raise
+
+
+def create_session(course, date, delta):
+    """
+    Tạo buổi điểm danh (mọi sinh viên đã đăng ký đều vắng mặt) dưới dạng một dòng bitmap.
+
+    Args:
+        course (Course): Khóa học.
+        date (str | date): Ngày điểm danh.
+        delta (dict): Nhận phần chênh lệch student_id -> (có mặt, vắng mặt) cho tổng hợp điểm danh.
+
+    Returns:
+        int: Số sinh viên của buổi, None nếu buổi điểm danh của ngày này đã tồn tại.
+    """
+    def create():
+        if AttendanceSession.objects.filter(course = course, date = date).exists():
+            return None
+        student_ids = list(Student.objects.filter(course = course).values_list('student_id', flat = True))
+        slots = ensure_slots(course.pk, student_ids)
+        AttendanceSession.objects.create(course = course, date = date, members = encode(bitmap_of(student_ids, slots)), present = b'')
+        on_commit_and_now(lambda: count_cache.invalidate('roster'))
+        return student_ids
+
+    student_ids = _retrying(create)
+    if student_ids is None:
+        return None
+    delta.update((student_id, (0, 1)) for student_id in student_ids)
+    return len(student_ids)
+
+
+def submit_session(course, date, student_ids, present_ids, delta):
+    """
+    Cập nhật trạng thái điểm danh của các sinh viên trong một buổi bằng các phép toán bit trên một dòng.
+
+    Các sinh viên đã đăng ký nhưng chưa có trong buổi được thêm vào members.
+
+    Returns:
+        tuple: (số sinh viên thay đổi trạng thái, số sinh viên được thêm vào buổi, số sinh viên không thay đổi).
+
+    Raises:
+        Attendance.DoesNotExist: Nếu buổi điểm danh của ngày chưa được tạo.
+    """
+    def submit():
+        session = AttendanceSession.objects.filter(course = course, date = date).only('id', 'members', 'present', 'version').first()
+        if session is None:
+            raise Attendance.DoesNotExist('No attendance record for %s on %s' % (course.pk, date))
+        slots = {student_id: index for index, student_id in enumerate(roster(course.pk))}
+        members, present = decode(session.members), decode(session.present)
+
+        known = {student_id for student_id in student_ids if student_id in slots and members >> slots[student_id] & 1}
+        missing = student_ids - known
+        added = []
+        if missing:
+            added = list(Student.objects.filter(course = course, student_id__in = missing).values_list('student_id', flat = True))
+            slots = ensure_slots(course.pk, added)
+        submitted = bitmap_of(known, slots) | bitmap_of(added, slots)
+        wanted = bitmap_of(present_ids & (known | set(added)), slots)
+        # Các bit có mặt của sinh viên đã gửi được thay bằng trạng thái mới, các bit khác giữ nguyên
+        new_present = (present & ~submitted) | wanted
+        changed = (present ^ new_present) & bitmap_of(known, slots)
+
+        if changed or added:
+            if not AttendanceSession.objects.filter(pk = session.pk, version = session.version).update(
+                    members = encode(members | submitted), present = encode(new_present), version = session.version + 1,
+                    updated_at = datetime.datetime.now()):
+                raise StaleWrite('Attendance session %s changed' % session.pk)
+        if added:
+            on_commit_and_now(lambda: count_cache.invalidate('roster'))
+
+        changes = {}
+        for student_id in known:
+            if changed >> slots[student_id] & 1:
+                changes[student_id] = (1, -1) if new_present >> slots[student_id] & 1 else (-1, 1)
+        for student_id in added:
+            changes[student_id] = (1, 0) if student_id in present_ids else (0, 1)
+        return changes, len(known), len(added)
+
+    changes, known, added = _retrying(submit)
+    delta.update(changes)
+    updated = len(changes) - added
+    return updated, added, known - updated
+
+
+def load_sessions(course_id, start = None, end = None):
+    """
+    Tải các buổi điểm danh của khóa học (tùy chọn trong khoảng ngày [start, end]) bằng một truy vấn.
+
+    Returns:
+        list[Session]: Các buổi theo thứ tự ngày, với members và present đã giải mã thành số nguyên.
+    """
+    sessions = AttendanceSession.objects.filter(course_id = course_id)
+    if start is not None:
+        sessions = sessions.filter(date__gte = start)
+    if end is not None:
+        sessions = sessions.filter(date__lte = end)
+    return [Session(date, decode(members), decode(present))
+            for date, members, present in sessions.order_by('date').values_list('date', 'members', 'present')]
+
+
+def _bit_sliced_counts(bitmaps, size):
+    # Cộng các bitmap theo từng vị trí bằng bộ cộng bit-sliced: planes[k] chứa bit thứ k của bộ đếm mọi vị trí
+    planes = []
+    for carry in bitmaps:
+        for k in range(len(planes)):
+            if not carry:
+                break
+            planes[k], carry = planes[k] ^ carry, planes[k] & carry
+        if carry:
+            planes.append(carry)
+    counts = [0] * size
+    for k, plane in enumerate(planes):
+        for index in bits(plane):
+            counts[index] += 1 << k
+    return counts
+
+
+def student_totals(course_id, start = None, end = None):
+    """
+    Tổng số buổi có mặt và vắng mặt của từng sinh viên trong khóa học.
+
+    Returns:
+        dict: Ánh xạ student_id -> (có mặt, vắng mặt), chỉ gồm các sinh viên có ít nhất một buổi.
+    """
+    sessions = load_sessions(course_id, start, end)
+    if not sessions:
+        return {}
+    students = roster(course_id)
+    present = _bit_sliced_counts([session.present for session in sessions], len(students))
+    members = _bit_sliced_counts([session.members for session in sessions], len(students))
+    return {student_id: (present[index], members[index] - present[index])
+            for index, student_id in enumerate(students) if members[index]}
+
+
+def headcounts(course_id, start = None, end = None):
+    """Số sinh viên có mặt và vắng mặt của từng buổi điểm danh, theo thứ tự ngày."""
+    return [Headcount(session.date, popcount(session.present), popcount(session.members & ~session.present))
+            for session in load_sessions(course_id, start, end)]
+
+
+def present_students(course_id, start = None, end = None, every = False):
+    """
+    Các sinh viên có mặt trong khoảng ngày.
+
+    Args:
+        every (bool): True để chỉ lấy các sinh viên có mặt ở mọi buổi mà họ có trong danh sách (AND),
+            False để lấy các sinh viên có mặt ít nhất một buổi (OR).
+
+    Returns:
+        list: Mã các sinh viên, theo thứ tự bit của roster.
+    """
+    sessions = load_sessions(course_id, start, end)
+    if not sessions:
+        return []
+    result = 0
+    members = 0
+    absent = 0
+    for session in sessions:
+        result |= session.present
+        members |= session.members
+        absent |= session.members & ~session.present
+    if every:
+        result = members & ~absent
+    students = roster(course_id)
+    return [students[index] for index in bits(result)]
+
+
+def session_statuses(course_id, date):
+    """
+    Trạng thái điểm danh của từng sinh viên trong một buổi.
+
+    Returns:
+        dict: Ánh xạ student_id -> True (có mặt) / False (vắng mặt); rỗng nếu buổi chưa được tạo.
+    """
+    session = AttendanceSession.objects.filter(course_id = course_id, date = date).values_list('members', 'present').first()
+    if session is None:
+        return {}
+    members, present = decode(session[0]), decode(session[1])
+    students = roster(course_id)
+    return {students[index]: bool(present >> index & 1) for index in bits(members)}
+
+
+def session_records(course_id, dates = None):
+    """
+    Giải mã các buổi điểm danh bitmap của khóa học thành các bộ (student_id, date, status), như các bản ghi Attendance.
+
+    Args:
+        dates (iterable, optional): Chỉ lấy các buổi của những ngày này.
+
+    Returns:
+        set: Các bộ (student_id, date, status).
+    """
+    sessions = AttendanceSession.objects.filter(course_id = course_id)
+    if dates is not None:
+        sessions = sessions.filter(date__in = list(dates))
+    students = roster(course_id)
+    records = set()
+    for date, members, present in sessions.values_list('date', 'members', 'present'):
+        present = decode(present)
+        records.update((students[index], date, bool(present >> index & 1)) for index in bits(decode(members)))
+    return records
+
+
+def row_records(course_id, dates = None):
+    """Các bản ghi Attendance của khóa học dưới dạng danh sách bộ (student_id, date, status)."""
+    rows = Attendance.objects.filter(course_id = course_id)
+    if dates is not None:
+        rows = rows.filter(date__in = list(dates))
+    return list(rows.order_by('date', 'student_id').values_list('student_id', 'date', 'status'))
+
+
+def rows_to_sessions(course_id):
+    """
+    Chuyển các bản ghi Attendance của khóa học thành các dòng AttendanceSession (không xóa bản ghi gốc).
+
+    Returns:
+        tuple: (số bản ghi đã chuyển, số buổi đã tạo).
+
+    Notes:
+        - Việc ghi chạy qua _retrying: nếu roster vừa được một lần điểm danh khác nối thêm (StaleWrite),
+          toàn bộ việc chuyển của khóa học được đọc lại và thử lại.
+
+    Raises:
+        StaleWrite: Nếu roster vẫn bị thay đổi sau MAX_RETRIES lần thử.
+        ConversionError: Nếu có hai bản ghi cho cùng sinh viên và ngày, nếu buổi bitmap của một ngày đã tồn tại,
+            hoặc nếu dữ liệu giải mã lại không khớp với bản ghi gốc.
+    """
+    def convert():
+        rows = row_records(course_id)
+        seen = set()
+        for student_id, date, status in rows:
+            if (student_id, date) in seen:
+                raise ConversionError('Duplicate attendance records for student %s on %s' % (student_id, date))
+            seen.add((student_id, date))
+        dates = {date for student_id, date, status in rows}
+        if AttendanceSession.objects.filter(course_id = course_id, date__in = list(dates)).exists():
+            raise ConversionError('Bitmap sessions already exist for some of the dates')
+
+        slots = ensure_slots(course_id, sorted({student_id for student_id, date, status in rows}))
+        sessions = {}
+        for student_id, date, status in rows:
+            members, present = sessions.get(date, (0, 0))
+            bit = 1 << slots[student_id]
+            sessions[date] = (members | bit, present | bit if status else present)
+        AttendanceSession.objects.bulk_create([
+            AttendanceSession(course_id = course_id, date = date, members = encode(members), present = encode(present))
+            for date, (members, present) in sessions.items()])
+
+        if session_records(course_id, dates) != set(rows):
+            raise ConversionError('Decoded sessions do not match the attendance records')
+        return len(rows), len(sessions)
+
+    return _retrying(convert)
+
+
+def sessions_to_rows(course_id, batch_size = 1000):
+    """
+    Chuyển các buổi điểm danh bitmap của khóa học thành bản ghi Attendance (không xóa buổi gốc).
+
+    Returns:
+        tuple: (số bản ghi đã tạo, số buổi đã chuyển).
+
+    Raises:
+        ConversionError: Nếu bản ghi Attendance của một ngày đã tồn tại, nếu một sinh viên trong bitmap không còn tồn tại,
+            hoặc nếu bản ghi tạo ra không khớp với dữ liệu bitmap.
+    """
+    records = session_records(course_id)
+    dates = {date for student_id, date, status in records}
+    if Attendance.objects.filter(course_id = course_id, date__in = list(dates)).exists():
+        raise ConversionError('Attendance records already exist for some of the dates')
+    student_ids = {student_id for student_id, date, status in records}
+    existing = set(Student.objects.filter(student_id__in = list(student_ids)).values_list('student_id', flat = True))
+    if student_ids - existing:
+        raise ConversionError('Sessions reference deleted students: %s' % sorted(student_ids - existing)[:10])
+
+    Attendance.objects.bulk_create([
+        Attendance(student_id = student_id, course_id = course_id, date = date, status = status)
+        for student_id, date, status in sorted(records, key = lambda record: (record[1], record[0]))], batch_size = batch_size)
+
+    if set(row_records(course_id, dates)) != records:
+        raise ConversionError('Created attendance records do not match the bitmap sessions')
+    return len(records), len(dates)
+
+
+class SessionRecord:
+    """Một dòng của buổi điểm danh bitmap, có các thuộc tính của Attendance mà danh sách điểm danh sử dụng."""
+
+    def __init__(self, student, status):
+        self.student = student
+        self.student_id = student.student_id
+        self.status = status
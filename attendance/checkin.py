@@ -0,0 +1,271 @@
+import hashlib
+import hmac
+import logging
+import secrets
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+from main.course_cache import course_cache
+from main.models import Course
+from .models import Attendance
+from .services import submit_records
+
+
+logger = logging.getLogger(__name__)
+
+
+class CheckinWindow:
+    """
+    Một lượt điểm danh tự check-in đang mở của khóa học.
+
+    Thuộc tính:
+        - course_id, date: Khóa học và ngày của buổi điểm danh.
+        - closes_at: Thời điểm (time.time()) lượt check-in kết thúc.
+        - checked_in: Mã các sinh viên đã check-in (để bỏ qua các lần gửi lặp lại).
+        - failures: Số lần nhập sai mã của từng sinh viên trong lượt check-in.
+    """
+
+    def __init__(self, course_id, date, closes_at):
+        self.course_id = course_id
+        self.date = date
+        self.closes_at = closes_at
+        self.checked_in = set()
+        self.failures = {}
+        # Khóa bí mật ngẫu nhiên của lượt check-in, dùng để sinh mã xoay vòng
+        self._key = secrets.token_bytes(16)
+
+    def code(self, period):
+        """Mã check-in 6 chữ số của một chu kỳ."""
+        digest = hmac.new(self._key, str(period).encode(), hashlib.sha256).digest()
+        return '%06d' % (int.from_bytes(digest[:4], 'big') % 1000000)
+
+
+class CheckinRegistry:
+    """
+    Các lượt check-in đang mở, lưu trong bộ nhớ tiến trình và khóa theo mã khóa học.
+
+    Mã check-in đổi sau mỗi ATTENDANCE_CHECKIN_CODE_PERIOD giây; mã của chu kỳ trước vẫn được chấp nhận
+    để sinh viên nhập mã ngay trước khi đổi không bị từ chối. Việc kiểm tra mã không cần truy vấn cơ sở dữ liệu.
+
+    Notes:
+        - Mỗi sinh viên chỉ được nhập sai mã ATTENDANCE_CHECKIN_MAX_FAILURES lần trong một lượt check-in; sau đó mọi lần gửi
+          đều bị từ chối, để không thể dò mã 6 chữ số trong thời gian lượt check-in mở.
+        - Lượt check-in chỉ tồn tại trong tiến trình đã mở nó, giống các cache khác của ứng dụng;
+          khi chạy nhiều tiến trình cần định tuyến các request của một khóa học về cùng một tiến trình.
+    """
+
+    def __init__(self, period = None, duration = None, max_failures = None):
+        self.period = period if period is not None else getattr(settings, 'ATTENDANCE_CHECKIN_CODE_PERIOD', 30)
+        self.duration = duration if duration is not None else getattr(settings, 'ATTENDANCE_CHECKIN_DURATION', 600)
+        self.max_failures = max_failures if max_failures is not None else getattr(settings, 'ATTENDANCE_CHECKIN_MAX_FAILURES', 5)
+        self._lock = threading.Lock()
+        self._windows = {}
+
+    def open(self, course_id, date, duration = None):
+        """Mở (hoặc mở lại) lượt check-in của khóa học cho một ngày, trong duration giây."""
+        window = CheckinWindow(int(course_id), date, time.time() + (duration if duration is not None else self.duration))
+        with self._lock:
+            self._windows[window.course_id] = window
+        return window
+
+    def close(self, course_id):
+        """Đóng lượt check-in của khóa học."""
+        with self._lock:
+            self._windows.pop(int(course_id), None)
+
+    def get(self, course_id):
+        """Lượt check-in đang mở của khóa học, None nếu chưa mở hoặc đã hết hạn."""
+        with self._lock:
+            window = self._windows.get(int(course_id))
+            if window is not None and window.closes_at <= time.time():
+                del self._windows[window.course_id]
+                window = None
+        return window
+
+    def attempt(self, window, student_id, valid):
+        """
+        Ghi nhận một lần gửi mã của sinh viên vào lượt check-in.
+
+        Args:
+            valid (bool): Mã gửi lên có đúng hay không (kết quả của verify).
+
+        Returns:
+            str: 'limited' nếu sinh viên đã nhập sai mã max_failures lần, 'invalid' nếu mã sai (lần sai được tính),
+            'duplicate' nếu sinh viên đã check-in trước đó, 'queued' nếu sinh viên vừa được ghi nhận đã check-in.
+
+        Notes:
+            - Việc kiểm tra giới hạn, tăng bộ đếm lần sai và ghi nhận check-in nằm trong cùng một lần giữ khóa,
+              nên các request song song của cùng sinh viên không vượt được giới hạn.
+        """
+        with self._lock:
+            failures = window.failures.get(student_id, 0)
+            if failures >= self.max_failures:
+                return 'limited'
+            if not valid:
+                window.failures[student_id] = failures + 1
+                return 'invalid'
+            if student_id in window.checked_in:
+                return 'duplicate'
+            window.checked_in.add(student_id)
+            return 'queued'
+
+    def current_code(self, window, now = None):
+        """
+        Mã check-in hiện tại của lượt check-in.
+
+        Returns:
+            tuple: (mã, số giây còn lại trước khi mã đổi).
+        """
+        now = time.time() if now is None else now
+        period = int(now // self.period)
+        return window.code(period), int((period + 1) * self.period - now) + 1
+
+    def verify(self, course_id, code, now = None):
+        """
+        Kiểm tra mã check-in của khóa học.
+
+        Returns:
+            tuple: (lượt check-in, mã có hợp lệ hay không); lượt check-in là None nếu khóa học không có lượt nào đang mở.
+        """
+        window = self.get(course_id)
+        if window is None:
+            return None, False
+        now = time.time() if now is None else now
+        period = int(now // self.period)
+        code = str(code or '').strip()
+        return window, any(hmac.compare_digest(window.code(candidate), code) for candidate in (period, period - 1))
+
+
+class CheckinBuffer:
+    """
+    Bộ đệm gộp các lần check-in và ghi theo lô.
+
+    Mỗi lần check-in chỉ thêm mã sinh viên vào bộ đệm; sau ATTENDANCE_CHECKIN_FLUSH_INTERVAL giây (hoặc ngay khi có
+    ATTENDANCE_CHECKIN_FLUSH_SIZE sinh viên chờ ghi), một luồng nền ghi mọi sinh viên của mỗi buổi bằng submit_records:
+    một truy vấn đọc, một lệnh bulk_update và một lệnh bulk_create cho các bản ghi còn thiếu.
+
+    Notes:
+        - Request check-in không bao giờ ghi cơ sở dữ liệu, nên thời gian phản hồi không phụ thuộc số sinh viên đến cùng lúc.
+        - Các lần ghi chạy tuần tự (một khóa ghi); nếu ghi lỗi, sinh viên được trả lại bộ đệm để lần ghi sau thử lại.
+    """
+
+    def __init__(self, flush_size = None, flush_interval = None):
+        self.flush_size = flush_size if flush_size is not None else getattr(settings, 'ATTENDANCE_CHECKIN_FLUSH_SIZE', 200)
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(settings, 'ATTENDANCE_CHECKIN_FLUSH_INTERVAL', 0.3)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._size = 0
+        self._timer = None
+        self._immediate = False
+        self.checkins = 0
+        self.rows_written = 0
+        self.flushes = 0
+
+    def add(self, course_id, date, student_id):
+        """Thêm một lần check-in vào bộ đệm."""
+        with self._lock:
+            students = self._pending.setdefault((course_id, date), set())
+            if student_id not in students:
+                students.add(student_id)
+                self._size += 1
+            self.checkins += 1
+            if self._size >= self.flush_size and not self._immediate:
+                # Đủ lô: ghi ngay trong luồng nền thay vì chờ hết thời gian
+                self._schedule(0)
+                self._immediate = True
+            elif self._timer is None:
+                self._schedule(self.flush_interval)
+
+    def _schedule(self, delay):
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(delay, self._flush_in_background)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def pending(self):
+        """Số sinh viên đang chờ ghi."""
+        with self._lock:
+            return self._size
+
+    def flush(self):
+        """
+        Ghi mọi lần check-in đang chờ.
+
+        Returns:
+            int: Số sinh viên đã được đánh dấu có mặt.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending, self._size = self._pending, {}, 0
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                self._immediate = False
+            if not pending:
+                return 0
+
+            written = 0
+            failed = {}
+            for (course_id, date), students in pending.items():
+                try:
+                    submit_records(course_cache.get(course_id), date, students, students)
+                except (Course.DoesNotExist, Attendance.DoesNotExist):
+                    # Khóa học hoặc buổi điểm danh đã bị xóa: không thể ghi, bỏ các lần check-in này
+                    logger.warning('attendance check-in dropped %d student(s) for course %s on %s', len(students), course_id, date)
+                    continue
+                except Exception:
+                    logger.exception('attendance check-in flush failed for course %s on %s', course_id, date)
+                    failed[(course_id, date)] = students
+                    continue
+                written += len(students)
+
+            with self._lock:
+                for key, students in failed.items():
+                    merged = self._pending.setdefault(key, set())
+                    self._size += len(students - merged)
+                    merged |= students
+                if failed and self._timer is None:
+                    self._schedule(self.flush_interval)
+                self.rows_written += written
+                self.flushes += 1
+            logger.info('attendance check-in flush sessions=%d students=%d failed=%d', len(pending), written, len(failed))
+            return written
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('attendance check-in flush failed')
+        finally:
+            # Luồng của Timer có kết nối cơ sở dữ liệu riêng, cần đóng sau khi dùng
+            connection.close()
+
+    def stats(self):
+        """Các bộ đếm của bộ đệm: checkins, rows_written, flushes và pending."""
+        with self._lock:
+            return {'checkins': self.checkins, 'rows_written': self.rows_written, 'flushes': self.flushes, 'pending': self._size}
+
+
+checkin_windows = CheckinRegistry()
+
+checkin_buffer = CheckinBuffer()
+
+
+def check_in(course_id, student_id, code):
+    """
+    Check-in một sinh viên vào lượt check-in đang mở của khóa học.
+
+    Returns:
+        str: 'closed' nếu khóa học không có lượt check-in nào đang mở, 'limited' nếu sinh viên đã nhập sai mã quá số lần
+        cho phép, 'invalid' nếu mã sai, 'duplicate' nếu sinh viên đã check-in, 'queued' nếu lần check-in đã được đưa vào bộ đệm.
+    """
+    window, valid = checkin_windows.verify(course_id, code)
+    if window is None:
+        return 'closed'
+    result = checkin_windows.attempt(window, student_id, valid)
+    if result == 'queued':
+        checkin_buffer.add(window.course_id, window.date, student_id)
+    return result
@@ -0,0 +1,78 @@
+import datetime
+import time
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test.utils import CaptureQueriesContext
+from main.models import Course, Department, Student
+from attendance.models import Attendance
+from attendance.services import create_records, submit_records
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị đo thời gian và số câu lệnh SQL khi tạo và gửi điểm danh cho một lớp lớn,
+    so sánh cách ghi từng dòng (trước đây) với bulk_create/bulk_update.
+
+    Dữ liệu thử (bộ môn, khóa học, sinh viên) được tạo trong một transaction và được hủy sau khi đo.
+
+    Cách dùng:
+        python manage.py benchmark_attendance                 # Lớp 500 sinh viên
+        python manage.py benchmark_attendance --students 2000
+    """
+
+    help = 'Benchmark per-row versus bulk attendance creation and submission on a throwaway course.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=500, help='Number of enrolled students.')
+
+    def handle(self, *args, **options):
+        size = options['students']
+        with transaction.atomic():
+            course, students = self.fixture(size)
+            per_row_date, bulk_date = datetime.date(2000, 1, 1), datetime.date(2000, 1, 2)
+            # Một nửa số sinh viên có mặt
+            present = {student.student_id for student in students[::2]}
+
+            self.report('create (per row)', lambda: self.create_per_row(course, students, per_row_date))
+            self.report('create (bulk)', lambda: create_records(course, bulk_date))
+            self.report('submit (per row)', lambda: self.submit_per_row(course, students, per_row_date, present))
+            self.report('submit (bulk)', lambda: submit_records(course, bulk_date, [student.student_id for student in students], present))
+
+            transaction.set_rollback(True)
+
+    def fixture(self, size):
+        department = Department.objects.create(department_id = self.next_id(Department, 'department_id'), name = 'Benchmark')
+        code = self.next_id(Course, 'code')
+        course = Course.objects.create(code = code, name = 'Benchmark', department = department,
+                                       studentKey = self.next_id(Course, 'studentKey'),
+                                       facultyKey = self.next_id(Course, 'facultyKey'))
+        first = self.next_id(Student, 'student_id')
+        students = Student.objects.bulk_create([
+            Student(student_id = first + i, name = 'Student %d' % i, password = 'benchmark', department = department)
+            for i in range(size)])
+        Student.course.through.objects.bulk_create([
+            Student.course.through(student_id = student.student_id, course_id = course.code) for student in students])
+        return course, students
+
+    def next_id(self, model, field):
+        return (model.objects.aggregate(last = Max(field))['last'] or 0) + 1
+
+    def create_per_row(self, course, students, date):
+        # Cách làm trước đây: một lệnh INSERT cho mỗi sinh viên
+        for student in Student.objects.filter(course = course):
+            Attendance(student = student, course = course, date = date, status = False).save()
+
+    def submit_per_row(self, course, students, date, present):
+        # Cách làm trước đây: một lệnh SELECT và một lệnh UPDATE cho mỗi sinh viên
+        for student in Student.objects.filter(course = course):
+            attendance = Attendance.objects.get(student = student, course = course, date = date)
+            attendance.status = student.student_id in present
+            attendance.save()
+
+    def report(self, label, func):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - started
+        self.stdout.write('%-18s %6d queries %9.1f ms' % (label, len(queries), elapsed * 1000))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from main.pagination import count_cache
+from attendance import bitmap
+from attendance.models import Attendance, AttendanceSession
+from attendance.summary import attendance_summaries
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị chuyển dữ liệu điểm danh giữa hai cách lưu: bản ghi Attendance (rows) và bitmap theo buổi (bitmap).
+
+    Mỗi khóa học được chuyển trong một transaction; dữ liệu đích được giải mã lại và so sánh với dữ liệu gốc
+    (sinh viên, ngày, trạng thái), khóa học bị hủy chuyển đổi nếu không khớp. Dữ liệu gốc chỉ bị xóa khi có --delete-source.
+
+    Cách dùng:
+        python manage.py convert_attendance_storage --to bitmap                  # Chuyển mọi khóa học sang bitmap
+        python manage.py convert_attendance_storage --to bitmap --course 101     # Chỉ chuyển một khóa học
+        python manage.py convert_attendance_storage --to bitmap --delete-source  # Xóa bản ghi Attendance sau khi chuyển
+        python manage.py convert_attendance_storage --to rows --dry-run          # Chỉ kiểm tra, không ghi
+
+    Sau khi chuyển, đặt ATTENDANCE_STORAGE trong settings.py theo cách lưu mới.
+    """
+
+    help = 'Convert attendance between per-student rows and per-session bitmaps, verifying every course losslessly.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices = ('bitmap', 'rows'), required = True, help = 'Target storage.')
+        parser.add_argument('--course', type = int, action = 'append', help = 'Only convert this course code (repeatable).')
+        parser.add_argument('--delete-source', action = 'store_true', help = 'Delete the source data after a verified conversion.')
+        parser.add_argument('--dry-run', action = 'store_true', help = 'Convert and verify, then roll back.')
+
+    def handle(self, *args, **options):
+        to_bitmap = options['to'] == 'bitmap'
+        source = Attendance if to_bitmap else AttendanceSession
+        course_ids = options['course'] or source.objects.order_by('course_id').values_list('course_id', flat = True).distinct()
+        convert = bitmap.rows_to_sessions if to_bitmap else bitmap.sessions_to_rows
+
+        converted, failed = 0, 0
+        for course_id in course_ids:
+            try:
+                with transaction.atomic():
+                    records, sessions = convert(course_id)
+                    if options['delete_source']:
+                        source.objects.filter(course_id = course_id).delete()
+                    if options['dry_run']:
+                        transaction.set_rollback(True)
+            except (bitmap.ConversionError, bitmap.StaleWrite) as e:
+                # StaleWrite: điểm danh của khóa học vẫn đang được ghi sau nhiều lần thử lại, chạy lại lệnh cho khóa học này
+                failed += 1
+                self.stderr.write('Course %s: %s' % (course_id, e))
+                continue
+            converted += 1
+            self.stdout.write('Course %s: %d record(s) in %d session(s) verified' % (course_id, records, sessions))
+
+        attendance_summaries.clear()
+        count_cache.invalidate('roster')
+        if options['dry_run']:
+            self.stdout.write('Dry run: %d course(s) would be converted, %d failed.' % (converted, failed))
+        elif failed:
+            raise CommandError('Converted %d course(s), %d failed.' % (converted, failed))
+        else:
+            self.stdout.write(self.style.SUCCESS('Converted %d course(s) to %s storage.' % (converted, options['to'])))
@@ -0,0 +1,118 @@
+import datetime
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.urls import reverse
+from main.models import Course, Department, Student
+from attendance.checkin import checkin_buffer, checkin_windows
+from attendance.models import Attendance
+from attendance.services import create_records
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị kiểm thử tải điểm danh tự check-in: cả lớp check-in cùng một lúc.
+
+    Lệnh tạo một khóa học tạm với --students sinh viên, mở lượt check-in, cho mọi sinh viên gửi mã đồng thời
+    (mỗi sinh viên gửi --repeat lần) qua toàn bộ middleware và view, rồi chờ bộ đệm ghi xong và kiểm tra mỗi sinh viên
+    có đúng một bản ghi có mặt. Dữ liệu tạm được xóa khi kết thúc.
+
+    Cách dùng:
+        python manage.py loadtest_checkin                                 # 300 sinh viên, 100 luồng
+        python manage.py loadtest_checkin --students 500 --threads 200 --repeat 2
+    """
+
+    help = 'Load test the self check-in endpoint with a whole class checking in at once, then verify the stored attendance.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type = int, default = 300, help = 'Number of students checking in.')
+        parser.add_argument('--threads', type = int, default = 100, help = 'Number of concurrent client threads.')
+        parser.add_argument('--repeat', type = int, default = 1, help = 'Check-ins sent by each student (duplicates must be ignored).')
+
+    def handle(self, *args, **options):
+        size, repeat = options['students'], options['repeat']
+        course, students = self.fixture(size)
+        try:
+            today = datetime.date.today()
+            create_records(course, today)
+            window = checkin_windows.open(course.code, today)
+            code, _ = checkin_windows.current_code(window)
+            url = reverse('selfCheckin', args = [course.code])
+            cookies = [self.session_cookie(student.student_id) for student in students] * repeat
+
+            local = threading.local()
+            start = threading.Barrier(min(options['threads'], len(cookies)))
+
+            def check_in(cookie):
+                client = getattr(local, 'client', None)
+                if client is None:
+                    client = local.client = Client()
+                    # Mọi luồng bắt đầu gửi cùng một lúc
+                    start.wait()
+                client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+                started = time.perf_counter()
+                response = client.post(url, {'code': code})
+                return response.status_code, time.perf_counter() - started
+
+            def run(cookie):
+                try:
+                    return check_in(cookie)
+                finally:
+                    connection.close()
+
+            began = time.perf_counter()
+            with ThreadPoolExecutor(max_workers = options['threads']) as pool:
+                results = list(pool.map(run, cookies))
+            elapsed = time.perf_counter() - began
+            queued_at = time.perf_counter()
+            while checkin_buffer.pending():
+                time.sleep(0.01)
+            checkin_buffer.flush()
+            drained = time.perf_counter() - queued_at
+
+            statuses = Counter(status for status, latency in results)
+            latencies = sorted(latency * 1000 for status, latency in results)
+            self.stdout.write('%d check-in(s) from %d student(s) in %.2f s (%.0f req/s)' % (len(results), size, elapsed, len(results) / elapsed))
+            self.stdout.write('status codes: %s' % dict(sorted(statuses.items())))
+            self.stdout.write('latency ms: p50 %.1f  p95 %.1f  p99 %.1f  max %.1f' % (
+                latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)], latencies[int(len(latencies) * 0.99)], latencies[-1]))
+            self.stdout.write('buffer drained %.0f ms after the last response: %s' % (drained * 1000, checkin_buffer.stats()))
+
+            records = Attendance.objects.filter(course = course, date = today)
+            present = records.filter(status = True).count()
+            self.stdout.write('stored: %d record(s), %d present' % (records.count(), present))
+            if statuses.get(202) != size or statuses.get(200, 0) != size * (repeat - 1) or present != size or records.count() != size:
+                raise CommandError('Check-in load test failed.')
+            self.stdout.write(self.style.SUCCESS('Every student was recorded present exactly once.'))
+        finally:
+            checkin_windows.close(course.code)
+            course.delete()
+            Student.objects.filter(student_id__in = [student.student_id for student in students]).delete()
+            course.department.delete()
+
+    def fixture(self, size):
+        department = Department.objects.create(department_id = self.next_id(Department, 'department_id'), name = 'Load test')
+        course = Course.objects.create(code = self.next_id(Course, 'code'), name = 'Load test', department = department,
+                                       studentKey = self.next_id(Course, 'studentKey'), facultyKey = self.next_id(Course, 'facultyKey'))
+        first = self.next_id(Student, 'student_id')
+        students = Student.objects.bulk_create([
+            Student(student_id = first + i, name = 'Student %d' % i, password = 'loadtest', department = department)
+            for i in range(size)])
+        course.students.add(*students)
+        return course, students
+
+    def next_id(self, model, field):
+        return (model.objects.aggregate(last = Max(field))['last'] or 0) + 1
+
+    def session_cookie(self, student_id):
+        store = import_module(settings.SESSION_ENGINE).SessionStore()
+        store['student_id'] = student_id
+        store.save()
+        return store.session_key
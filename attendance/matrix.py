@@ -0,0 +1,128 @@
+import csv
+import datetime
+from collections import namedtuple
+from django.db.models import CharField
+from django.db.models.functions import Cast
+from django.utils.safestring import mark_safe
+from main.models import Student
+from . import bitmap
+from .models import Attendance
+from .summary import AttendanceSummary
+
+
+# Giá trị của một ô trong ma trận
+NO_RECORD, ABSENT, PRESENT = 0, 1, 2
+
+# HTML của từng loại ô, ghép sẵn theo hàng thay vì lặp từng ô trong template
+CELL_HTML = {NO_RECORD: '<td></td>', ABSENT: '<td class="text-danger">A</td>', PRESENT: '<td class="text-success">P</td>'}
+
+
+class MatrixRow(namedtuple('MatrixRow', ['student_id', 'name', 'cells', 'summary'])):
+    """Một hàng của ma trận điểm danh."""
+
+    __slots__ = ()
+
+    @property
+    def cells_html(self):
+        """Các ô <td> của hàng (P/A/trống)."""
+        return mark_safe(''.join([CELL_HTML[cell] for cell in self.cells]))
+
+
+AttendanceMatrix = namedtuple('AttendanceMatrix', ['dates', 'rows', 'headcounts'])
+
+
+def _records(course_id, start, end):
+    # (student_id, tên, ngày dạng YYYY-MM-DD, trạng thái) theo thứ tự sinh viên rồi đến ngày
+    if not bitmap.enabled():
+        rows = Attendance.objects.filter(course_id = course_id)
+        if start is not None:
+            rows = rows.filter(date__gte = start)
+        if end is not None:
+            rows = rows.filter(date__lte = end)
+        # Ngày được đọc dưới dạng chuỗi ISO (sắp xếp như ngày) để chỉ chuyển đổi một lần cho mỗi cột
+        return rows.order_by('student__name', 'student_id', 'date').annotate(day = Cast('date', CharField())).values_list(
+            'student_id', 'student__name', 'day', 'status')
+
+    sessions = bitmap.load_sessions(course_id, start, end)
+    students = bitmap.roster(course_id)
+    names = dict(Student.objects.filter(student_id__in = students).values_list('student_id', 'name'))
+    records = []
+    for session in sessions:
+        for index in bitmap.bits(session.members):
+            student_id = students[index]
+            if student_id in names:
+                records.append((student_id, names[student_id], session.date.isoformat(), bool(session.present >> index & 1)))
+    records.sort(key = lambda record: (record[1], record[0], record[2]))
+    return records
+
+
+def build_matrix(course_id, start = None, end = None):
+    """
+    Tạo ma trận điểm danh (sinh viên × ngày) của một khóa học.
+
+    Args:
+        course_id (int): Mã khóa học.
+        start (date, optional): Ngày đầu tiên của khoảng ngày.
+        end (date, optional): Ngày cuối cùng của khoảng ngày.
+
+    Returns:
+        AttendanceMatrix: dates (các ngày có điểm danh, tăng dần), rows (MatrixRow theo tên sinh viên, với cells là
+        bytearray NO_RECORD/ABSENT/PRESENT theo từng ngày và summary là tổng của hàng) và headcounts (tổng của từng cột).
+
+    Notes:
+        - Các bản ghi được tải bằng một truy vấn đã sắp xếp theo sinh viên và ngày, nên mỗi hàng được điền liên tục
+          vào một bytearray; tổng của hàng và cột được tính trong cùng một lượt.
+        - Khi ATTENDANCE_STORAGE = 'bitmap', các ô được giải mã từ bitmap của từng buổi.
+    """
+    records = list(_records(course_id, start, end))
+    days = sorted({record[2] for record in records})
+    columns = {day: index for index, day in enumerate(days)}
+    dates = [datetime.date.fromisoformat(day) for day in days]
+    present_by_date = [0] * len(dates)
+    absent_by_date = [0] * len(dates)
+
+    rows = []
+    current = None
+    for student_id, name, day, status in records:
+        if student_id != current:
+            current = student_id
+            cells = bytearray(len(dates))
+            rows.append((student_id, name, cells))
+        column = columns[day]
+        cells[column] = PRESENT if status else ABSENT
+        if status:
+            present_by_date[column] += 1
+        else:
+            absent_by_date[column] += 1
+
+    rows = [MatrixRow(student_id, name, cells, AttendanceSummary(cells.count(PRESENT), cells.count(ABSENT)))
+            for student_id, name, cells in rows]
+    headcounts = [bitmap.Headcount(date, present_by_date[index], absent_by_date[index]) for index, date in enumerate(dates)]
+    return AttendanceMatrix(dates, rows, headcounts)
+
+
+class Echo:
+    """Đối tượng giả lập tệp, trả lại dòng vừa được csv.writer ghi để truyền dần (StreamingHttpResponse)."""
+
+    def write(self, value):
+        return value
+
+
+CELL_TEXT = {NO_RECORD: '', ABSENT: 'A', PRESENT: 'P'}
+
+
+def matrix_csv(matrix):
+    """
+    Các dòng CSV của ma trận điểm danh: tiêu đề, mỗi sinh viên một dòng (P/A/trống và tổng) và dòng tổng có mặt theo ngày.
+
+    Yields:
+        str: Một dòng CSV.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Student ID', 'Name'] + [date.isoformat() for date in matrix.dates] + ['Present', 'Absent', 'Attendance %'])
+    for row in matrix.rows:
+        percentage = row.summary.percentage
+        yield writer.writerow([row.student_id, row.name] + [CELL_TEXT[cell] for cell in row.cells]
+                              + [row.summary.present, row.summary.absent, '' if percentage is None else percentage])
+    yield writer.writerow(['', 'Present'] + [headcount.present for headcount in matrix.headcounts] + ['', '', ''])
+    yield writer.writerow(['', 'Absent'] + [headcount.absent for headcount in matrix.headcounts] + ['', '', ''])
@@ -20,28 +20,46 @@ class Attendance(models.Model):
         """
         return self.student.name + ' - ' + self.course.name + ' - ' + self.date.strftime('%d-%m-%Y')
 
-    def total_absent(self):
-        """
-        Tính toán và trả về tổng số lần học sinh vắng mặt.
 
-        Hàm đếm số đối tượng Attendance cho học sinh mà trạng thái là False.
-        Nếu số lượng là 0, trả về 0. Ngược lại, trừ đi 1 từ số lượng và trả về kết quả.
-        """
-        attendance = Attendance.objects.filter(student = self.student, status = False).count()
-        if attendance == 0:
-            return attendance
-        else:
-            return attendance - 1
+class AttendanceRoster(models.Model):
+    """
+    Thứ tự bit cố định của các sinh viên trong bitmap điểm danh của một khóa học.
 
-    def total_present(self):
-        """
-        Tính toán và trả về tổng số lần học sinh có mặt.
+    Thuộc tính:
+        - course: Khóa học (primary key).
+        - students: Danh sách mã sinh viên; sinh viên ở vị trí i ứng với bit i của AttendanceSession.
+          Danh sách chỉ được nối thêm, không bao giờ sắp xếp lại, nên bitmap đã lưu luôn giữ nguyên nghĩa.
+        - size: Độ dài của students, dùng để so sánh và cập nhật (compare-and-swap) khi nối thêm sinh viên.
+    """
+    course = models.OneToOneField(Course, on_delete = models.CASCADE, primary_key = True)
+    students = models.JSONField(default = list)
+    size = models.PositiveIntegerField(default = 0)
 
-        Hàm đếm số đối tượng Attendance cho học sinh mà trạng thái là True.
-        Nếu số lượng là 0, trả về 0. Ngược lại, trừ đi 1 từ số lượng và trả về kết quả.
-        """
-        present = Attendance.objects.filter(student = self.student, status = True).count()
-        if present == 0:
-            return present
-        else:
-            return present - 1
+    def __str__(self):
+        return self.course.name + ' - ' + str(self.size) + ' students'
+
+
+class AttendanceSession(models.Model):
+    """
+    Một buổi điểm danh (khóa học, ngày) được lưu dưới dạng bitmap thay cho một bản ghi Attendance cho mỗi sinh viên.
+
+    Thuộc tính:
+        - course: Khóa học.
+        - date: Ngày điểm danh.
+        - members: Bitmap (little-endian) các sinh viên có bản ghi điểm danh trong buổi này, theo thứ tự của AttendanceRoster.
+        - present: Bitmap các sinh viên có mặt (luôn là tập con của members).
+        - version: Tăng sau mỗi lần ghi, dùng để so sánh và cập nhật khi nhiều lần gửi điểm danh chạy đồng thời.
+    """
+    course = models.ForeignKey(Course, on_delete = models.CASCADE)
+    date = models.DateField(null = False, blank = False)
+    members = models.BinaryField(default = b'')
+    present = models.BinaryField(default = b'')
+    version = models.PositiveIntegerField(default = 0)
+    created_at = models.DateTimeField(auto_now_add = True)
+    updated_at = models.DateTimeField(auto_now = True)
+
+    class Meta:
+        unique_together = ('course', 'date')
+
+    def __str__(self):
+        return self.course.name + ' - ' + self.date.strftime('%d-%m-%Y')
@@ -0,0 +1,100 @@
+import datetime
+from collections import namedtuple
+from django.db import transaction
+from main.models import Student
+from main.pagination import count_cache
+from main.signals import on_commit_and_now
+from . import bitmap
+from .models import Attendance
+from .summary import attendance_summaries
+
+
+SubmitResult = namedtuple('SubmitResult', ['updated', 'created', 'unchanged'])
+
+
+def create_records(course, date):
+    """
+    Tạo bản ghi điểm danh (vắng mặt) cho mọi sinh viên của khóa học trong một ngày.
+
+    Args:
+        course (Course): Khóa học.
+        date (str | date): Ngày điểm danh.
+
+    Returns:
+        int: Số bản ghi đã tạo, None nếu bản ghi điểm danh của ngày này đã tồn tại.
+
+    Notes:
+        - Chỉ tải mã sinh viên và chèn mọi bản ghi bằng một lệnh bulk_create trong một transaction,
+          nên số câu lệnh không phụ thuộc số sinh viên.
+        - Tổng hợp điểm danh đã cache của khóa học được cộng thêm một buổi vắng mặt cho mỗi sinh viên.
+        - Khi ATTENDANCE_STORAGE = 'bitmap', buổi điểm danh được lưu thành một dòng AttendanceSession.
+    """
+    if bitmap.enabled():
+        with attendance_summaries.writing(course.pk) as delta:
+            return bitmap.create_session(course, date, delta)
+    with attendance_summaries.writing(course.pk) as delta, transaction.atomic():
+        if Attendance.objects.filter(course = course, date = date).exists():
+            return None
+        student_ids = Student.objects.filter(course = course).values_list('student_id', flat = True)
+        records = Attendance.objects.bulk_create(
+            [Attendance(student_id = student_id, course = course, date = date, status = False) for student_id in student_ids])
+        delta.update((record.student_id, (0, 1)) for record in records)
+        # bulk_create không gửi post_save, nên vô hiệu hóa tổng số dòng đã cache ở đây
+        on_commit_and_now(lambda: count_cache.invalidate('roster'))
+    return len(records)
+
+
+def submit_records(course, date, student_ids, present_ids):
+    """
+    Cập nhật trạng thái điểm danh của các sinh viên trong một ngày.
+
+    Args:
+        course (Course): Khóa học.
+        date (str | date): Ngày điểm danh.
+        student_ids (iterable): Mã các sinh viên được gửi (trang hiện tại của danh sách).
+        present_ids (set): Mã các sinh viên có mặt; các sinh viên còn lại được đánh dấu vắng mặt.
+
+    Returns:
+        SubmitResult: Số bản ghi được cập nhật, được tạo mới (sinh viên đăng ký sau khi tạo bản ghi của ngày)
+        và không thay đổi.
+
+    Raises:
+        Attendance.DoesNotExist: Nếu bản ghi điểm danh của ngày chưa được tạo.
+
+    Notes:
+        - Các bản ghi của ngày được tải bằng một truy vấn; chỉ các bản ghi thay đổi trạng thái được ghi bằng
+          một lệnh bulk_update, tất cả trong một transaction.
+        - Tổng hợp điểm danh đã cache của khóa học được cập nhật theo các bản ghi thay đổi, không cần tính lại.
+        - Khi ATTENDANCE_STORAGE = 'bitmap', các bit của buổi điểm danh được cập nhật trên một dòng AttendanceSession.
+    """
+    student_ids = {int(student_id) for student_id in student_ids}
+    present_ids = {int(student_id) for student_id in present_ids}
+    if bitmap.enabled():
+        with attendance_summaries.writing(course.pk) as delta:
+            return SubmitResult(*bitmap.submit_session(course, date, student_ids, present_ids, delta))
+    now = datetime.datetime.now()
+    with attendance_summaries.writing(course.pk) as delta, transaction.atomic():
+        records = {record.student_id: record for record in Attendance.objects.filter(
+            course = course, date = date, student_id__in = student_ids).only('id', 'student_id', 'status')}
+        changed = []
+        for student_id, record in records.items():
+            status = student_id in present_ids
+            if record.status != status:
+                record.status = status
+                record.updated_at = now
+                changed.append(record)
+                delta[student_id] = (1, -1) if status else (-1, 1)
+        Attendance.objects.bulk_update(changed, ['status', 'updated_at'])
+
+        missing = student_ids - records.keys()
+        if missing and not records and not Attendance.objects.filter(course = course, date = date).exists():
+            raise Attendance.DoesNotExist('No attendance record for %s on %s' % (course.pk, date))
+        created = []
+        if missing:
+            enrolled = Student.objects.filter(course = course, student_id__in = missing).values_list('student_id', flat = True)
+            created = Attendance.objects.bulk_create(
+                [Attendance(student_id = student_id, course = course, date = date, status = student_id in present_ids) for student_id in enrolled])
+            delta.update((record.student_id, (1, 0) if record.status else (0, 1)) for record in created)
+            if created:
+                on_commit_and_now(lambda: count_cache.invalidate('roster'))
+    return SubmitResult(len(changed), len(created), len(records) - len(changed))
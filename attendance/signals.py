@@ -0,0 +1,24 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from main.pagination import count_cache
+from main.signals import on_commit_and_now
+from .models import Attendance, AttendanceSession
+from .summary import attendance_summaries
+
+
+@receiver(post_save, sender = Attendance)
+@receiver(post_delete, sender = Attendance)
+def attendance_changed(sender, instance, created = True, **kwargs):
+    """
+    Vô hiệu hóa tổng hợp điểm danh đã cache của khóa học khi bản ghi thay đổi,
+    và tổng số dòng đã cache của danh sách điểm danh khi bản ghi được tạo hoặc xóa.
+    """
+    on_commit_and_now(lambda: attendance_summaries.invalidate(instance.course_id))
+    if created:
+        on_commit_and_now(lambda: count_cache.invalidate('roster'))
+
+
+@receiver(post_delete, sender = AttendanceSession)
+def attendance_session_deleted(sender, instance, **kwargs):
+    """Vô hiệu hóa tổng hợp điểm danh đã cache của khóa học khi một buổi điểm danh bitmap bị xóa."""
+    on_commit_and_now(lambda: attendance_summaries.invalidate(instance.course_id))
@@ -0,0 +1,149 @@
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Q
+from main.signals import on_commit_and_now
+from . import bitmap
+from .models import Attendance
+
+
+class AttendanceSummary(namedtuple('AttendanceSummary', ['present', 'absent'])):
+    """Tổng số buổi có mặt và vắng mặt của một sinh viên trong một khóa học."""
+
+    __slots__ = ()
+
+    @property
+    def total(self):
+        return self.present + self.absent
+
+    @property
+    def percentage(self):
+        """Tỷ lệ có mặt (%), None nếu chưa có buổi điểm danh nào."""
+        return round(self.present * 100 / self.total, 1) if self.total else None
+
+
+EMPTY = AttendanceSummary(0, 0)
+
+
+def course_summary(course_id):
+    """
+    Tính tổng số buổi có mặt và vắng mặt của mọi sinh viên trong một khóa học bằng một truy vấn GROUP BY.
+
+    Args:
+        course_id (int): Mã khóa học.
+
+    Returns:
+        dict: Ánh xạ student_id -> AttendanceSummary. Sinh viên chưa có bản ghi nào không có trong dict (dùng EMPTY).
+
+    Notes:
+        - Khi ATTENDANCE_STORAGE = 'bitmap', tổng được tính từ bitmap của các buổi điểm danh (bitmap.student_totals).
+    """
+    if bitmap.enabled():
+        return {student_id: AttendanceSummary(*totals) for student_id, totals in bitmap.student_totals(course_id).items()}
+    rows = Attendance.objects.filter(course_id = course_id).order_by().values('student_id').annotate(
+        present = Count('id', filter = Q(status = True)), absent = Count('id', filter = Q(status = False)))
+    return {row['student_id']: AttendanceSummary(row['present'], row['absent']) for row in rows}
+
+
+class AttendanceSummaryCache:
+    """
+    Cache trong bộ nhớ tiến trình cho tổng hợp điểm danh theo khóa học (kết quả của course_summary).
+
+    Khi điểm danh được tạo hoặc gửi qua attendance/services.py, mục của khóa học được cập nhật dần theo phần chênh lệch
+    thay vì tính lại; các thay đổi khác (trang quản trị, xóa sinh viên) vô hiệu hóa mục qua signal.
+
+    Thuộc tính:
+        - maxsize: Số khóa học tối đa được lưu (cấu hình ATTENDANCE_SUMMARY_CACHE_SIZE, 0 để tắt cache).
+
+    Notes:
+        - Trong lúc một lần ghi đang chạy, kết quả đọc từ cơ sở dữ liệu không được lưu vào cache, vì có thể
+          chưa (hoặc đã) bao gồm thay đổi chưa được cộng vào.
+    """
+
+    def __init__(self, maxsize = None):
+        self.maxsize = maxsize if maxsize is not None else getattr(settings, 'ATTENDANCE_SUMMARY_CACHE_SIZE', 128)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Số lần ghi đang chạy và số thế hệ của từng khóa học
+        self._writers = defaultdict(int)
+        self._generations = defaultdict(int)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, course_id):
+        """Trả về dict student_id -> AttendanceSummary của khóa học (bản sao, có thể sửa đổi)."""
+        course_id = int(course_id)
+        with self._lock:
+            entry = self._entries.get(course_id)
+            if entry is not None:
+                self._entries.move_to_end(course_id)
+                self.hits += 1
+                return dict(entry)
+            self.misses += 1
+            generation = self._generations[course_id]
+
+        summary = course_summary(course_id)
+
+        with self._lock:
+            if self.maxsize > 0 and not self._writers[course_id] and generation == self._generations[course_id]:
+                self._entries[course_id] = summary
+                self._entries.move_to_end(course_id)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last = False)
+        return dict(summary)
+
+    @contextmanager
+    def writing(self, course_id):
+        """
+        Bao quanh một lần ghi điểm danh của khóa học.
+
+        Yields:
+            dict: Phần chênh lệch student_id -> (có mặt, vắng mặt) do lần ghi tạo ra, được cộng vào mục đã cache
+            sau khi transaction được commit.
+
+        Notes:
+            - Nếu lần ghi lỗi hoặc nằm trong một transaction bên ngoài (chưa commit), mục của khóa học bị vô hiệu hóa
+              thay vì được cộng phần chênh lệch.
+        """
+        course_id = int(course_id)
+        with self._lock:
+            self._writers[course_id] += 1
+            self._generations[course_id] += 1
+        delta = {}
+        committed = False
+        try:
+            yield delta
+            committed = not connection.in_atomic_block
+        finally:
+            with self._lock:
+                self._writers[course_id] -= 1
+                if not self._writers[course_id]:
+                    del self._writers[course_id]
+                self._generations[course_id] += 1
+                entry = self._entries.get(course_id)
+                if entry is not None and committed:
+                    for student_id, (present, absent) in delta.items():
+                        current = entry.get(student_id, EMPTY)
+                        entry[student_id] = AttendanceSummary(current.present + present, current.absent + absent)
+                elif entry is not None:
+                    del self._entries[course_id]
+            if not committed:
+                on_commit_and_now(lambda: self.invalidate(course_id))
+
+    def invalidate(self, course_id):
+        """Vô hiệu hóa tổng hợp điểm danh của một khóa học."""
+        with self._lock:
+            self._generations[int(course_id)] += 1
+            self._entries.pop(int(course_id), None)
+
+    def clear(self):
+        """Xóa toàn bộ cache."""
+        with self._lock:
+            for course_id in self._entries:
+                self._generations[course_id] += 1
+            self._entries.clear()
+
+
+attendance_summaries = AttendanceSummaryCache()
@@ -1,3 +1,391 @@
-from django.test import TestCase
+import datetime
+import io
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from main.models import Course, Department, Faculty, Student
+from . import bitmap
+from .checkin import CheckinBuffer, check_in, checkin_windows
+from .matrix import ABSENT, NO_RECORD, PRESENT, build_matrix
+from .models import Attendance, AttendanceSession
+from .services import create_records, submit_records
+from .summary import EMPTY, AttendanceSummary, attendance_summaries, course_summary
 
-# Create your tests here.
+
+class BulkRecordsTests(TestCase):
+    """Tạo và gửi điểm danh bằng các câu lệnh hàng loạt: số câu lệnh không phụ thuộc số sinh viên."""
+
+    def setUp(self):
+        self.department = Department.objects.create(department_id = 1, name = 'Test')
+        self.small = self.course(1, 3)
+        self.large = self.course(2, 30)
+        self.date = datetime.date(2026, 9, 1)
+
+    def course(self, code, size):
+        course = Course.objects.create(code = code, name = 'Course %d' % code, department = self.department, studentKey = code,
+                                       facultyKey = code)
+        course.students.add(*Student.objects.bulk_create([
+            Student(student_id = code * 100 + i, name = 'Student %d' % i, password = 'test', department = self.department)
+            for i in range(size)]))
+        return course
+
+    def statements(self, func):
+        with CaptureQueriesContext(connection) as queries:
+            result = func()
+        return result, len(queries)
+
+    def test_create_records(self):
+        small, small_queries = self.statements(lambda: create_records(self.small, self.date))
+        large, large_queries = self.statements(lambda: create_records(self.large, self.date))
+        self.assertEqual((small, large), (3, 30))
+        self.assertEqual(small_queries, large_queries)
+        self.assertFalse(Attendance.objects.filter(status = True).exists())
+        # Bản ghi của ngày đã tồn tại
+        self.assertIsNone(create_records(self.small, self.date))
+        self.assertEqual(Attendance.objects.filter(course = self.small).count(), 3)
+
+    def test_submit_records(self):
+        create_records(self.small, self.date)
+        create_records(self.large, self.date)
+        small_ids = [100, 101, 102]
+        large_ids = list(range(200, 230))
+        result, small_queries = self.statements(lambda: submit_records(self.small, self.date, small_ids, {100, 101}))
+        self.assertEqual(result, (2, 0, 1))
+        result, large_queries = self.statements(lambda: submit_records(self.large, self.date, large_ids, set(large_ids[::2])))
+        self.assertEqual(result, (15, 0, 15))
+        self.assertEqual(small_queries, large_queries)
+
+        # Gửi lại: sinh viên 100 vắng mặt, sinh viên đăng ký sau khi tạo bản ghi được thêm bản ghi mới
+        late = Student.objects.create(student_id = 103, name = 'Late', password = 'test', department = self.department)
+        self.small.students.add(late)
+        self.assertEqual(submit_records(self.small, self.date, small_ids + [103], {101, 103}), (1, 1, 2))
+        self.assertEqual(dict(Attendance.objects.filter(course = self.small).values_list('student_id', 'status')),
+                         {100: False, 101: True, 102: False, 103: True})
+
+        with self.assertRaises(Attendance.DoesNotExist):
+            submit_records(self.small, datetime.date(2026, 9, 2), small_ids, set())
+
+    def test_benchmark_command(self):
+        stdout = io.StringIO()
+        call_command('benchmark_attendance', '--students', '5', stdout = stdout)
+        self.assertIn('submit (bulk)', stdout.getvalue())
+        # Dữ liệu thử được hủy sau khi đo
+        self.assertEqual(Course.objects.count(), 2)
+        self.assertEqual(Student.objects.count(), 33)
+
+
+class CourseSummaryTests(TransactionTestCase):
+    """
+    Tổng hợp điểm danh theo khóa học và cache của nó.
+
+    Dùng TransactionTestCase vì phần chênh lệch chỉ được cộng vào cache khi lần ghi đã được commit.
+    """
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        self.course = Course.objects.create(code = 1, name = 'Test', department = department, studentKey = 1, facultyKey = 1)
+        self.course.students.add(*Student.objects.bulk_create([
+            Student(student_id = student_id, name = 'Student %d' % student_id, password = 'test', department = department)
+            for student_id in (1, 2, 3)]))
+        self.first, self.second = datetime.date(2026, 9, 1), datetime.date(2026, 9, 2)
+        create_records(self.course, self.first)
+        submit_records(self.course, self.first, [1, 2, 3], {1, 2})
+        attendance_summaries.clear()
+        self.addCleanup(attendance_summaries.clear)
+
+    def test_course_summary(self):
+        with self.assertNumQueries(1):
+            summary = course_summary(self.course.code)
+        self.assertEqual(summary, {1: (1, 0), 2: (1, 0), 3: (0, 1)})
+        self.assertEqual((summary[1].total, summary[1].percentage, summary[3].percentage), (1, 100.0, 0.0))
+        self.assertIsNone(summary.get(4, EMPTY).percentage)
+        self.assertEqual(course_summary(2), {})
+
+    def test_cache_follows_writes(self):
+        self.assertEqual(attendance_summaries.get(self.course.code)[3], (0, 1))
+        create_records(self.course, self.second)
+        submit_records(self.course, self.second, [1, 2, 3], {1, 3})
+        # Cache được cộng phần chênh lệch của các lần ghi, không tính lại
+        with self.assertNumQueries(0):
+            summary = attendance_summaries.get(self.course.code)
+        self.assertEqual(summary, {1: (2, 0), 2: (1, 1), 3: (1, 1)})
+        self.assertEqual(summary, course_summary(self.course.code))
+
+        # Bản sao trả về có thể sửa mà không ảnh hưởng cache
+        summary[1] = AttendanceSummary(0, 0)
+        self.assertEqual(attendance_summaries.get(self.course.code)[1], (2, 0))
+
+        # Sửa một bản ghi ngoài services (trang quản trị) vô hiệu hóa mục của khóa học
+        record = Attendance.objects.get(course = self.course, date = self.second, student_id = 2)
+        record.status = True
+        record.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(attendance_summaries.get(self.course.code)[2], (2, 0))
+
+
+class BitmapConversionTests(TestCase):
+    """Chuyển đổi giữa bản ghi Attendance và buổi điểm danh bitmap."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        self.course = Course.objects.create(code = 1, name = 'Test', department = department, studentKey = 1, facultyKey = 1)
+        # Hơn 8 sinh viên để bitmap trải qua nhiều byte
+        students = Student.objects.bulk_create([
+            Student(student_id = student_id, name = 'Student %d' % student_id, password = 'test', department = department)
+            for student_id in range(1, 13)])
+        self.course.students.add(*students)
+        first = datetime.date(2026, 9, 1)
+        Attendance.objects.bulk_create([
+            Attendance(student = student, course = self.course, date = first + datetime.timedelta(days = day),
+                       status = (student.student_id + day) % 3 != 0)
+            for day in range(4) for student in students
+            # Sinh viên 12 chỉ có bản ghi từ buổi thứ ba
+            if student.student_id != 12 or day >= 2])
+
+    def test_round_trip(self):
+        original = set(bitmap.row_records(self.course.code))
+
+        self.assertEqual(bitmap.rows_to_sessions(self.course.code), (len(original), 4))
+        Attendance.objects.filter(course = self.course).delete()
+        self.assertEqual(bitmap.session_records(self.course.code), original)
+
+        self.assertEqual(bitmap.sessions_to_rows(self.course.code), (len(original), 4))
+        AttendanceSession.objects.filter(course = self.course).delete()
+        self.assertEqual(set(bitmap.row_records(self.course.code)), original)
+
+    def test_conversion_retries_stale_roster(self):
+        ensure_slots = bitmap.ensure_slots
+        calls = []
+
+        def racing_ensure_slots(course_id, student_ids):
+            calls.append(course_id)
+            if len(calls) == 1:
+                # Một lần điểm danh khác vừa nối thêm vào roster
+                raise bitmap.StaleWrite('Roster of course %s changed' % course_id)
+            return ensure_slots(course_id, student_ids)
+
+        original = set(bitmap.row_records(self.course.code))
+        with mock.patch('attendance.bitmap.ensure_slots', racing_ensure_slots):
+            self.assertEqual(bitmap.rows_to_sessions(self.course.code), (len(original), 4))
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(bitmap.session_records(self.course.code), original)
+
+    def test_command_reports_stale_roster(self):
+        stale = mock.Mock(side_effect = bitmap.StaleWrite('Roster of course 1 changed'))
+        with mock.patch('attendance.bitmap.ensure_slots', stale), self.assertRaises(CommandError):
+            call_command('convert_attendance_storage', '--to', 'bitmap', stdout = io.StringIO(), stderr = io.StringIO())
+        self.assertEqual(stale.call_count, bitmap.MAX_RETRIES)
+        self.assertFalse(AttendanceSession.objects.filter(course = self.course).exists())
+
+    def test_student_totals_match_course_summary(self):
+        expected = course_summary(self.course.code)
+        bitmap.rows_to_sessions(self.course.code)
+        Attendance.objects.filter(course = self.course).delete()
+
+        totals = bitmap.student_totals(self.course.code)
+        self.assertEqual(totals, {student_id: tuple(summary) for student_id, summary in expected.items()})
+        self.assertEqual(totals[12], (expected[12].present, 2 - expected[12].present))
+        with override_settings(ATTENDANCE_STORAGE = 'bitmap'):
+            self.assertEqual(course_summary(self.course.code), expected)
+
+
+class CheckinTests(TestCase):
+    """Tự check-in: giới hạn số lần nhập sai mã và ghi lại bộ đệm sau khi ghi lỗi."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        self.course = Course.objects.create(code = 1, name = 'Test', department = department, studentKey = 1, facultyKey = 1)
+        self.students = Student.objects.bulk_create([
+            Student(student_id = student_id, name = 'Student %d' % student_id, password = 'test', department = department)
+            for student_id in (1, 2)])
+        self.course.students.add(*self.students)
+        self.date = datetime.date(2026, 9, 1)
+        create_records(self.course, self.date)
+        self.window = checkin_windows.open(self.course.code, self.date)
+        self.addCleanup(checkin_windows.close, self.course.code)
+        self.code, _ = checkin_windows.current_code(self.window)
+        self.wrong = '%06d' % ((int(self.code) + 1) % 1000000)
+
+    def test_wrong_codes_are_limited(self):
+        buffer = CheckinBuffer(flush_interval = 3600)
+        self.addCleanup(buffer.flush)
+        with mock.patch('attendance.checkin.checkin_buffer', buffer):
+            for _ in range(checkin_windows.max_failures):
+                self.assertEqual(check_in(self.course.code, 1, self.wrong), 'invalid')
+            # Sau khi hết số lần nhập sai, cả mã đúng cũng bị từ chối trong lượt check-in này
+            self.assertEqual(check_in(self.course.code, 1, self.code), 'limited')
+            self.assertEqual(check_in(self.course.code, 2, self.code), 'queued')
+
+            session = self.client.session
+            session['student_id'] = 1
+            session.save()
+            self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+            response = self.client.post(reverse('selfCheckin', args = [self.course.code]), {'code': self.code})
+            self.assertEqual(response.status_code, 429)
+            self.assertEqual(response.json(), {'status': 'limited'})
+
+            # Lượt check-in mới bắt đầu lại từ đầu
+            self.window = checkin_windows.open(self.course.code, self.date)
+            self.code, _ = checkin_windows.current_code(self.window)
+            self.assertEqual(check_in(self.course.code, 1, self.code), 'queued')
+
+    def test_course_page_shows_form_only_while_open(self):
+        session = self.client.session
+        session['student_id'] = 1
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        url = reverse('course', args = [self.course.code])
+        self.assertContains(self.client.get(url), 'id="checkinForm"')
+        checkin_windows.close(self.course.code)
+        self.assertNotContains(self.client.get(url), 'id="checkinForm"')
+
+    def test_parallel_wrong_codes_are_limited(self):
+        start = threading.Barrier(20)
+
+        def guess(index):
+            start.wait()
+            return check_in(self.course.code, 1, '%06d' % ((int(self.code) + 1 + index) % 1000000))
+
+        with ThreadPoolExecutor(max_workers = 20) as pool:
+            results = Counter(pool.map(guess, range(20)))
+        self.assertEqual(results, {'invalid': checkin_windows.max_failures, 'limited': 20 - checkin_windows.max_failures})
+        self.assertEqual(self.window.failures[1], checkin_windows.max_failures)
+
+    def test_failed_flush_is_retried(self):
+        buffer = CheckinBuffer(flush_interval = 3600)
+        self.addCleanup(buffer.flush)
+        calls = []
+
+        def flaky_submit(*args):
+            calls.append(args)
+            if len(calls) == 1:
+                raise OperationalError('database is locked')
+            return submit_records(*args)
+
+        for student in self.students:
+            buffer.add(self.course.code, self.date, student.student_id)
+        with mock.patch('attendance.checkin.submit_records', flaky_submit):
+            with self.assertLogs('attendance.checkin', 'ERROR'):
+                self.assertEqual(buffer.flush(), 0)
+            # Các sinh viên được trả lại bộ đệm và lần ghi sau được lên lịch
+            self.assertEqual(buffer.pending(), 2)
+            self.assertIsNotNone(buffer._timer)
+            self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(buffer.pending(), 0)
+        self.assertEqual(Attendance.objects.filter(course = self.course, date = self.date, status = True).count(), 2)
+
+
+@override_settings(ROSTER_PAGE_SIZE = 2)
+class RosterPageTests(TestCase):
+    """Danh sách sinh viên và danh sách điểm danh được phân trang; chỉ sinh viên trên trang đã gửi được cập nhật."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        faculty = Faculty.objects.create(faculty_id = 1, name = 'Faculty 1', password = 'test', department = department)
+        self.course = Course.objects.create(code = 1, name = 'Test', department = department, studentKey = 1, facultyKey = 1,
+                                            faculty = faculty)
+        self.course.students.add(*Student.objects.bulk_create([
+            Student(student_id = student_id, name = name, password = 'test', department = department)
+            for student_id, name in ((1, 'Carol'), (2, 'Alice'), (3, 'Bob'))]))
+        session = self.client.session
+        session['faculty_id'] = faculty.faculty_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def ids(self, response, key = 'students'):
+        return [row.student_id for row in response.context[key]], response.context['page_obj'].paginator.count
+
+    def test_roster_pages(self):
+        url = reverse('attendance', args = [self.course.code])
+        self.assertEqual(self.ids(self.client.get(url)), ([2, 3], 3))
+        self.assertEqual(self.ids(self.client.get(url, {'page': 2})), ([1], 3))
+        self.assertEqual(self.ids(self.client.get(url, {'sort': 'id'})), ([1, 2], 3))
+        self.assertEqual(self.ids(self.client.get(url, {'q': 'b'})), ([3], 1))
+
+        # Sinh viên đăng ký sau được tính vào tổng số dòng đã cache
+        self.course.students.add(Student.objects.create(student_id = 4, name = 'Dave', password = 'test',
+                                                        department_id = 1))
+        self.assertEqual(self.ids(self.client.get(url, {'page': 2})), ([1, 4], 4))
+
+    def test_submit_page_only(self):
+        date = datetime.date(2026, 9, 1)
+        create_records(self.course, date)
+        Attendance.objects.filter(course = self.course).update(status = True)
+        load = reverse('loadAttendance', args = [self.course.code])
+        first = self.client.get(load, {'date': date.isoformat()})
+        self.assertEqual(self.ids(first, 'attendance'), ([2, 3], 3))
+
+        # Trang đầu chỉ gửi sinh viên 2 và 3: sinh viên 1 ở trang sau giữ nguyên trạng thái có mặt
+        self.client.post(reverse('submitAttendance', args = [self.course.code]),
+                         {'datehidden': date.isoformat(), 'students': ['2', '3'], '3': '1'})
+        self.assertEqual(dict(Attendance.objects.filter(course = self.course).values_list('student_id', 'status')),
+                         {1: True, 2: False, 3: True})
+
+
+class AttendanceMatrixTests(TestCase):
+    """Ma trận điểm danh (sinh viên × ngày) và tệp CSV của một khóa học nhỏ."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        faculty = Faculty.objects.create(faculty_id = 1, name = 'Faculty 1', password = 'test', department = department)
+        self.course = Course.objects.create(code = 1, name = 'Test', department = department, studentKey = 1, facultyKey = 1,
+                                            faculty = faculty)
+        students = Student.objects.bulk_create([
+            Student(student_id = student_id, name = name, password = 'test', department = department)
+            for student_id, name in ((1, 'Carol'), (2, 'Alice'), (3, 'Bob'))])
+        self.course.students.add(*students)
+        self.first, self.second = datetime.date(2026, 9, 1), datetime.date(2026, 9, 8)
+        # Sinh viên 3 chỉ có bản ghi của buổi thứ hai
+        Attendance.objects.bulk_create([
+            Attendance(student_id = 1, course = self.course, date = self.first, status = True),
+            Attendance(student_id = 2, course = self.course, date = self.first, status = False),
+            Attendance(student_id = 1, course = self.course, date = self.second, status = True),
+            Attendance(student_id = 2, course = self.course, date = self.second, status = True),
+            Attendance(student_id = 3, course = self.course, date = self.second, status = False)])
+
+    def test_build_matrix(self):
+        with self.assertNumQueries(1):
+            matrix = build_matrix(self.course.code)
+        self.assertEqual(matrix.dates, [self.first, self.second])
+        self.assertEqual([(row.student_id, row.name, list(row.cells), tuple(row.summary)) for row in matrix.rows], [
+            (2, 'Alice', [ABSENT, PRESENT], (1, 1)),
+            (3, 'Bob', [NO_RECORD, ABSENT], (0, 1)),
+            (1, 'Carol', [PRESENT, PRESENT], (2, 0))])
+        self.assertEqual([(headcount.present, headcount.absent) for headcount in matrix.headcounts], [(1, 1), (2, 1)])
+        self.assertEqual(str(matrix.rows[1].cells_html), '<td></td><td class="text-danger">A</td>')
+
+        matrix = build_matrix(self.course.code, start = self.second)
+        self.assertEqual(matrix.dates, [self.second])
+        self.assertEqual([list(row.cells) for row in matrix.rows], [[PRESENT], [ABSENT], [PRESENT]])
+
+    def test_bitmap_storage_builds_same_matrix(self):
+        expected = build_matrix(self.course.code)
+        bitmap.rows_to_sessions(self.course.code)
+        Attendance.objects.filter(course = self.course).delete()
+        with override_settings(ATTENDANCE_STORAGE = 'bitmap'):
+            self.assertEqual(build_matrix(self.course.code), expected)
+
+    def test_export_csv(self):
+        session = self.client.session
+        session['faculty_id'] = 1
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        response = self.client.get(reverse('exportAttendance', args = [self.course.code]))
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            'Student ID,Name,2026-09-01,2026-09-08,Present,Absent,Attendance %',
+            '2,Alice,A,P,1,1,50.0',
+            '3,Bob,,A,0,1,0.0',
+            '1,Carol,P,P,2,0,100.0',
+            ',Present,1,2,,,',
+            ',Absent,1,1,,,'])
+        response = self.client.get(reverse('exportAttendance', args = [self.course.code]), {'end': '2026-09-01'})
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 5)
@@ -11,6 +11,11 @@ Các đường dẫn:
 - `/createRecord/<int:code>`: Đường dẫn để tạo bản ghi điểm danh mới cho học sinh với mã là `code`.
 - `/submitAttendance/<int:code>`: Đường dẫn để gửi điểm danh cho học sinh với mã là `code`.
 - `/loadAttendance/<int:code>`: Đường dẫn để tải danh sách điểm danh cho học sinh với mã là `code`.
+- `/attendanceMatrix/<int:code>`: Đường dẫn để xem ma trận điểm danh (sinh viên × ngày) của khóa học với mã là `code`.
+- `/exportAttendance/<int:code>`: Đường dẫn để xuất ma trận điểm danh của khóa học với mã là `code` ra tệp CSV.
+- `/checkin/<int:code>`: Đường dẫn để giảng viên mở/đóng lượt tự check-in và xem mã check-in của khóa học với mã là `code`.
+- `/checkinCode/<int:code>`: Đường dẫn trả về mã check-in hiện tại (JSON) của khóa học với mã là `code`.
+- `/selfCheckin/<int:code>`: Đường dẫn để sinh viên tự check-in vào khóa học với mã là `code`.
 """
 
 urlpatterns = [
@@ -18,4 +23,9 @@ urlpatterns = [
     path('createRecord/<int:code>', views.createRecord, name = 'createRecord'),
     path('submitAttendance/<int:code>', views.submitAttendance, name = 'submitAttendance'),
     path('loadAttendance/<int:code>', views.loadAttendance, name = 'loadAttendance'),
+    path('attendanceMatrix/<int:code>', views.attendanceMatrix, name = 'attendanceMatrix'),
+    path('exportAttendance/<int:code>', views.exportAttendance, name = 'exportAttendance'),
+    path('checkin/<int:code>', views.checkin, name = 'checkin'),
+    path('checkinCode/<int:code>', views.checkinCode, name = 'checkinCode'),
+    path('selfCheckin/<int:code>', views.selfCheckin, name = 'selfCheckin'),
 ]
\ No newline at end of file
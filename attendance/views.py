@@ -1,8 +1,86 @@
+import datetime
+import time
+from urllib.parse import urlencode
+from django.conf import settings
 from django.contrib import messages
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
+from django.utils.dateparse import parse_date
+from . import bitmap
+from .checkin import check_in, checkin_windows
 from . models import Attendance
-from main.models import Student, Course, Faculty
-from main.views import is_faculty_authorised
+from main.models import Student
+from main.views import is_faculty_authorised, is_student_authorised
+from main.course_cache import course_cache
+from main.pagination import paginate
+from .matrix import build_matrix, matrix_csv
+from .services import create_records, submit_records
+from .summary import EMPTY, attendance_summaries
+
+
+# Các cách sắp xếp danh sách sinh viên: tên tham số -> trường order_by của Student
+ROSTER_SORTS = {'name': 'name', 'id': 'student_id'}
+
+# Mã HTTP của từng kết quả tự check-in
+CHECKIN_STATUS = {'queued': 202, 'duplicate': 200, 'invalid': 400, 'closed': 409, 'limited': 429}
+
+
+def roster_options(request):
+    """
+    Đọc bộ lọc và cách sắp xếp danh sách sinh viên từ tham số GET/POST ('q' là tiền tố tên, 'sort').
+
+    Returns:
+        tuple: (tiền tố tên, khóa sắp xếp hợp lệ).
+    """
+    prefix = (request.GET.get('q') or request.POST.get('q') or '').strip()
+    sort = request.GET.get('sort') or request.POST.get('sort') or 'name'
+    if sort not in ROSTER_SORTS:
+        sort = 'name'
+    return prefix, sort
+
+
+def roster_page(request, code, date = None):
+    """
+    Lấy một trang của danh sách sinh viên (khi chưa chọn ngày) hoặc danh sách điểm danh của một ngày.
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest.
+        code (int): Mã khóa học.
+        date (str): Ngày điểm danh, None để lấy danh sách sinh viên đã đăng ký.
+
+    Returns:
+        tuple: (Page, dict ngữ cảnh bộ lọc cho template).
+
+    Notes:
+        - Chỉ tải các cột được hiển thị (.only()); tổng số dòng được lấy từ count_cache.
+        - Khi ATTENDANCE_STORAGE = 'bitmap', các dòng của một ngày là SessionRecord tạo từ bitmap của buổi điểm danh.
+    """
+    prefix, sort = roster_options(request)
+    if date is None:
+        rows = Student.objects.filter(course__code = code).only('student_id', 'name', 'photo')
+        if prefix:
+            rows = rows.filter(name__istartswith = prefix)
+        rows = rows.order_by(ROSTER_SORTS[sort], 'student_id')
+    elif bitmap.enabled():
+        # Điểm danh lưu dạng bitmap: lấy trạng thái của buổi từ một dòng, danh sách là các sinh viên của buổi
+        statuses = bitmap.session_statuses(code, date)
+        rows = Student.objects.filter(student_id__in = list(statuses)).only('student_id', 'name', 'photo')
+        if prefix:
+            rows = rows.filter(name__istartswith = prefix)
+        rows = rows.order_by(ROSTER_SORTS[sort], 'student_id')
+    else:
+        rows = Attendance.objects.filter(course_id = code, date = date).select_related('student').only(
+            'id', 'status', 'student', 'student__name', 'student__photo')
+        if prefix:
+            rows = rows.filter(student__name__istartswith = prefix)
+        rows = rows.order_by('student__' + ROSTER_SORTS[sort], 'student_id')
+    page_obj = paginate(request, rows, settings.ROSTER_PAGE_SIZE, 'roster', (code, date, prefix.lower()))
+    if date is not None and bitmap.enabled():
+        page_obj.object_list = [bitmap.SessionRecord(student, statuses[student.student_id]) for student in page_obj]
+    params = {'q': prefix, 'sort': sort}
+    if date is not None:
+        params['date'] = date
+    return page_obj, {'page_obj': page_obj, 'q': prefix, 'sort': sort, 'query': urlencode(params)}
 
 
 def attendance(request, code):
@@ -11,17 +89,20 @@ def attendance(request, code):
 
     Args:
         request (HttpRequest): Đối tượng HttpRequest.
+            Tham số GET: 'q' (tiền tố tên sinh viên), 'sort' ('name' hoặc 'id') và 'page'.
 
     Returns:
         HttpResponse: Đối tượng HttpResponse chứa trang HTML hiển thị danh sách điểm danh.
     """
     if is_faculty_authorised(request, code):
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code = code)
-        # Lấy danh sách sinh viên của khóa học
-        students = Student.objects.filter(course__code = code)
+        course = course_cache.get(code)
+        # Lấy một trang danh sách sinh viên của khóa học
+        students, options = roster_page(request, code)
 
-        return render(request, 'attendance/attendance.html', {'students': students, 'course': course, 'faculty': Faculty.objects.get(course=course)})
+        return render(request, 'attendance/attendance.html', {'students': students, 'course': course, 'faculty': request.principal, **options})
+    else:
+        return redirect('std_login')
 
 
 def createRecord(request, code):
@@ -43,19 +124,13 @@ def createRecord(request, code):
             # Lấy ngày điểm danh từ dữ liệu POST
             date = request.POST['dateCreate']
             # Lấy thông tin khóa học dựa trên mã khóa học
-            course = Course.objects.get(code = code)
-            # Lấy danh sách sinh viên của khóa học
-            students = Student.objects.filter(course__code = code)
-            # Kiểm tra xem bản ghi điểm danh đã tồn tại cho ngày đã cho hay chưa
-            if Attendance.objects.filter(date = date, course = course).exists():
-                return render(request, 'attendance/attendance.html', {'code': code, 'students': students, 'course': course, 'faculty': Faculty.objects.get(course=course), 'error': "Attendance record already exists for the date " + date})
+            course = course_cache.get(code)
+            # Tạo bản ghi điểm danh cho mọi sinh viên của khóa học bằng một lệnh bulk_create
+            if create_records(course, date) is None:
+                # Bản ghi điểm danh đã tồn tại cho ngày đã cho
+                roster, options = roster_page(request, code)
+                return render(request, 'attendance/attendance.html', {'code': code, 'students': roster, 'course': course, 'faculty': request.principal, 'error': "Attendance record already exists for the date " + date, **options})
             else:
-                # Tạo bản ghi điểm danh cho từng sinh viên trong khóa học
-                for student in students:
-                    attendance = Attendance(
-                        student=student, course = course, date = date, status = False)
-                    attendance.save()
-
                 messages.success(
                     request, 'Attendance record created successfully for the date ' + date)
                 return redirect('/attendance/' + str(code))
@@ -71,6 +146,7 @@ def loadAttendance(request, code):
 
     Args:
         request (HttpRequest): Đối tượng HttpRequest.
+            Ngày điểm danh lấy từ 'date' (POST hoặc GET); hỗ trợ 'q', 'sort' và 'page' như view attendance.
         code (int): Mã khóa học.
 
     Returns:
@@ -80,20 +156,25 @@ def loadAttendance(request, code):
         Redirect: Nếu người dùng không được ủy quyền hoặc chưa đăng nhập, chuyển hướng đến trang đăng nhập.
     """
     if is_faculty_authorised(request, code):
-        if request.method == 'POST':
-            # Lấy ngày điểm danh từ dữ liệu POST
-            date = request.POST['date']
+        # Lấy ngày điểm danh từ form (POST) hoặc từ liên kết phân trang (GET)
+        date = request.POST.get('date') or request.GET.get('date')
+        if date:
             # Lấy thông tin khóa học dựa trên mã khóa học
-            course = Course.objects.get(code = code)
-            # Lấy danh sách sinh viên của khóa học
-            students = Student.objects.filter(course__code = code)
-            # Lấy danh sách điểm danh dựa trên khóa học và ngày điểm danh
-            attendance = Attendance.objects.filter(course = course, date = date)
+            course = course_cache.get(code)
+            # Lấy một trang danh sách điểm danh dựa trên khóa học và ngày điểm danh
+            attendance, options = roster_page(request, code, date)
             # Kiểm tra xem có bản ghi điểm danh nào tồn tại cho ngày đã cho hay không
-            if attendance.exists():
-                return render(request, 'attendance/attendance.html', {'code': code, 'students': students, 'course': course, 'faculty': Faculty.objects.get(course=course), 'attendance': attendance, 'date': date})
+            if attendance.paginator.count:
+                # Tổng số buổi có mặt/vắng mặt trong khóa học của mọi sinh viên (một truy vấn GROUP BY hoặc từ cache)
+                summaries = attendance_summaries.get(code)
+                for record in attendance:
+                    record.summary = summaries.get(record.student_id, EMPTY)
+                return render(request, 'attendance/attendance.html', {'code': code, 'course': course, 'faculty': request.principal, 'attendance': attendance, 'date': date, **options})
             else:
-                return render(request, 'attendance/attendance.html', {'code': code, 'students': students, 'course': course, 'faculty': Faculty.objects.get(course=course), 'error': 'Could not load. Attendance record does not exist for the date ' + date})
+                students, options = roster_page(request, code)
+                return render(request, 'attendance/attendance.html', {'code': code, 'students': students, 'course': course, 'faculty': request.principal, 'error': 'Could not load. Attendance record does not exist for the date ' + date, **options})
+        else:
+            return redirect('/attendance/' + str(code))
 
     else:
         return redirect('std_login')
@@ -113,25 +194,20 @@ def submitAttendance(request, code):
     Raises:
         Redirect: Nếu người dùng không được ủy quyền hoặc chưa đăng nhập, chuyển hướng đến trang đăng nhập.
     """
+    if not is_faculty_authorised(request, code):
+        return redirect('std_login')
     try:
-        # Lấy danh sách sinh viên của khóa học
-        students = Student.objects.filter(course__code = code)
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code = code)
+        course = course_cache.get(code)
 
         if request.method == 'POST':
             # Lấy ngày điểm danh từ dữ liệu POST
             date = request.POST['datehidden']
-            for student in students:
-                # Lấy bản ghi điểm danh dựa trên sinh viên, khóa học và ngày điểm danh
-                attendance = Attendance.objects.get(student = student, course = course, date = date)
-                if request.POST.get(str(student.student_id)) == '1':
-                    # Đánh dấu sinh viên có mặt
-                    attendance.status = True
-                else:
-                    # Đánh dấu sinh viên vắng mặt
-                    attendance.status = False
-                attendance.save()
+            # Danh sách được phân trang: chỉ cập nhật các sinh viên hiển thị trên trang đã gửi
+            student_ids = request.POST.getlist('students') or Student.objects.filter(course__code = code).values_list('student_id', flat = True)
+            present_ids = {student_id for student_id in student_ids if request.POST.get(str(student_id)) == '1'}
+            # Cập nhật các bản ghi của ngày bằng một truy vấn đọc và một lệnh bulk_update
+            submit_records(course, date, student_ids, present_ids)
 
             # Gửi thông báo thành công
             messages.success(
@@ -139,7 +215,139 @@ def submitAttendance(request, code):
             return redirect('/attendance/' + str(code))
         else:
             # Hiển thị trang HTML điểm danh
-            return render(request, 'attendance/attendance.html', {'code': code, 'students': students, 'course': course, 'faculty': Faculty.objects.get(course=course)})
+            roster, options = roster_page(request, code)
+            return render(request, 'attendance/attendance.html', {'code': code, 'students': roster, 'course': course, 'faculty': request.principal, **options})
     except:
         # Hiển thị trang HTML với thông báo lỗi
-        return render(request, 'attendance/attendance.html', {'code': code, 'error': "Error! could not save", 'students': students, 'course': course, 'faculty': Faculty.objects.get(course=course)})
+        roster, options = roster_page(request, code)
+        return render(request, 'attendance/attendance.html', {'code': code, 'error': "Error! could not save", 'students': roster, 'course': course, 'faculty': request.principal, **options})
+
+
+def date_range(request):
+    """
+    Đọc khoảng ngày từ tham số GET 'start' và 'end' (YYYY-MM-DD); giá trị trống hoặc không hợp lệ được bỏ qua.
+
+    Returns:
+        tuple: (ngày bắt đầu, ngày kết thúc), mỗi giá trị là date hoặc None.
+    """
+    dates = []
+    for name in ('start', 'end'):
+        try:
+            dates.append(parse_date(request.GET.get(name) or ''))
+        except ValueError:
+            dates.append(None)
+    return tuple(dates)
+
+
+def attendanceMatrix(request, code):
+    """
+    Xem ma trận điểm danh của khóa học: mỗi sinh viên một hàng, mỗi buổi điểm danh một cột, kèm tổng của hàng và cột.
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest.
+            Tham số GET: 'start' và 'end' (khoảng ngày, tùy chọn).
+        code (int): Mã khóa học.
+
+    Returns:
+        HttpResponse: Đối tượng HttpResponse chứa trang HTML hiển thị ma trận điểm danh.
+    """
+    if is_faculty_authorised(request, code):
+        course = course_cache.get(code)
+        start, end = date_range(request)
+        matrix = build_matrix(code, start, end)
+        return render(request, 'attendance/matrix.html', {'course': course, 'faculty': request.principal, 'matrix': matrix,
+                                                          'start': start, 'end': end,
+                                                          'query': urlencode({'start': start or '', 'end': end or ''})})
+    else:
+        return redirect('std_login')
+
+
+def exportAttendance(request, code):
+    """
+    Xuất ma trận điểm danh của khóa học ra tệp CSV, được truyền dần từng dòng.
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest.
+            Tham số GET: 'start' và 'end' (khoảng ngày, tùy chọn).
+        code (int): Mã khóa học.
+
+    Returns:
+        StreamingHttpResponse: Tệp CSV (text/csv) tải về.
+    """
+    if is_faculty_authorised(request, code):
+        start, end = date_range(request)
+        response = StreamingHttpResponse(matrix_csv(build_matrix(code, start, end)), content_type = 'text/csv')
+        response['Content-Disposition'] = 'attachment; filename="attendance-%s.csv"' % code
+        return response
+    else:
+        return redirect('std_login')
+
+
+def checkin(request, code):
+    """
+    Trang điểm danh tự check-in của giảng viên: mở/đóng lượt check-in của ngày hôm nay và hiển thị mã xoay vòng.
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest.
+            Dữ liệu POST: 'action' là 'open' (mở, tạo bản ghi điểm danh của ngày nếu chưa có) hoặc 'close'.
+        code (int): Mã khóa học.
+
+    Returns:
+        HttpResponse: Đối tượng HttpResponse chứa trang HTML check-in.
+    """
+    if not is_faculty_authorised(request, code):
+        return redirect('std_login')
+    course = course_cache.get(code)
+    if request.method == 'POST':
+        if request.POST.get('action') == 'open':
+            today = datetime.date.today()
+            create_records(course, today)
+            checkin_windows.open(code, today)
+            messages.success(request, 'Check-in opened for ' + today.isoformat())
+        else:
+            checkin_windows.close(code)
+            messages.success(request, 'Check-in closed')
+        return redirect('checkin', code)
+    return render(request, 'attendance/checkin.html', {'course': course, 'faculty': request.principal,
+                                                       'window': checkin_windows.get(code)})
+
+
+def checkinCode(request, code):
+    """
+    Mã check-in hiện tại của khóa học (JSON), được trang check-in của giảng viên gọi định kỳ.
+
+    Returns:
+        JsonResponse: {'open', 'code', 'expires_in', 'closes_in', 'checked_in'}. Mã 403 nếu không có quyền.
+    """
+    if not is_faculty_authorised(request, code):
+        return JsonResponse({'open': False}, status = 403)
+    window = checkin_windows.get(code)
+    if window is None:
+        return JsonResponse({'open': False})
+    current, expires_in = checkin_windows.current_code(window)
+    return JsonResponse({'open': True, 'code': current, 'expires_in': expires_in,
+                         'closes_in': max(0, int(window.closes_at - time.time())), 'checked_in': len(window.checked_in)})
+
+
+def selfCheckin(request, code):
+    """
+    Sinh viên tự check-in bằng mã xoay vòng do giảng viên hiển thị (JSON).
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest; dữ liệu POST 'code' là mã check-in.
+        code (int): Mã khóa học.
+
+    Returns:
+        JsonResponse: {'status': 'queued' | 'duplicate' | 'invalid' | 'closed' | 'limited'}. Mã 202 khi check-in được ghi nhận,
+        200 nếu đã check-in trước đó, 400 nếu mã sai, 409 nếu không có lượt check-in nào đang mở, 429 nếu đã nhập sai mã
+        quá số lần cho phép, 403 nếu không có quyền.
+
+    Notes:
+        - Mã được kiểm tra trong bộ nhớ và lần check-in được gộp vào bộ đệm ghi theo lô (attendance/checkin.py),
+          nên request không truy vấn cơ sở dữ liệu.
+    """
+    if request.method != 'POST' or not is_student_authorised(request, code):
+        return JsonResponse({'status': 'forbidden'}, status = 403)
+    result = check_in(code, int(request.session['student_id']), request.POST.get('code'))
+    return JsonResponse({'status': result}, status = CHECKIN_STATUS[result])
+
@@ -2,6 +2,7 @@ from django.shortcuts import redirect, render
 from discussion.models import FacultyDiscussion, StudentDiscussion
 from main.models import Student, Faculty, Course
 from main.views import is_faculty_authorised, is_student_authorised
+from main.course_cache import course_cache
 from itertools import chain
 from .forms import StudentDiscussionForm, FacultyDiscussionForm
 
@@ -65,8 +66,8 @@ def discussion(request, code):
     """
 
     if is_student_authorised(request, code):
-        course = Course.objects.get(code = code)
-        student = Student.objects.get(student_id=request.session['student_id'])
+        course = course_cache.get(code)
+        student = request.principal
         discussions = context_list(course)
         form = StudentDiscussionForm()
         context = {
@@ -78,8 +79,8 @@ def discussion(request, code):
         return render(request, 'discussion/discussion.html', context)
 
     elif is_faculty_authorised(request, code):
-        course = Course.objects.get(code = code)
-        faculty = Faculty.objects.get(faculty_id = request.session['faculty_id'])
+        course = course_cache.get(code)
+        faculty = request.principal
         discussions = context_list(course)
         form = FacultyDiscussionForm()
         context = {
@@ -118,7 +119,7 @@ def send(request, code, std_id):
             form = StudentDiscussionForm(request.POST)
             if form.is_valid():
                 content = form.cleaned_data['content']
-                course = Course.objects.get(code = code)
+                course = course_cache.get(code)
                 try:
                     student = Student.objects.get(student_id = std_id)
                 except:
@@ -159,7 +160,7 @@ def send_fac(request, code, fac_id):
             form = FacultyDiscussionForm(request.POST)
             if form.is_valid():
                 content = form.cleaned_data['content']
-                course = Course.objects.get(code = code)
+                course = course_cache.get(code)
                 try:
                     faculty = Faculty.objects.get(faculty_id = fac_id)
                 except:
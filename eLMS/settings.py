@@ -52,6 +52,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'main.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware'
 
@@ -166,3 +167,48 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 SESSION_EXPIRE_AT_BROWSER_CLOSE = True
+
+
+# Thời gian sống (giây) của chỉ mục quyền truy cập khóa học trong bộ nhớ tiến trình
+AUTHORIZATION_INDEX_TTL = 60
+
+# Cache LRU cho các bản ghi Course trong bộ nhớ tiến trình: số mục tối đa và thời gian sống (giây)
+COURSE_CACHE_SIZE = 256
+COURSE_CACHE_TTL = 300
+
+# Số mục mỗi trang (phân trang theo con trỏ) của các danh sách trên trang khóa học
+COURSE_STREAM_PAGE_SIZES = {'announcements': 10, 'assignments': 3, 'materials': 10}
+
+# Phân trang theo số trang cho danh sách khóa học và danh sách sinh viên điểm danh, cùng thời gian sống (giây) của cache COUNT(*)
+COURSE_CATALOGUE_PAGE_SIZE = 20
+ROSTER_PAGE_SIZE = 50
+COUNT_CACHE_TTL = 60
+
+# Số đề thi (câu hỏi đã render sẵn) tối đa được lưu trong bộ nhớ tiến trình
+QUIZ_PAPER_CACHE_SIZE = 64
+
+# Số kết quả phân tích câu hỏi (cần NumPy) tối đa được lưu trong bộ nhớ tiến trình
+ITEM_ANALYSIS_CACHE_SIZE = 32
+
+# Câu hỏi có nhiều câu trả lời hơn ngưỡng này được chấm lại trong luồng nền khi đáp án hoặc điểm thay đổi
+QUIZ_REGRADE_BACKGROUND_THRESHOLD = 500
+
+# Bộ đệm autosave: số bài làm chờ ghi để ghi ngay, và thời gian (giây) tối đa một thay đổi nằm trong bộ đệm
+AUTOSAVE_FLUSH_SIZE = 50
+AUTOSAVE_FLUSH_INTERVAL = 5
+
+# Số khóa học tối đa có tổng hợp điểm danh (có mặt/vắng mặt theo sinh viên) được lưu trong bộ nhớ tiến trình, 0 để tắt cache
+ATTENDANCE_SUMMARY_CACHE_SIZE = 128
+
+# Cách lưu điểm danh: 'rows' (một bản ghi Attendance cho mỗi sinh viên mỗi ngày) hoặc 'bitmap' (một dòng AttendanceSession
+# cho mỗi buổi). Chuyển dữ liệu có sẵn bằng `python manage.py convert_attendance_storage --to bitmap`.
+ATTENDANCE_STORAGE = 'rows'
+
+# Điểm danh tự check-in: chu kỳ đổi mã (giây), thời gian mở mặc định (giây), số lần nhập sai mã tối đa của mỗi sinh viên
+# trong một lượt check-in, và bộ đệm ghi theo lô (số sinh viên chờ ghi để ghi ngay, thời gian tối đa (giây) một lần
+# check-in nằm trong bộ đệm)
+ATTENDANCE_CHECKIN_CODE_PERIOD = 30
+ATTENDANCE_CHECKIN_DURATION = 600
+ATTENDANCE_CHECKIN_MAX_FAILURES = 5
+ATTENDANCE_CHECKIN_FLUSH_SIZE = 200
+ATTENDANCE_CHECKIN_FLUSH_INTERVAL = 0.3
@@ -2,4 +2,9 @@ from django.apps import AppConfig
 
 class MainConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'  # Cấu hình trường khóa tự động mặc định
-    name = 'main'  # Tên ứng dụng
\ No newline at end of file
+    name = 'main'  # Tên ứng dụng
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from . import signals  # Đăng ký các signal vô hiệu hóa cache và cập nhật chỉ mục
+        post_migrate.connect(signals.create_search_index, sender = self)
\ No newline at end of file
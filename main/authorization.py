@@ -0,0 +1,98 @@
+import threading
+import time
+from django.conf import settings
+from .models import Student, Course
+
+
+class AuthorizationIndex:
+    """
+    Chỉ mục quyền truy cập khóa học, lưu trong bộ nhớ của tiến trình.
+
+    Với mỗi sinh viên, chỉ mục lưu tập mã khóa học đã đăng ký; với mỗi giảng viên, tập mã khóa học phụ trách.
+    Khi cache nóng, việc kiểm tra quyền là một phép tra cứu O(1); khi cache nguội, chỉ cần một truy vấn có chỉ mục.
+
+    Thuộc tính:
+        - ttl: Thời gian sống (giây) của mỗi mục, giới hạn độ trễ giữa các tiến trình (cấu hình AUTHORIZATION_INDEX_TTL).
+
+    Notes:
+        - Mỗi mục được gắn phiên bản (thế hệ của vai trò, phiên bản của người dùng). Việc vô hiệu hóa tăng phiên bản,
+          nên một truy vấn đang chạy song song sẽ không ghi đè dữ liệu cũ vào cache.
+        - Việc vô hiệu hóa được gọi bởi các signal trong main/signals.py.
+    """
+
+    STUDENT = 'student'
+    FACULTY = 'faculty'
+
+    def __init__(self, ttl = None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'AUTHORIZATION_INDEX_TTL', 60)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._versions = {}
+        self._generations = {self.STUDENT: 0, self.FACULTY: 0}
+
+    def _version(self, key):
+        return (self._generations[key[0]], self._versions.get(key, 0))
+
+    def _lookup(self, role, pk, loader):
+        try:
+            key = (role, int(pk))
+        except (TypeError, ValueError):
+            return frozenset()
+
+        with self._lock:
+            version = self._version(key)
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and entry[1] > time.monotonic():
+                return entry[2]
+
+        codes = frozenset(loader(key[1]))
+
+        with self._lock:
+            # Chỉ lưu nếu không có lần vô hiệu hóa nào xảy ra trong lúc truy vấn
+            if self._version(key) == version:
+                self._entries[key] = (version, time.monotonic() + self.ttl, codes)
+        return codes
+
+    def student_courses(self, student_id):
+        """Trả về tập mã khóa học mà sinh viên đã đăng ký."""
+        return self._lookup(self.STUDENT, student_id, lambda pk: Student.course.through.objects.filter(
+            student_id = pk).values_list('course_id', flat = True))
+
+    def faculty_courses(self, faculty_id):
+        """Trả về tập mã khóa học mà giảng viên phụ trách."""
+        return self._lookup(self.FACULTY, faculty_id, lambda pk: Course.objects.filter(
+            faculty_id = pk).values_list('code', flat = True))
+
+    def is_student_enrolled(self, student_id, code):
+        """Kiểm tra sinh viên có đăng ký khóa học hay không."""
+        return code in self.student_courses(student_id)
+
+    def is_faculty_owner(self, faculty_id, code):
+        """Kiểm tra giảng viên có phụ trách khóa học hay không."""
+        return code in self.faculty_courses(faculty_id)
+
+    def _invalidate(self, role, pk = None):
+        with self._lock:
+            if pk is None:
+                self._generations[role] += 1
+                self._entries = {key: entry for key, entry in self._entries.items() if key[0] != role}
+            else:
+                key = (role, int(pk))
+                self._versions[key] = self._versions.get(key, 0) + 1
+                self._entries.pop(key, None)
+
+    def invalidate_student(self, student_id = None):
+        """Vô hiệu hóa mục của một sinh viên, hoặc của tất cả sinh viên nếu student_id là None."""
+        self._invalidate(self.STUDENT, student_id)
+
+    def invalidate_faculty(self, faculty_id = None):
+        """Vô hiệu hóa mục của một giảng viên, hoặc của tất cả giảng viên nếu faculty_id là None."""
+        self._invalidate(self.FACULTY, faculty_id)
+
+    def clear(self):
+        """Xóa toàn bộ chỉ mục."""
+        self.invalidate_student()
+        self.invalidate_faculty()
+
+
+authorization_index = AuthorizationIndex()
@@ -0,0 +1,83 @@
+import bisect
+import threading
+from .models import Course
+
+
+class CourseAutocomplete:
+    """
+    Chỉ mục gợi ý (autocomplete) trong bộ nhớ tiến trình cho mã và tên khóa học.
+
+    Chỉ mục là một mảng khóa đã sắp xếp; tìm tiền tố bằng bisect nên mỗi lần gõ phím chỉ tốn O(log n + k)
+    và không truy vấn cơ sở dữ liệu.
+
+    Notes:
+        - Mỗi khóa học được đánh chỉ mục theo mã, tên đầy đủ và từng từ trong tên (không phân biệt hoa thường).
+        - Chỉ mục được xây dựng lười ở lần tra cứu đầu tiên và bị vô hiệu hóa bởi các signal của Course và Department.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys = None
+        self._codes = None
+        self._courses = None
+        self._generation = 0
+
+    def _build(self):
+        keys = []
+        courses = {}
+        for code, name, department in Course.objects.values_list('code', 'name', 'department__name'):
+            courses[code] = {'code': code, 'name': name, 'department': department}
+            terms = {str(code), name.lower()}
+            terms.update(word for word in name.lower().split())
+            keys.extend((term, code) for term in terms)
+        keys.sort()
+        return [key for key, _ in keys], [code for _, code in keys], courses
+
+    def _index(self):
+        with self._lock:
+            if self._keys is not None:
+                return self._keys, self._codes, self._courses
+            generation = self._generation
+
+        keys, codes, courses = self._build()
+
+        with self._lock:
+            # Bỏ qua nếu có lần vô hiệu hóa nào xảy ra trong lúc xây dựng
+            if generation == self._generation:
+                self._keys, self._codes, self._courses = keys, codes, courses
+        return keys, codes, courses
+
+    def complete(self, prefix, limit = 10):
+        """
+        Trả về các khóa học có mã hoặc tên (hay một từ trong tên) bắt đầu bằng tiền tố.
+
+        Args:
+            prefix (str): Chuỗi người dùng đang gõ.
+            limit (int): Số kết quả tối đa.
+
+        Returns:
+            list[dict]: Danh sách {'code', 'name', 'department'}, sắp xếp theo khóa khớp.
+        """
+        prefix = (prefix or '').strip().lower()
+        if not prefix:
+            return []
+        keys, codes, courses = self._index()
+        results = []
+        seen = set()
+        i = bisect.bisect_left(keys, prefix)
+        while i < len(keys) and len(results) < limit and keys[i].startswith(prefix):
+            code = codes[i]
+            if code not in seen:
+                seen.add(code)
+                results.append(courses[code])
+            i += 1
+        return results
+
+    def invalidate(self):
+        """Vô hiệu hóa chỉ mục, chỉ mục sẽ được xây dựng lại ở lần tra cứu tiếp theo."""
+        with self._lock:
+            self._generation += 1
+            self._keys = self._codes = self._courses = None
+
+
+course_autocomplete = CourseAutocomplete()
@@ -0,0 +1,101 @@
+import copy
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from .models import Course
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'invalidations', 'maxsize', 'currsize'])
+
+
+class CourseCache:
+    """
+    Cache LRU trong bộ nhớ tiến trình cho các bản ghi Course, khóa theo mã khóa học.
+
+    Mỗi Course được tải kèm Department và Faculty (select_related) nên template không phát sinh thêm truy vấn.
+
+    Thuộc tính:
+        - maxsize: Số khóa học tối đa được lưu (cấu hình COURSE_CACHE_SIZE).
+        - ttl: Thời gian sống (giây) của mỗi mục (cấu hình COURSE_CACHE_TTL).
+
+    Notes:
+        - get() trả về một bản sao nông của đối tượng được cache, view có thể gán thuộc tính mà không ảnh hưởng request khác.
+        - Các signal save/delete của Course, Department và Faculty trong main/signals.py vô hiệu hóa các mục liên quan.
+        - cache_info() trả về số lần hit/miss để điều chỉnh kích thước cache.
+    """
+
+    def __init__(self, maxsize = None, ttl = None):
+        self.maxsize = maxsize if maxsize is not None else getattr(settings, 'COURSE_CACHE_SIZE', 256)
+        self.ttl = ttl if ttl is not None else getattr(settings, 'COURSE_CACHE_TTL', 300)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, code):
+        """
+        Trả về khóa học có mã tương ứng.
+
+        Raises:
+            Course.DoesNotExist: Nếu không tìm thấy khóa học với mã tương ứng.
+        """
+        try:
+            code = int(code)
+        except (TypeError, ValueError):
+            raise Course.DoesNotExist('Course matching query does not exist.')
+
+        with self._lock:
+            entry = self._entries.get(code)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(code)
+                self.hits += 1
+                return copy.copy(entry[1])
+            self.misses += 1
+            generation = self._generation
+
+        course = Course.objects.select_related('department', 'faculty').get(code = code)
+
+        with self._lock:
+            # Bỏ qua nếu có lần vô hiệu hóa nào xảy ra trong lúc truy vấn
+            if generation == self._generation and self.maxsize > 0:
+                self._entries[code] = (time.monotonic() + self.ttl, course)
+                self._entries.move_to_end(code)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last = False)
+                    self.evictions += 1
+        return copy.copy(course)
+
+    def _invalidate_where(self, predicate):
+        with self._lock:
+            self._generation += 1
+            for code in [code for code, entry in self._entries.items() if predicate(entry[1])]:
+                del self._entries[code]
+                self.invalidations += 1
+
+    def invalidate(self, code):
+        """Vô hiệu hóa một khóa học."""
+        self._invalidate_where(lambda course: course.code == code)
+
+    def invalidate_department(self, department_id):
+        """Vô hiệu hóa các khóa học thuộc một bộ môn."""
+        self._invalidate_where(lambda course: course.department_id == department_id)
+
+    def invalidate_faculty(self, faculty_id):
+        """Vô hiệu hóa các khóa học do một giảng viên phụ trách."""
+        self._invalidate_where(lambda course: course.faculty_id == faculty_id)
+
+    def clear(self):
+        """Xóa toàn bộ cache (không đặt lại bộ đếm)."""
+        self._invalidate_where(lambda course: True)
+
+    def cache_info(self):
+        """Trả về thống kê hit/miss của cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions, self.invalidations, self.maxsize, len(self._entries))
+
+
+course_cache = CourseCache()
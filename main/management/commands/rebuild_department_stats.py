@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+from main.models import Department, Student, Faculty, Course
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị tính lại các cột thống kê của Department (số sinh viên, giảng viên, khóa học).
+
+    Cách dùng:
+        python manage.py rebuild_department_stats            # Tính lại và báo cáo các bộ môn bị lệch
+        python manage.py rebuild_department_stats --dry-run  # Chỉ báo cáo, không ghi
+    """
+
+    help = 'Rebuild the student/faculty/course totals stored on each Department and report mismatches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action = 'store_true', help = 'Only report mismatched totals, do not write.')
+
+    def handle(self, *args, **options):
+        def totals(model):
+            return dict(model.objects.order_by().values_list('department_id').annotate(total = Count('pk')))
+
+        students, faculty, courses = totals(Student), totals(Faculty), totals(Course)
+        mismatched = 0
+        for dep in Department.objects.all():
+            stored = (dep.student_total, dep.faculty_total, dep.course_total)
+            actual = (students.get(dep.pk, 0), faculty.get(dep.pk, 0), courses.get(dep.pk, 0))
+            if stored != actual:
+                mismatched += 1
+                self.stdout.write('%s (%s): stored %s, actual %s' % (dep.name, dep.department_id, stored, actual))
+
+        if options['dry_run']:
+            self.stdout.write('%d department(s) out of sync.' % mismatched)
+            return
+
+        Department.update_stats()
+        self.stdout.write(self.style.SUCCESS('Reconciled %d department(s).' % mismatched))
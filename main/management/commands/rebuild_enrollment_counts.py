@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from main.models import Course
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị tính lại và đối chiếu Course.enrolled_count với bảng đăng ký.
+
+    Cách dùng:
+        python manage.py rebuild_enrollment_counts            # Đối chiếu và sửa các khóa học bị lệch
+        python manage.py rebuild_enrollment_counts --dry-run  # Chỉ báo cáo, không ghi
+
+    Các tiến trình server đang chạy sẽ thấy giá trị mới sau tối đa COURSE_CACHE_TTL giây.
+    """
+
+    help = 'Rebuild Course.enrolled_count from the enrollment table and report mismatches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action = 'store_true', help = 'Only report mismatched counts, do not write.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            courses = Course.objects.annotate(actual = Count('students')).only('code', 'name', 'enrolled_count')
+            mismatched = []
+            for course in courses:
+                if course.enrolled_count != course.actual:
+                    self.stdout.write('%s (%s): stored %d, actual %d' % (course.name, course.code, course.enrolled_count, course.actual))
+                    course.enrolled_count = course.actual
+                    mismatched.append(course)
+
+            if options['dry_run']:
+                self.stdout.write('%d course(s) out of sync.' % len(mismatched))
+                return
+
+            Course.objects.bulk_update(mismatched, ['enrolled_count'], batch_size = 500)
+
+        self.stdout.write(self.style.SUCCESS('Reconciled %d course(s).' % len(mismatched)))
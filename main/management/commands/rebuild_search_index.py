@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from main import search
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị xây dựng lại chỉ mục tìm kiếm toàn văn (FTS5).
+
+    Cách dùng:
+        python manage.py rebuild_search_index
+    """
+
+    help = 'Rebuild the FTS5 full-text search index over courses, announcements, materials and assignments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type = int, default = 1000, help = 'Number of documents inserted per statement batch.')
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError('Full-text search requires SQLite with the FTS5 extension.')
+        with transaction.atomic():
+            total = search.rebuild(batch_size = options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Indexed %d document(s).' % total))
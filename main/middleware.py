@@ -0,0 +1,73 @@
+from django.utils.functional import SimpleLazyObject
+from .models import Student, Faculty
+from .authorization import authorization_index
+
+
+def get_principal(request):
+    """
+    Lấy người dùng đang đăng nhập (sinh viên hoặc giảng viên) từ session.
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest đại diện cho yêu cầu gửi đến server.
+
+    Returns:
+        Student | Faculty | None: Sinh viên hoặc giảng viên tương ứng với session, None nếu chưa đăng nhập.
+
+    Notes:
+        - Kết quả được lưu trên request nên mỗi request chỉ truy vấn cơ sở dữ liệu tối đa một lần.
+    """
+    if not hasattr(request, '_cached_principal'):
+        principal = None
+        try:
+            if request.session.get('student_id'):
+                principal = Student.objects.get(student_id = request.session['student_id'])
+            elif request.session.get('faculty_id'):
+                principal = Faculty.objects.get(faculty_id = request.session['faculty_id'])
+        except (Student.DoesNotExist, Faculty.DoesNotExist, ValueError):
+            principal = None
+        request._cached_principal = principal
+    return request._cached_principal
+
+
+def get_course_codes(request):
+    """
+    Lấy tập mã các khóa học mà người dùng đang đăng nhập đã đăng ký (sinh viên) hoặc phụ trách (giảng viên).
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest đại diện cho yêu cầu gửi đến server.
+
+    Returns:
+        frozenset: Tập mã khóa học, rỗng nếu chưa đăng nhập.
+
+    Notes:
+        - Tập mã được đọc từ AuthorizationIndex nên không cần tải đối tượng người dùng.
+    """
+    if not hasattr(request, '_cached_course_codes'):
+        if request.session.get('student_id'):
+            codes = authorization_index.student_courses(request.session['student_id'])
+        elif request.session.get('faculty_id'):
+            codes = authorization_index.faculty_courses(request.session['faculty_id'])
+        else:
+            codes = frozenset()
+        request._cached_course_codes = codes
+    return request._cached_course_codes
+
+
+class PrincipalMiddleware:
+    """
+    Middleware gắn người dùng đang đăng nhập vào request.
+
+    Thuộc tính được gắn:
+        - request.principal: Sinh viên hoặc giảng viên đang đăng nhập (None nếu chưa đăng nhập).
+        - request.course_codes: Tập mã khóa học đã đăng ký hoặc phụ trách.
+
+    Cả hai thuộc tính đều được tải lười (lazy), chỉ truy vấn khi view thực sự sử dụng.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.principal = SimpleLazyObject(lambda: get_principal(request))
+        request.course_codes = SimpleLazyObject(lambda: get_course_codes(request))
+        return self.get_response(request)
@@ -1,9 +1,37 @@
 from django.db import models
+from django.db.models.functions import Coalesce
 from froala_editor.fields import FroalaField
 # Create your models here.
 
 
-class Student(models.Model):
+class LoadedValuesMixin:
+    """
+    Ghi nhớ giá trị của các trường trong tracked_fields lúc đối tượng được tải từ cơ sở dữ liệu.
+
+    Các signal pre_save dùng loaded_value() để biết giá trị cũ (ví dụ bộ môn cũ) mà không cần truy vấn lại.
+    """
+
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = {name: value for name, value in zip(field_names, values)
+                                   if name in cls.tracked_fields and value is not models.DEFERRED}
+        return instance
+
+    def loaded_value(self, name, default = None):
+        """Giá trị của trường name lúc tải từ cơ sở dữ liệu, default nếu đối tượng không được tải hoặc trường bị hoãn."""
+        return getattr(self, '_loaded_values', {}).get(name, default)
+
+    def remember_loaded(self, *names):
+        """Cập nhật giá trị đã ghi nhớ sau khi lưu, để lần lưu tiếp theo so sánh với giá trị vừa ghi."""
+        if not hasattr(self, '_loaded_values'):
+            self._loaded_values = {}
+        self._loaded_values.update((name, getattr(self, name)) for name in names)
+
+
+class Student(LoadedValuesMixin, models.Model):
     """
     Mô hình đại diện cho sinh viên.
 
@@ -22,6 +50,7 @@ class Student(models.Model):
 
     Meta:
         verbose_name_plural: Tên số nhiều của lớp Student.
+        indexes: Chỉ mục theo tên phục vụ sắp xếp danh sách sinh viên.
 
     """
 
@@ -37,6 +66,8 @@ class Student(models.Model):
     department = models.ForeignKey(
         'Department', on_delete = models.CASCADE, null = False, blank = False, related_name = 'students')
 
+    tracked_fields = ('department_id',)
+
     def delete(self, *args, **kwargs):
         if self.photo != 'profile_pics/default_student.png':
             self.photo.delete()
@@ -44,12 +75,13 @@ class Student(models.Model):
 
     class Meta:
         verbose_name_plural = 'Students'
+        indexes = [models.Index(fields = ['name'])]
 
     def __str__(self):
         return self.name
 
 
-class Faculty(models.Model):
+class Faculty(LoadedValuesMixin, models.Model):
     """
     Mô hình đại diện cho giảng viên.
 
@@ -80,6 +112,8 @@ class Faculty(models.Model):
         default = "Faculty", max_length = 100, null = False, blank = True)
     photo = models.ImageField(upload_to = 'profile_pics', blank = True, null = False, default = 'profile_pics/default_faculty.png')
 
+    tracked_fields = ('department_id',)
+
     def delete(self, *args, **kwargs):
         if self.photo != 'profile_pics/default_faculty.png':
             self.photo.delete()
@@ -100,6 +134,8 @@ class Department(models.Model):
         - department_id: Mã bộ môn (primary key).
         - name: Tên bộ môn.
         - description: Mô tả về bộ môn (có thể null và trống).
+        - student_total, faculty_total, course_total: Số sinh viên, giảng viên và khóa học thuộc bộ môn
+          (được cập nhật bởi signal save/delete của Student, Faculty và Course).
 
     Meta:
         verbose_name_plural: Tên số nhiều của lớp Department.
@@ -109,11 +145,15 @@ class Department(models.Model):
         - student_count: Phương thức trả về số lượng sinh viên thuộc bộ môn.
         - faculty_count: Phương thức trả về số lượng giảng viên thuộc bộ môn.
         - course_count: Phương thức trả về số lượng khóa học thuộc bộ môn.
+        - update_stats: Phương thức tính lại các cột thống kê từ các bảng Student, Faculty và Course.
 
     """
     department_id = models.IntegerField(primary_key = True)
     name = models.CharField(max_length = 100, null = False)
     description = models.TextField(null = True, blank = True)
+    student_total = models.PositiveIntegerField(default = 0, null = False, editable = False)
+    faculty_total = models.PositiveIntegerField(default = 0, null = False, editable = False)
+    course_total = models.PositiveIntegerField(default = 0, null = False, editable = False)
 
     class Meta:
         verbose_name_plural = 'Departments'
@@ -122,16 +162,35 @@ class Department(models.Model):
         return self.name
 
     def student_count(self):
-        return self.students.count()
+        return self.student_total
 
     def faculty_count(self):
-        return self.faculty.count()
+        return self.faculty_total
 
     def course_count(self):
-        return self.courses.count()
+        return self.course_total
 
+    @staticmethod
+    def update_stats(department_ids = None):
+        """
+        Tính lại các cột thống kê bằng một câu lệnh UPDATE duy nhất.
 
-class Course(models.Model):
+        Args:
+            department_ids (iterable, optional): Mã các bộ môn cần cập nhật. None để cập nhật tất cả.
+
+        Returns:
+            int: Số bộ môn đã được cập nhật.
+        """
+        def total(model):
+            rows = model.objects.filter(department_id = models.OuterRef('department_id')).order_by().values(
+                'department_id').annotate(total = models.Count('pk')).values('total')
+            return Coalesce(models.Subquery(rows), 0)
+
+        departments = Department.objects.all() if department_ids is None else Department.objects.filter(department_id__in = list(department_ids))
+        return departments.update(student_total = total(Student), faculty_total = total(Faculty), course_total = total(Course))
+
+
+class Course(LoadedValuesMixin, models.Model):
     """
     Mô hình đại diện cho khóa học.
 
@@ -142,13 +201,17 @@ class Course(models.Model):
         - faculty: Giảng viên phụ trách khóa học (ForeignKey, có thể null và trống).
         - studentKey: Khóa chính để liên kết sinh viên với khóa học (unique).
         - facultyKey: Khóa chính để liên kết giảng viên với khóa học (unique).
+        - enrolled_count: Số sinh viên đã đăng ký khóa học (được cập nhật bởi signal m2m_changed của Student.course).
 
     Meta:
         unique_together: Tập hợp các trường duy nhất là 'code', 'department', 'name'.
         verbose_name_plural: Tên số nhiều của lớp Course.
+        indexes: Chỉ mục (department, name) và enrolled_count phục vụ lọc và sắp xếp danh sách khóa học.
 
     Phương thức:
         - __str__: Phương thức trả về tên của khóa học.
+        - save: Lưu khóa học; khi lưu lại một khóa học đã tải, enrolled_count không được ghi (chỉ update_enrolled_counts ghi cột này).
+        - update_enrolled_counts: Phương thức tính lại enrolled_count từ bảng đăng ký.
 
     """
 
@@ -160,14 +223,41 @@ class Course(models.Model):
         Faculty, on_delete = models.SET_NULL, null = True, blank = True)
     studentKey = models.IntegerField(null = False, unique = True)
     facultyKey = models.IntegerField(null = False, unique = True)
+    enrolled_count = models.PositiveIntegerField(default = 0, null = False, editable = False)
+
+    tracked_fields = ('department_id', 'faculty_id')
 
     class Meta:
         unique_together = ('code', 'department', 'name')
         verbose_name_plural = "Courses"
+        indexes = [models.Index(fields = ['department', 'name']), models.Index(fields = ['enrolled_count'])]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and kwargs.get('update_fields') is None:
+            # Đối tượng đã tải có thể mang enrolled_count cũ: không ghi đè giá trị do signal đăng ký cập nhật
+            kwargs['update_fields'] = [field.name for field in self._meta.concrete_fields
+                                       if not field.primary_key and field.name != 'enrolled_count']
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def update_enrolled_counts(codes = None):
+        """
+        Tính lại enrolled_count bằng một câu lệnh UPDATE duy nhất.
+
+        Args:
+            codes (iterable, optional): Mã các khóa học cần cập nhật. None để cập nhật tất cả.
+
+        Returns:
+            int: Số khóa học đã được cập nhật.
+        """
+        enrolled = Student.course.through.objects.filter(course_id = models.OuterRef('code')).order_by().values(
+            'course_id').annotate(total = models.Count('id')).values('total')
+        courses = Course.objects.all() if codes is None else Course.objects.filter(code__in = list(codes))
+        return courses.update(enrolled_count = Coalesce(models.Subquery(enrolled), 0))
+
 
 class Announcement(models.Model):
     """
@@ -181,6 +271,7 @@ class Announcement(models.Model):
     Meta:
         verbose_name_plural: Tên số nhiều của lớp Announcement.
         ordering: Sắp xếp các thông báo theo thời gian giảm dần.
+        indexes: Chỉ mục (course_code, datetime, id) phục vụ phân trang theo con trỏ.
 
     Phương thức:
         - __str__: Phương thức trả về thời điểm thông báo dưới dạng chuỗi.
@@ -195,6 +286,7 @@ class Announcement(models.Model):
     class Meta:
         verbose_name_plural = "Announcements"
         ordering = ['-datetime']
+        indexes = [models.Index(fields = ['course_code', '-datetime', '-id'])]
 
     def __str__(self):
         return self.datetime.strftime("%d-%b-%y, %I:%M %p")
@@ -219,6 +311,7 @@ class Assignment(models.Model):
     Meta:
         verbose_name_plural: Tên số nhiều của lớp Assignment.
         ordering: Sắp xếp các bài tập theo thời gian giảm dần.
+        indexes: Chỉ mục (course_code, datetime, id) phục vụ phân trang theo con trỏ.
 
     Phương thức:
         - __str__: Phương thức trả về tiêu đề của bài tập.
@@ -238,6 +331,7 @@ class Assignment(models.Model):
     class Meta:
         verbose_name_plural = "Assignments"
         ordering = ['-datetime']
+        indexes = [models.Index(fields = ['course_code', '-datetime', '-id'])]
 
     def __str__(self):
         return self.title
@@ -341,6 +435,7 @@ class Material(models.Model):
     Meta:
         verbose_name_plural: Tên số nhiều của lớp Material.
         ordering: Sắp xếp các tài liệu theo thời gian tạo giảm dần.
+        indexes: Chỉ mục (course_code, datetime, id) phục vụ phân trang theo con trỏ.
 
     """
 
@@ -361,4 +456,5 @@ class Material(models.Model):
 
     class Meta:
         verbose_name_plural = "Materials"
-        ordering = ['-datetime']
\ No newline at end of file
+        ordering = ['-datetime']
+        indexes = [models.Index(fields = ['course_code', '-datetime', '-id'])]
\ No newline at end of file
@@ -0,0 +1,164 @@
+import base64
+import datetime
+import threading
+import time
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class KeysetPage:
+    """
+    Một trang kết quả phân trang theo khóa (keyset/cursor).
+
+    Thuộc tính:
+        - items: Danh sách đối tượng của trang.
+        - next_cursor: Con trỏ tới trang kế tiếp, None nếu đây là trang cuối.
+    """
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(instance):
+    """Mã hóa vị trí (datetime, id) của một đối tượng thành chuỗi an toàn cho URL."""
+    raw = '%s|%d' % (instance.datetime.isoformat(), instance.pk)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Giải mã con trỏ thành bộ (datetime, id).
+
+    Raises:
+        ValueError: Nếu con trỏ không hợp lệ.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        moment, pk = raw.rsplit('|', 1)
+        return datetime.datetime.fromisoformat(moment), int(pk)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def keyset_page(queryset, cursor = None, size = 10):
+    """
+    Lấy một trang đối tượng theo thứ tự datetime giảm dần, dùng (datetime, id) làm khóa.
+
+    Args:
+        queryset (QuerySet): Truy vấn của mô hình có trường 'datetime'.
+        cursor (str): Con trỏ trả về từ trang trước, None cho trang đầu tiên.
+        size (int): Số đối tượng mỗi trang.
+
+    Returns:
+        KeysetPage: Trang kết quả.
+
+    Raises:
+        ValueError: Nếu con trỏ không hợp lệ.
+
+    Notes:
+        - Khác với OFFSET, chi phí mỗi trang không phụ thuộc vào vị trí trang nhờ chỉ mục (course_code, datetime, id).
+        - Chỉ truy vấn size + 1 dòng để biết còn trang kế tiếp hay không, không cần COUNT.
+    """
+    queryset = queryset.order_by('-datetime', '-id')
+    if cursor:
+        moment, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(datetime__lt = moment) | Q(datetime = moment, id__lt = pk))
+    items = list(queryset[:size + 1])
+    next_cursor = encode_cursor(items[size - 1]) if len(items) > size else None
+    return KeysetPage(items[:size], next_cursor)
+
+
+class CountCache:
+    """
+    Cache trong bộ nhớ tiến trình cho kết quả COUNT(*) của các danh sách phân trang theo số trang.
+
+    Mỗi mục được khóa theo (namespace, key); namespace được vô hiệu hóa toàn bộ bởi signal khi dữ liệu thay đổi.
+
+    Thuộc tính:
+        - ttl: Thời gian sống (giây) của mỗi mục (cấu hình COUNT_CACHE_TTL).
+    """
+
+    def __init__(self, ttl = None):
+        self.ttl = ttl if ttl is not None else getattr(settings, 'COUNT_CACHE_TTL', 60)
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._generations = {}
+
+    def get_or_count(self, namespace, key, queryset):
+        """Trả về số dòng của queryset, dùng giá trị đã cache nếu còn hạn."""
+        with self._lock:
+            entry = self._entries.get((namespace, key))
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            generation = self._generations.get(namespace, 0)
+
+        count = queryset.count()
+
+        with self._lock:
+            # Bỏ qua nếu namespace bị vô hiệu hóa trong lúc đếm
+            if generation == self._generations.get(namespace, 0):
+                self._entries[(namespace, key)] = (time.monotonic() + self.ttl, count)
+        return count
+
+    def invalidate(self, namespace):
+        """Vô hiệu hóa mọi mục thuộc một namespace."""
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            for entry_key in [entry_key for entry_key in self._entries if entry_key[0] == namespace]:
+                del self._entries[entry_key]
+
+
+count_cache = CountCache()
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator lấy tổng số dòng từ count_cache thay vì chạy COUNT(*) ở mỗi request."""
+
+    def __init__(self, object_list, per_page, namespace, key, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.namespace = namespace
+        self.key = key
+
+    @cached_property
+    def count(self):
+        return count_cache.get_or_count(self.namespace, self.key, self.object_list)
+
+
+def paginate(request, queryset, per_page, namespace, key):
+    """
+    Lấy trang được yêu cầu (tham số GET 'page') của queryset.
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest.
+        queryset (QuerySet): Truy vấn đã được lọc và sắp xếp.
+        per_page (int): Số dòng mỗi trang.
+        namespace (str): Namespace của count_cache.
+        key (hashable): Khóa xác định bộ lọc hiện tại trong namespace.
+
+    Returns:
+        Page: Trang kết quả; số trang không hợp lệ được đưa về trang gần nhất.
+    """
+    return CachedCountPaginator(queryset, per_page, namespace, key).get_page(request.GET.get('page'))
+
+
+def query_without_page(request):
+    """Chuỗi query string hiện tại không có tham số 'page', dùng để tạo liên kết phân trang."""
+    query = request.GET.copy()
+    query.pop('page', None)
+    return query.urlencode()
@@ -0,0 +1,193 @@
+"""
+Chỉ mục tìm kiếm toàn văn (SQLite FTS5) cho tên khóa học, thông báo, tài liệu và bài tập.
+
+Mỗi tài liệu được lưu với rowid = pk * len(KINDS) + chỉ số loại, nên việc cập nhật/xóa một tài liệu
+chỉ là thao tác theo rowid. Kết quả được xếp hạng bằng BM25 (tiêu đề có trọng số cao hơn nội dung).
+
+Nếu cơ sở dữ liệu không phải SQLite hoặc SQLite không hỗ trợ FTS5, is_available() trả về False và
+view tìm kiếm quay về truy vấn icontains cũ.
+"""
+import html
+import re
+from django.db import connection, connections, DatabaseError
+from django.utils.html import escape, strip_tags
+from django.utils.safestring import mark_safe
+from .models import Course, Announcement, Material, Assignment
+
+
+TABLE = 'main_search_index'
+KINDS = ('course', 'announcement', 'material', 'assignment')
+MODELS = {Course: 'course', Announcement: 'announcement', Material: 'material', Assignment: 'assignment'}
+
+# Ký tự đánh dấu đoạn khớp, được thay bằng <mark> sau khi escape HTML
+_MARK_START = '\x02'
+_MARK_END = '\x03'
+
+_available = None
+
+
+class SearchHit:
+    """
+    Một kết quả tìm kiếm.
+
+    Thuộc tính:
+        - kind: Loại tài liệu ('course', 'announcement', 'material', 'assignment').
+        - object_id: Khóa chính của đối tượng.
+        - course_code: Mã khóa học chứa đối tượng.
+        - title: Tiêu đề đã được đánh dấu đoạn khớp (HTML an toàn).
+        - snippet: Đoạn trích nội dung đã được đánh dấu đoạn khớp (HTML an toàn).
+        - rank: Điểm BM25 (càng nhỏ càng liên quan).
+    """
+
+    def __init__(self, kind, object_id, course_code, title, snippet, rank):
+        self.kind = kind
+        self.object_id = object_id
+        self.course_code = course_code
+        self.title = title
+        self.snippet = snippet
+        self.rank = rank
+
+
+def _plain(text):
+    # Nội dung Froala là HTML: bỏ thẻ và giải mã thực thể
+    return html.unescape(strip_tags(text or ''))
+
+
+def _highlight(text):
+    return mark_safe(escape(text).replace(_MARK_START, '<mark>').replace(_MARK_END, '</mark>'))
+
+
+def is_available():
+    """Kiểm tra (một lần cho mỗi tiến trình) cơ sở dữ liệu có hỗ trợ FTS5 hay không, đồng thời tạo bảng chỉ mục nếu cần."""
+    global _available
+    if _available is None:
+        _available = ensure_index()
+    return _available
+
+
+def ensure_index(using = 'default'):
+    """
+    Tạo bảng FTS5 nếu chưa tồn tại.
+
+    Args:
+        using (str): Alias của cơ sở dữ liệu.
+
+    Returns:
+        bool: True nếu bảng đã sẵn sàng, False nếu SQLite không hỗ trợ FTS5.
+    """
+    if connections[using].vendor != 'sqlite':
+        return False
+    try:
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5("
+                "kind UNINDEXED, course_code UNINDEXED, title, body, "
+                "tokenize = 'unicode61 remove_diacritics 2')" % TABLE)
+        return True
+    except DatabaseError:
+        return False
+
+
+def document_for(instance):
+    """Trả về bộ (rowid, kind, course_code, title, body) để đưa vào chỉ mục."""
+    kind = MODELS[type(instance)]
+    rowid = instance.pk * len(KINDS) + KINDS.index(kind)
+    if kind == 'course':
+        extra = [str(instance.code), instance.department.name]
+        if instance.faculty:
+            extra.append(instance.faculty.name)
+        return rowid, kind, instance.code, instance.name, ' '.join(extra)
+    if kind == 'assignment':
+        return rowid, kind, instance.course_code_id, instance.title, _plain(instance.description)
+    return rowid, kind, instance.course_code_id, '', _plain(instance.description)
+
+
+def index_instance(instance):
+    """Thêm hoặc cập nhật một đối tượng trong chỉ mục."""
+    if not is_available():
+        return
+    document = document_for(instance)
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s WHERE rowid = %%s' % TABLE, [document[0]])
+        cursor.execute('INSERT INTO %s (rowid, kind, course_code, title, body) VALUES (%%s, %%s, %%s, %%s, %%s)' % TABLE, list(document))
+
+
+def remove_instance(instance):
+    """Xóa một đối tượng khỏi chỉ mục."""
+    if not is_available():
+        return
+    kind = MODELS[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s WHERE rowid = %%s' % TABLE, [instance.pk * len(KINDS) + KINDS.index(kind)])
+
+
+def rebuild(batch_size = 1000):
+    """
+    Xây dựng lại toàn bộ chỉ mục.
+
+    Returns:
+        int: Số tài liệu đã được đưa vào chỉ mục.
+    """
+    if not is_available():
+        return 0
+    querysets = [
+        Course.objects.select_related('department', 'faculty'),
+        Announcement.objects.only('id', 'course_code_id', 'description'),
+        Material.objects.only('id', 'course_code_id', 'description'),
+        Assignment.objects.only('id', 'course_code_id', 'title', 'description'),
+    ]
+    total = 0
+    with connection.cursor() as cursor:
+        cursor.execute('DELETE FROM %s' % TABLE)
+        for queryset in querysets:
+            batch = []
+            for instance in queryset.iterator(chunk_size = batch_size):
+                batch.append(document_for(instance))
+                if len(batch) >= batch_size:
+                    cursor.executemany('INSERT INTO %s (rowid, kind, course_code, title, body) VALUES (%%s, %%s, %%s, %%s, %%s)' % TABLE, batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                cursor.executemany('INSERT INTO %s (rowid, kind, course_code, title, body) VALUES (%%s, %%s, %%s, %%s, %%s)' % TABLE, batch)
+                total += len(batch)
+        cursor.execute("INSERT INTO %s (%s) VALUES ('optimize')" % (TABLE, TABLE))
+    return total
+
+
+def build_match(query):
+    """Chuyển chuỗi người dùng nhập thành biểu thức MATCH an toàn: mỗi từ là một tiền tố, các từ nối bằng AND."""
+    tokens = re.findall(r'\w+', query or '')
+    return ' '.join('"%s"*' % token for token in tokens)
+
+
+def search(query, course_codes = (), limit = 50):
+    """
+    Tìm kiếm trong chỉ mục.
+
+    Args:
+        query (str): Chuỗi tìm kiếm.
+        course_codes (iterable): Mã các khóa học người dùng được phép xem nội dung.
+            Tên khóa học luôn được tìm kiếm; thông báo, tài liệu và bài tập chỉ trong các khóa học này.
+        limit (int): Số kết quả tối đa.
+
+    Returns:
+        list[SearchHit]: Danh sách kết quả, xếp theo độ liên quan giảm dần.
+    """
+    match = build_match(query)
+    if not match or not is_available():
+        return []
+    course_codes = list(course_codes)
+    access = "kind = 'course'"
+    if course_codes:
+        access += ' OR course_code IN (%s)' % ', '.join(['%s'] * len(course_codes))
+    sql = (
+        'SELECT rowid, kind, course_code, highlight({table}, 2, %s, %s), snippet({table}, 3, %s, %s, %s, 16), '
+        'bm25({table}, 0.0, 0.0, 10.0, 1.0) AS score '
+        'FROM {table} WHERE {table} MATCH %s AND ({access}) ORDER BY score LIMIT %s'
+    ).format(table = TABLE, access = access)
+    params = [_MARK_START, _MARK_END, _MARK_START, _MARK_END, '…', match] + course_codes + [limit]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [SearchHit(kind, rowid // len(KINDS), course_code, _highlight(title), _highlight(snippet), score)
+            for rowid, kind, course_code, title, snippet, score in rows]
@@ -0,0 +1,225 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from .models import Student, Faculty, Course, Department, Announcement, Material, Assignment
+from .authorization import authorization_index
+from .course_cache import course_cache
+from . import search
+from .autocomplete import course_autocomplete
+from .pagination import count_cache
+
+
+def on_commit_and_now(func):
+    """
+    Gọi hàm vô hiệu hóa ngay lập tức và một lần nữa sau khi transaction được commit.
+
+    Lần gọi sau commit đảm bảo các request khác không lưu lại dữ liệu cũ đọc được trước khi commit.
+    """
+    func()
+    transaction.on_commit(func)
+
+
+@receiver(m2m_changed, sender = Student.course.through)
+def enrollment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Vô hiệu hóa chỉ mục quyền khi danh sách khóa học của sinh viên thay đổi."""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        # instance là Student
+        on_commit_and_now(lambda: authorization_index.invalidate_student(instance.pk))
+    elif pk_set:
+        # instance là Course, pk_set là tập mã sinh viên
+        student_ids = list(pk_set)
+        on_commit_and_now(lambda: [authorization_index.invalidate_student(pk) for pk in student_ids])
+    else:
+        # course.students.clear(): không biết sinh viên nào bị ảnh hưởng
+        on_commit_and_now(authorization_index.invalidate_student)
+
+
+@receiver(m2m_changed, sender = Student.course.through)
+def enrollment_count_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cập nhật Course.enrolled_count của các khóa học bị ảnh hưởng khi danh sách đăng ký thay đổi."""
+    if action == 'pre_clear' and not reverse:
+        # Ghi nhớ các khóa học trước khi xóa để cập nhật sau
+        instance._cleared_course_codes = list(instance.course.values_list('code', flat = True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        codes = [instance.pk]
+    elif action == 'post_clear':
+        codes = getattr(instance, '_cleared_course_codes', [])
+    else:
+        codes = list(pk_set)
+    if codes:
+        Course.update_enrolled_counts(codes)
+        on_commit_and_now(lambda: [course_cache.invalidate(code) for code in codes])
+
+
+@receiver(pre_delete, sender = Student)
+def student_deleting(sender, instance, **kwargs):
+    # Bảng đăng ký bị xóa theo cascade mà không gửi m2m_changed
+    instance._deleted_course_codes = list(instance.course.values_list('code', flat = True))
+
+
+@receiver(pre_save, sender = Course)
+def course_saving(sender, instance, update_fields = None, **kwargs):
+    """Ghi nhớ giảng viên cũ để chỉ vô hiệu hóa chỉ mục quyền của giảng viên cũ và mới."""
+    if update_fields is not None and 'faculty' not in update_fields:
+        instance._old_faculty_id = instance.faculty_id
+    elif 'faculty_id' in getattr(instance, '_loaded_values', {}):
+        instance._old_faculty_id = instance.loaded_value('faculty_id')
+    else:
+        instance._old_faculty_id = sender.objects.filter(pk = instance.pk).values_list('faculty_id', flat = True).first()
+
+
+@receiver(post_save, sender = Course)
+def course_saved(sender, instance, created, update_fields = None, **kwargs):
+    """Vô hiệu hóa chỉ mục quyền của giảng viên cũ và mới (nếu đổi giảng viên) và cache khóa học khi khóa học được lưu."""
+    if not created and (update_fields is None or 'enrolled_count' in update_fields):
+        # Một đối tượng tạo mới (không được tải) đã ghi đè enrolled_count của khóa học có sẵn, nên tính lại
+        Course.update_enrolled_counts([instance.pk])
+    old_faculty_id = getattr(instance, '_old_faculty_id', None)
+    if created or old_faculty_id != instance.faculty_id:
+        faculty_ids = {old_faculty_id, instance.faculty_id} - {None}
+        on_commit_and_now(lambda: [authorization_index.invalidate_faculty(pk) for pk in faculty_ids])
+    instance.remember_loaded('faculty_id')
+    on_commit_and_now(lambda: course_cache.invalidate(instance.pk))
+
+
+@receiver(post_delete, sender = Course)
+def course_deleted(sender, instance, **kwargs):
+    """Vô hiệu hóa chỉ mục quyền và cache khóa học khi khóa học bị xóa."""
+    if instance.faculty_id is not None:
+        on_commit_and_now(lambda: authorization_index.invalidate_faculty(instance.faculty_id))
+    on_commit_and_now(lambda: course_cache.invalidate(instance.pk))
+    # Xóa khóa học cũng xóa các liên kết đăng ký mà không gửi m2m_changed
+    on_commit_and_now(authorization_index.invalidate_student)
+
+
+@receiver(post_delete, sender = Student)
+def student_deleted(sender, instance, **kwargs):
+    on_commit_and_now(lambda: authorization_index.invalidate_student(instance.pk))
+    codes = getattr(instance, '_deleted_course_codes', [])
+    if codes:
+        Course.update_enrolled_counts(codes)
+        on_commit_and_now(lambda: [course_cache.invalidate(code) for code in codes])
+
+
+@receiver(post_delete, sender = Faculty)
+def faculty_deleted(sender, instance, **kwargs):
+    on_commit_and_now(lambda: authorization_index.invalidate_faculty(instance.pk))
+    on_commit_and_now(lambda: course_cache.invalidate_faculty(instance.pk))
+
+
+@receiver(post_save, sender = Faculty)
+def faculty_saved(sender, instance, **kwargs):
+    """Vô hiệu hóa các khóa học đã cache kèm thông tin giảng viên cũ."""
+    on_commit_and_now(lambda: course_cache.invalidate_faculty(instance.pk))
+
+
+@receiver(post_save, sender = Department)
+@receiver(post_delete, sender = Department)
+def department_changed(sender, instance, **kwargs):
+    """Vô hiệu hóa các khóa học đã cache kèm thông tin bộ môn cũ."""
+    on_commit_and_now(lambda: course_cache.invalidate_department(instance.pk))
+
+
+@receiver(pre_save, sender = Student)
+@receiver(pre_save, sender = Faculty)
+@receiver(pre_save, sender = Course)
+def member_saving(sender, instance, update_fields = None, **kwargs):
+    """
+    Ghi nhớ bộ môn cũ để cập nhật thống kê của cả hai bộ môn nếu bộ môn thay đổi.
+
+    Bộ môn cũ được lấy từ giá trị lúc tải đối tượng (LoadedValuesMixin); chỉ đối tượng mới tạo
+    (hoặc được tải không kèm department) mới cần truy vấn lại.
+    """
+    if update_fields is not None and 'department' not in update_fields:
+        instance._old_department_id = instance.department_id
+    elif 'department_id' in getattr(instance, '_loaded_values', {}):
+        instance._old_department_id = instance.loaded_value('department_id')
+    else:
+        instance._old_department_id = sender.objects.filter(pk = instance.pk).values_list('department_id', flat = True).first()
+
+
+@receiver(post_save, sender = Student)
+@receiver(post_save, sender = Faculty)
+@receiver(post_save, sender = Course)
+def member_saved(sender, instance, created, **kwargs):
+    """Cập nhật thống kê bộ môn khi thêm mới hoặc chuyển bộ môn."""
+    old_department_id = getattr(instance, '_old_department_id', None)
+    if created or old_department_id != instance.department_id:
+        Department.update_stats({instance.department_id, old_department_id} - {None})
+    instance.remember_loaded('department_id')
+
+
+@receiver(post_delete, sender = Student)
+@receiver(post_delete, sender = Faculty)
+@receiver(post_delete, sender = Course)
+def member_deleted(sender, instance, **kwargs):
+    """Cập nhật thống kê bộ môn khi xóa sinh viên, giảng viên hoặc khóa học."""
+    Department.update_stats([instance.department_id])
+
+
+@receiver(post_save, sender = Department)
+def department_saved(sender, instance, **kwargs):
+    # Một đối tượng cũ được lưu lại có thể ghi đè các cột thống kê, nên tính lại cho bộ môn này
+    Department.update_stats([instance.pk])
+
+
+def create_search_index(sender, using, **kwargs):
+    """Tạo bảng chỉ mục tìm kiếm FTS5 sau khi migrate (được đăng ký trong MainConfig.ready)."""
+    search.ensure_index(using)
+
+
+@receiver(post_save, sender = Course)
+@receiver(post_save, sender = Announcement)
+@receiver(post_save, sender = Material)
+@receiver(post_save, sender = Assignment)
+def searchable_saved(sender, instance, **kwargs):
+    """Cập nhật chỉ mục tìm kiếm khi khóa học, thông báo, tài liệu hoặc bài tập được lưu."""
+    search.index_instance(instance)
+
+
+@receiver(post_delete, sender = Course)
+@receiver(post_delete, sender = Announcement)
+@receiver(post_delete, sender = Material)
+@receiver(post_delete, sender = Assignment)
+def searchable_deleted(sender, instance, **kwargs):
+    """Xóa đối tượng khỏi chỉ mục tìm kiếm."""
+    search.remove_instance(instance)
+
+
+@receiver(post_save, sender = Faculty)
+@receiver(post_save, sender = Department)
+def course_labels_changed(sender, instance, **kwargs):
+    """Tên giảng viên và bộ môn được đánh chỉ mục cùng khóa học, nên cập nhật lại các khóa học liên quan."""
+    lookup = {'faculty': instance} if sender is Faculty else {'department': instance}
+    for course in Course.objects.filter(**lookup).select_related('department', 'faculty'):
+        search.index_instance(course)
+
+
+@receiver(post_save, sender = Course)
+@receiver(post_delete, sender = Course)
+@receiver(post_save, sender = Department)
+@receiver(post_delete, sender = Department)
+def autocomplete_changed(sender, **kwargs):
+    """Vô hiệu hóa chỉ mục gợi ý khi khóa học hoặc tên bộ môn thay đổi."""
+    on_commit_and_now(course_autocomplete.invalidate)
+
+
+@receiver(post_save, sender = Course)
+@receiver(post_delete, sender = Course)
+def catalogue_changed(sender, **kwargs):
+    """Vô hiệu hóa tổng số khóa học đã cache của danh sách khóa học."""
+    on_commit_and_now(lambda: count_cache.invalidate('courses'))
+
+
+@receiver(m2m_changed, sender = Student.course.through)
+@receiver(post_save, sender = Student)
+@receiver(post_delete, sender = Student)
+def roster_changed(sender, action = None, **kwargs):
+    """Vô hiệu hóa tổng số sinh viên đã cache của danh sách sinh viên điểm danh."""
+    if action is None or action in ('post_add', 'post_remove', 'post_clear'):
+        on_commit_and_now(lambda: count_cache.invalidate('roster'))
@@ -0,0 +1,379 @@
+import datetime
+from unittest import mock
+from django.conf import settings
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from . import search
+from .authorization import authorization_index
+from .autocomplete import course_autocomplete
+from .course_cache import CourseCache, course_cache
+from .models import Announcement, Course, Department, Faculty, Student
+from .pagination import count_cache, decode_cursor, encode_cursor, keyset_page
+
+
+class DepartmentStatsTests(TestCase):
+    """Cột thống kê của bộ môn được cập nhật khi sinh viên, giảng viên hoặc khóa học được lưu."""
+
+    def setUp(self):
+        self.first = Department.objects.create(department_id = 1, name = 'First')
+        self.second = Department.objects.create(department_id = 2, name = 'Second')
+        Student.objects.create(student_id = 1, name = 'Student 1', password = 'test', department = self.first)
+        Faculty.objects.create(faculty_id = 1, name = 'Faculty 1', password = 'test', department = self.first)
+        Course.objects.create(code = 1, name = 'Course 1', department = self.first, studentKey = 1, facultyKey = 1)
+
+    def totals(self, department):
+        department.refresh_from_db()
+        return department.student_total, department.faculty_total, department.course_total
+
+    def test_move_between_departments(self):
+        self.assertEqual(self.totals(self.first), (1, 1, 1))
+        for model in (Student, Faculty):
+            member = model.objects.get(pk = 1)
+            member.department = self.second
+            member.save()
+        self.assertEqual(self.totals(self.first), (0, 0, 1))
+        self.assertEqual(self.totals(self.second), (1, 1, 0))
+
+        # Lưu lại cùng đối tượng: so sánh với bộ môn vừa ghi, không phải bộ môn lúc tải
+        member.department = self.first
+        member.save()
+        self.assertEqual(self.totals(self.first), (0, 1, 1))
+        self.assertEqual(self.totals(self.second), (1, 0, 0))
+
+    def test_profile_edit_does_not_read_department(self):
+        student = Student.objects.get(pk = 1)
+        student.name = 'Renamed'
+        # Chỉ một câu lệnh UPDATE: bộ môn cũ lấy từ lúc tải, không truy vấn lại và không tính lại thống kê
+        with self.assertNumQueries(1):
+            student.save()
+        self.assertEqual(self.totals(self.first), (1, 1, 1))
+
+
+class EnrolledCountTests(TestCase):
+    """Course.enrolled_count được cập nhật theo bảng đăng ký và không bị ghi đè khi lưu khóa học."""
+
+    def setUp(self):
+        self.department = Department.objects.create(department_id = 1, name = 'Test')
+        self.course = Course.objects.create(code = 1, name = 'Course 1', department = self.department, studentKey = 1, facultyKey = 1)
+        self.students = [Student.objects.create(student_id = student_id, name = 'Student %d' % student_id, password = 'test',
+                                                department = self.department) for student_id in (1, 2, 3)]
+
+    def enrolled_count(self):
+        return Course.objects.values_list('enrolled_count', flat = True).get(pk = self.course.pk)
+
+    def test_enrollment_changes(self):
+        self.course.students.add(*self.students)
+        self.assertEqual(self.enrolled_count(), 3)
+        self.students[0].course.remove(self.course)
+        self.assertEqual(self.enrolled_count(), 2)
+        self.students[1].course.clear()
+        self.assertEqual(self.enrolled_count(), 1)
+        self.students[2].delete()
+        self.assertEqual(self.enrolled_count(), 0)
+
+    def test_saving_stale_course_keeps_count(self):
+        stale = Course.objects.get(pk = self.course.pk)
+        self.course.students.add(*self.students)
+        stale.name = 'Renamed'
+        stale.save()
+        self.assertEqual(self.enrolled_count(), 3)
+        self.assertEqual(Course.objects.get(pk = self.course.pk).name, 'Renamed')
+
+        # Đối tượng không được tải mang enrolled_count mặc định: số đăng ký được tính lại sau khi lưu
+        Course(code = 1, name = 'Course 1', department = self.department, studentKey = 1, facultyKey = 1).save()
+        self.assertEqual(self.enrolled_count(), 3)
+
+
+class AuthorizationIndexTests(TestCase):
+    """Chỉ mục quyền của giảng viên chỉ bị vô hiệu hóa cho các giảng viên bị ảnh hưởng."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        self.owner, self.other, self.unrelated = [
+            Faculty.objects.create(faculty_id = faculty_id, name = 'Faculty %d' % faculty_id, password = 'test', department = department)
+            for faculty_id in (1, 2, 3)]
+        self.course = Course.objects.create(code = 1, name = 'Course 1', department = department, studentKey = 1, facultyKey = 1,
+                                            faculty = self.owner)
+        Course.objects.create(code = 2, name = 'Course 2', department = department, studentKey = 2, facultyKey = 2,
+                              faculty = self.unrelated)
+        authorization_index.clear()
+        self.addCleanup(authorization_index.clear)
+        for faculty in (self.owner, self.other, self.unrelated):
+            authorization_index.faculty_courses(faculty.pk)
+
+    def test_reassign_course(self):
+        course = Course.objects.get(pk = 1)
+        course.faculty = self.other
+        course.save()
+        self.assertFalse(authorization_index.is_faculty_owner(self.owner.pk, 1))
+        self.assertTrue(authorization_index.is_faculty_owner(self.other.pk, 1))
+        # Mục của giảng viên không liên quan vẫn còn trong cache
+        with self.assertNumQueries(0):
+            self.assertTrue(authorization_index.is_faculty_owner(self.unrelated.pk, 2))
+
+    def test_rename_keeps_faculty_entries(self):
+        course = Course.objects.get(pk = 1)
+        course.name = 'Renamed'
+        course.save()
+        with self.assertNumQueries(0):
+            self.assertTrue(authorization_index.is_faculty_owner(self.owner.pk, 1))
+            self.assertFalse(authorization_index.is_faculty_owner(self.other.pk, 1))
+
+    def test_delete_course(self):
+        self.course.delete()
+        self.assertFalse(authorization_index.is_faculty_owner(self.owner.pk, 1))
+        with self.assertNumQueries(0):
+            self.assertTrue(authorization_index.is_faculty_owner(self.unrelated.pk, 2))
+
+
+class CourseCacheTests(TestCase):
+    """Cache khóa học trả về dữ liệu mới sau khi khóa học, giảng viên hoặc bộ môn được lưu."""
+
+    def setUp(self):
+        self.department = Department.objects.create(department_id = 1, name = 'Test')
+        self.faculty = Faculty.objects.create(faculty_id = 1, name = 'Faculty 1', password = 'test', department = self.department)
+        Course.objects.create(code = 1, name = 'Course 1', department = self.department, studentKey = 1, facultyKey = 1,
+                              faculty = self.faculty)
+        Course.objects.create(code = 2, name = 'Course 2', department = self.department, studentKey = 2, facultyKey = 2)
+        course_cache.clear()
+        self.addCleanup(course_cache.clear)
+
+    def test_read_through(self):
+        with self.assertNumQueries(1):
+            course = course_cache.get('1')
+            self.assertEqual(course_cache.get(1).faculty.name, 'Faculty 1')
+        # Mỗi lần get() trả về một bản sao: gán thuộc tính không ảnh hưởng request khác
+        course.name = 'Changed in view'
+        self.assertEqual(course_cache.get(1).name, 'Course 1')
+        with self.assertRaises(Course.DoesNotExist):
+            course_cache.get('abc')
+        with self.assertRaises(Course.DoesNotExist):
+            course_cache.get(3)
+
+    def test_invalidated_on_save(self):
+        course_cache.get(1)
+        course_cache.get(2)
+        course = Course.objects.get(pk = 1)
+        course.name = 'Renamed'
+        course.save()
+        self.assertEqual(course_cache.get(1).name, 'Renamed')
+        with self.assertNumQueries(0):
+            course_cache.get(2)
+
+        self.faculty.name = 'Faculty renamed'
+        self.faculty.save()
+        self.assertEqual(course_cache.get(1).faculty.name, 'Faculty renamed')
+
+        self.department.name = 'Department renamed'
+        self.department.save()
+        self.assertEqual(course_cache.get(2).department.name, 'Department renamed')
+
+        Course.objects.get(pk = 2).delete()
+        with self.assertRaises(Course.DoesNotExist):
+            course_cache.get(2)
+
+    def test_lru_eviction(self):
+        cache = CourseCache(maxsize = 1, ttl = 60)
+        cache.get(1)
+        cache.get(2)
+        cache.get(2)
+        self.assertEqual(cache.cache_info(), (1, 2, 1, 0, 1, 1))
+        with self.assertNumQueries(1):
+            cache.get(1)
+
+
+class SearchTests(TestCase):
+    """Chỉ mục FTS5 được cập nhật theo signal và view tìm kiếm quay về icontains khi không có FTS5."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        faculty = Faculty.objects.create(faculty_id = 1, name = 'Nguyễn Văn An', password = 'test', department = department)
+        self.course = Course.objects.create(code = 1, name = 'Database Systems', department = department, studentKey = 1,
+                                            facultyKey = 1, faculty = faculty)
+        self.other = Course.objects.create(code = 2, name = 'Networks', department = department, studentKey = 2, facultyKey = 2)
+        self.student = Student.objects.create(student_id = 1, name = 'Student 1', password = 'test', department = department)
+        self.student.course.add(self.course)
+
+    def login(self):
+        session = self.client.session
+        session['student_id'] = self.student.student_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def hits(self, query, course_codes = ()):
+        return [(hit.kind, hit.object_id) for hit in search.search(query, course_codes)]
+
+    def test_index_follows_saves(self):
+        if not search.is_available():
+            self.skipTest('SQLite FTS5 is not available')
+        self.assertEqual(self.hits('datab'), [('course', 1)])
+        # Tên giảng viên được đánh chỉ mục không dấu
+        self.assertEqual(self.hits('nguyen'), [('course', 1)])
+
+        announcement = Announcement.objects.create(course_code = self.other, description = '<p>Midterm &amp; final</p>')
+        # Nội dung chỉ được tìm trong các khóa học người dùng có quyền xem
+        self.assertEqual(self.hits('midterm', [1]), [])
+        self.assertEqual(self.hits('midterm', [2]), [('announcement', announcement.pk)])
+        self.assertIn('<mark>Midterm</mark>', search.search('midterm', [2])[0].snippet)
+
+        self.course.name = 'Data Mining'
+        self.course.save()
+        self.assertEqual(self.hits('systems'), [])
+        self.assertEqual(self.hits('mining'), [('course', 1)])
+        announcement.delete()
+        self.assertEqual(self.hits('midterm', [2]), [])
+
+        Announcement.objects.create(course_code = self.course, description = 'Lab rescheduled')
+        self.assertEqual(search.rebuild(), 3)
+        self.assertEqual(len(self.hits('lab', [1])), 1)
+
+    def test_view_falls_back_without_fts(self):
+        self.login()
+        with mock.patch('main.search.is_available', return_value = False):
+            self.assertEqual(search.search('database'), [])
+            response = self.client.get(reverse('search'), {'q': 'an'})
+        self.assertEqual(response.status_code, 200)
+        # Tìm theo tên khóa học (Database Systems) hoặc tên giảng viên (Nguyễn Văn An)
+        self.assertEqual([course.code for course in response.context['courses']], [1])
+        self.assertEqual(response.context['results'], [])
+
+
+class AutocompleteTests(TestCase):
+    """Gợi ý khóa học theo tiền tố mã, tên hoặc một từ trong tên và được làm mới khi khóa học thay đổi."""
+
+    def setUp(self):
+        self.department = Department.objects.create(department_id = 1, name = 'Test')
+        for code, name in ((101, 'Data Structures'), (102, 'Database Systems'), (201, 'Distributed Systems')):
+            Course.objects.create(code = code, name = name, department = self.department, studentKey = code, facultyKey = code)
+        course_autocomplete.invalidate()
+        self.addCleanup(course_autocomplete.invalidate)
+
+    def codes(self, prefix, limit = 10):
+        return [course['code'] for course in course_autocomplete.complete(prefix, limit)]
+
+    def test_prefixes(self):
+        self.assertEqual(self.codes('10'), [101, 102])
+        self.assertEqual(self.codes('DATA'), [101, 102])
+        # Khớp cả tên đầy đủ và từ "systems" chỉ trả về mỗi khóa học một lần
+        self.assertEqual(sorted(self.codes('sys')), [102, 201])
+        self.assertEqual(self.codes('data', limit = 1), [101])
+        self.assertEqual(self.codes('  '), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.codes('distributed s'), [201])
+
+    def test_invalidated_on_save(self):
+        self.assertEqual(self.codes('net'), [])
+        Course.objects.create(code = 301, name = 'Networks', department = self.department, studentKey = 301, facultyKey = 301)
+        self.assertEqual(self.codes('net'), [301])
+        self.department.name = 'Computing'
+        self.department.save()
+        self.assertEqual(course_autocomplete.complete('net')[0]['department'], 'Computing')
+        Course.objects.get(pk = 301).delete()
+        self.assertEqual(self.codes('net'), [])
+
+    def test_view(self):
+        url = reverse('autocomplete')
+        self.assertEqual(self.client.get(url, {'q': 'data'}).status_code, 403)
+        student = Student.objects.create(student_id = 1, name = 'Student 1', password = 'test', department = self.department)
+        session = self.client.session
+        session['student_id'] = student.student_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        response = self.client.get(url, {'q': 'data', 'limit': 'x'})
+        self.assertEqual(response.json(), {'results': [
+            {'code': 101, 'name': 'Data Structures', 'department': 'Test'},
+            {'code': 102, 'name': 'Database Systems', 'department': 'Test'}]})
+        self.assertEqual(len(self.client.get(url, {'q': 'd', 'limit': '0'}).json()['results']), 1)
+
+
+class KeysetPaginationTests(TestCase):
+    """Phân trang theo con trỏ (datetime, id) đi hết danh sách, kể cả khi nhiều dòng trùng thời điểm."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id = 1, name = 'Test')
+        self.course = Course.objects.create(code = 1, name = 'Test', department = department, studentKey = 1, facultyKey = 1)
+        self.student = Student.objects.create(student_id = 1, name = 'Student 1', password = 'test', department = department)
+        self.student.course.add(self.course)
+        announcements = [Announcement.objects.create(course_code = self.course, description = 'Announcement %d' % i) for i in range(7)]
+        # Ba cặp thông báo trùng thời điểm
+        moment = datetime.datetime(2026, 9, 1, 8, 0)
+        for i, announcement in enumerate(announcements):
+            Announcement.objects.filter(pk = announcement.pk).update(datetime = moment + datetime.timedelta(minutes = i // 2))
+
+    def test_walk_pages(self):
+        queryset = Announcement.objects.filter(course_code = self.course)
+        expected = list(queryset.order_by('-datetime', '-id').values_list('id', flat = True))
+        seen = []
+        cursor = None
+        while True:
+            page = keyset_page(queryset, cursor, size = 2)
+            seen.extend(announcement.pk for announcement in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(page), 1)
+
+        last = queryset.get(pk = expected[3])
+        self.assertEqual(decode_cursor(encode_cursor(last)), (last.datetime, last.pk))
+        for cursor in ('=', 'not a cursor', encode_cursor(last)[:-3]):
+            with self.assertRaises(ValueError):
+                keyset_page(queryset, cursor, size = 2)
+
+    def test_load_more(self):
+        session = self.client.session
+        session['student_id'] = self.student.student_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        first = self.client.get(reverse('course', args = [1])).context['announcements']
+        self.assertEqual(len(first), 7)
+        self.assertFalse(first.has_next)
+
+        page = keyset_page(Announcement.objects.filter(course_code = self.course), size = 3)
+        response = self.client.get(reverse('loadMore', args = [1, 'announcements']), {'cursor': page.next_cursor})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([announcement.pk for announcement in response.context['page']],
+                         list(Announcement.objects.order_by('-datetime', '-id').values_list('id', flat = True)[3:]))
+        self.assertEqual(self.client.get(reverse('loadMore', args = [1, 'announcements']), {'cursor': 'bad'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('loadMore', args = [1, 'students'])).status_code, 400)
+
+
+@override_settings(COURSE_CATALOGUE_PAGE_SIZE = 2)
+class CourseCatalogueTests(TestCase):
+    """Danh sách khóa học được phân trang, lọc, sắp xếp và tổng số dòng đã cache được làm mới khi thêm khóa học."""
+
+    def setUp(self):
+        self.first = Department.objects.create(department_id = 1, name = 'First')
+        second = Department.objects.create(department_id = 2, name = 'Second')
+        for code, name, department in ((1, 'Algebra', self.first), (2, 'Algorithms', self.first), (3, 'Biology', self.first),
+                                       (4, 'Anatomy', second)):
+            Course.objects.create(code = code, name = name, department = department, studentKey = code, facultyKey = code)
+        student = Student.objects.create(student_id = 1, name = 'Student 1', password = 'test', department = self.first)
+        session = self.client.session
+        session['student_id'] = student.student_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        count_cache.invalidate('courses')
+        self.addCleanup(count_cache.invalidate, 'courses')
+
+    def codes(self, **params):
+        page = self.client.get(reverse('courses'), params).context['page_obj']
+        return [course.code for course in page], page.paginator.count
+
+    def test_filter_sort_and_page(self):
+        self.assertEqual(self.codes(), ([1, 2], 4))
+        self.assertEqual(self.codes(page = 2), ([4, 3], 4))
+        # Số trang vượt quá được đưa về trang cuối
+        self.assertEqual(self.codes(page = 9), ([4, 3], 4))
+        self.assertEqual(self.codes(q = 'al', sort = '-code'), ([2, 1], 2))
+        self.assertEqual(self.codes(department = '2'), ([4], 1))
+        self.assertEqual(self.codes(department = 'x', sort = 'unknown', q = 'b'), ([3], 1))
+
+    def test_count_cache_invalidated(self):
+        self.assertEqual(self.codes()[1], 4)
+        with self.assertNumQueries(0):
+            self.assertEqual(count_cache.get_or_count('courses', ('', ''), Course.objects.all()), 4)
+        Course.objects.create(code = 5, name = 'Chemistry', department = self.first, studentKey = 5, facultyKey = 5)
+        self.assertEqual(self.codes()[1], 5)
+        Course.objects.get(pk = 5).delete()
+        self.assertEqual(self.codes()[1], 4)
@@ -21,6 +21,7 @@ Danh sách mẫu URL:
 - 'profile/<str:id>/' : Trang hồ sơ cho một sinh viên (views.profile).
 - 'facultyProfile/<str:id>/' : Trang hồ sơ cho một giảng viên (views.profile_faculty).
 - 'faculty/<int:code>/' : Trang khóa học cụ thể cho một giảng viên (views.course_page_faculty).
+- 'loadMore/<int:code>/<str:stream>/' : Trang kế tiếp của thông báo, bài tập hoặc tài liệu (views.loadMore).
 - 'addAnnouncement/<int:code>/' : Trang thêm thông báo (views.addAnnouncement).
 - 'announcement/<int:code>/<int:id>/' : Trang xóa thông báo (views.deleteAnnouncement).
 - 'edit/<int:code>/<int:id>/' : Trang chỉnh sửa thông báo (views.editAnnouncement).
@@ -44,6 +45,7 @@ Danh sách mẫu URL:
 - 'changePhoto/' : Trang thay đổi ảnh đại diện (views.changePhoto).
 - 'changePhotoFaculty/' : Trang thay đổi ảnh đại diện cho giảng viên (views.changePhotoFaculty).
 - 'search/' : Trang tìm kiếm (views.search).
+- 'search/autocomplete/' : Gợi ý khóa học dạng JSON (views.autocomplete).
 - 'error/' : Trang lỗi (views.error).
 """
 
@@ -57,6 +59,7 @@ urlpatterns = [
     path('profile/<str:id>/', views.profile, name = 'profile'),
     path('facultyProfile/<str:id>/', views.profile, name = 'profile_faculty'),
     path('faculty/<int:code>/', views.course_page_faculty, name = 'faculty'),
+    path('loadMore/<int:code>/<str:stream>/', views.loadMore, name = 'loadMore'),
     path('addAnnouncement/<int:code>/', views.addAnnouncement, name = 'addAnnouncement'),
     path('announecement/<int:code>/<int:id>/', views.deleteAnnouncement, name = 'deleteAnnouncement'),
     path('edit/<int:code>/<int:id>/', views.editAnnouncement, name = 'editAnnouncement'),
@@ -80,5 +83,6 @@ urlpatterns = [
     path('changePhoto/', views.changePhoto, name = 'changePhoto'),
     path('changePhotoFaculty/', views.changePhotoFaculty, name = 'changePhotoFaculty'),
     path('search/', views.search, name = 'search'),
+    path('search/autocomplete/', views.autocomplete, name = 'autocomplete'),
     path('error/', views.error, name = 'error'),
 ]
\ No newline at end of file
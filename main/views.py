@@ -2,10 +2,16 @@ import datetime
 from django.shortcuts import redirect, render
 from django.contrib import messages
 from .models import Student, Course, Announcement, Assignment, Submission, Material, Faculty, Department
-from django.template.defaulttags import register
+from django.conf import settings
 from django.db.models import Count, Q
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseBadRequest, HttpResponseRedirect, JsonResponse
 from .forms import AnnouncementForm, AssignmentForm, MaterialForm
+from .authorization import authorization_index
+from .course_cache import course_cache
+from . import search as search_index
+from .autocomplete import course_autocomplete
+from .pagination import keyset_page, paginate, query_without_page
+from attendance.checkin import checkin_windows
 from django import forms
 from django.core import validators
 from django import forms
@@ -24,6 +30,17 @@ class LoginForm(forms.Form):
     password = forms.CharField(widget = forms.PasswordInput)
 
 
+# Các cách sắp xếp danh sách khóa học: tên tham số -> trường order_by
+COURSE_SORTS = {
+    'name': 'name',
+    '-name': '-name',
+    'code': 'code',
+    '-code': '-code',
+    'enrolled': 'enrolled_count',
+    '-enrolled': '-enrolled_count',
+}
+
+
 def is_student_authorised(request, code):
     """
     Kiểm tra xem sinh viên đã được ủy quyền cho một khóa học cụ thể hay chưa.
@@ -35,11 +52,10 @@ def is_student_authorised(request, code):
     Returns:
         bool: Trả về True nếu sinh viên được ủy quyền, False nếu không được ủy quyền.
 
-    Raises:
-        Course.DoesNotExist: Nếu không tìm thấy khóa học với mã tương ứng.
+    Notes:
+        - Tra cứu O(1) trong AuthorizationIndex, tối đa một truy vấn có chỉ mục khi cache nguội.
     """
-    course = Course.objects.get(code = code)
-    if request.session.get('student_id') and course in Student.objects.get(student_id = request.session['student_id']).course.all():
+    if request.session.get('student_id') and authorization_index.is_student_enrolled(request.session['student_id'], code):
         return True
     else:
         return False
@@ -55,13 +71,45 @@ def is_faculty_authorised(request, code):
 
     Returns:
         bool: Trả về True nếu giảng viên được ủy quyền, False nếu không được ủy quyền.
+
+    Notes:
+        - Tra cứu O(1) trong AuthorizationIndex, tối đa một truy vấn có chỉ mục khi cache nguội.
     """
-    if request.session.get('faculty_id') and code in Course.objects.filter(faculty_id = request.session['faculty_id']).values_list('code', flat = True):
+    if request.session.get('faculty_id') and authorization_index.is_faculty_owner(request.session['faculty_id'], code):
         return True
     else:
         return False
 
 
+def course_stream(course, stream, cursor = None, faculty = False):
+    """
+    Lấy một trang thông báo, bài tập hoặc tài liệu của khóa học (phân trang theo con trỏ trên datetime).
+
+    Args:
+        course (Course): Khóa học.
+        stream (str): 'announcements', 'assignments' hoặc 'materials'.
+        cursor (str): Con trỏ của trang kế tiếp, None cho trang đầu tiên.
+        faculty (bool): True nếu trang dành cho giảng viên (kèm số bài nộp của mỗi bài tập).
+
+    Returns:
+        KeysetPage: Trang kết quả.
+
+    Raises:
+        KeyError: Nếu stream không hợp lệ.
+        ValueError: Nếu con trỏ không hợp lệ.
+    """
+    size = settings.COURSE_STREAM_PAGE_SIZES[stream]
+    if stream == 'announcements':
+        queryset = Announcement.objects.filter(course_code = course.code)
+    elif stream == 'assignments':
+        queryset = Assignment.objects.filter(course_code = course.code).defer('description')
+        if faculty:
+            queryset = queryset.annotate(submission_count = Count('submission'))
+    else:
+        queryset = Material.objects.filter(course_code = course.code)
+    return keyset_page(queryset, cursor, size)
+
+
 def std_login(request):
     """
     Xử lý quá trình đăng nhập cho sinh viên và giảng viên.
@@ -86,10 +134,13 @@ def std_login(request):
 
             # Kiểm tra xem có tồn tại sinh viên với mã sinh viên và mật khẩu tương ứng
             if Student.objects.filter(student_id = id, password = password).exists():
+                # Xóa thông tin phiên trước đó để session chỉ chứa một người dùng
+                request.session.flush()
                 request.session['student_id'] = id
                 return redirect('myCourses')
             # Kiểm tra xem có tồn tại giảng viên với mã giảng viên và mật khẩu tương ứng
             elif Faculty.objects.filter(faculty_id = id, password = password).exists():
+                request.session.flush()
                 request.session['faculty_id'] = id
                 return redirect('facultyCourses')
             else:
@@ -152,7 +203,7 @@ def myCourses(request):
     try:
         if request.session.get('student_id'):
             # Lấy thông tin sinh viên từ session
-            student = Student.objects.get(student_id = request.session['student_id'])
+            student = request.principal
             # Lấy danh sách các khóa học của sinh viên
             courses = student.course.all()
             # Lấy danh sách giảng viên phụ trách các khóa học
@@ -188,7 +239,7 @@ def facultyCourses(request):
 
     Notes:
         - Nếu giảng viên đã đăng nhập (có session 'faculty_id'), danh sách các khóa học của giảng viên sẽ được hiển thị.
-        - Danh sách các khóa học bao gồm thông tin về khóa học và số lượng sinh viên tham gia mỗi khóa học.
+        - Danh sách các khóa học bao gồm thông tin về khóa học và số lượng sinh viên tham gia mỗi khóa học (Course.enrolled_count).
         - Nếu giảng viên chưa đăng nhập, sẽ chuyển hướng đến trang đăng nhập ('std_login').
         - Nếu xảy ra lỗi, sẽ chuyển hướng đến trang đăng nhập ('std_login').
 
@@ -196,25 +247,13 @@ def facultyCourses(request):
     try:
         if request.session['faculty_id']:
             # Lấy thông tin giảng viên từ session
-            faculty = Faculty.objects.get(faculty_id = request.session['faculty_id'])
-            # Lấy danh sách các khóa học do giảng viên phụ trách
-            courses = Course.objects.filter(faculty_id = request.session['faculty_id'])
-            # Đếm số lượng sinh viên tham gia mỗi khóa học
-            studentCount = Course.objects.all().annotate(student_count = Count('students'))
-
-            studentCountDict = {}
-
-            for course in studentCount:
-                studentCountDict[course.code] = course.student_count
-
-            @register.filter
-            def get_item(dictionary, course_code):
-                return dictionary.get(course_code)
+            faculty = request.principal
+            # Lấy danh sách các khóa học do giảng viên phụ trách (số sinh viên đọc từ cột enrolled_count)
+            courses = Course.objects.filter(faculty_id = request.session['faculty_id']).select_related('department')
 
             context = {
                 'courses': courses,
-                'faculty': faculty,
-                'studentCount': studentCountDict
+                'faculty': faculty
             }
 
             return render(request, 'main/facultyCourses.html', context)
@@ -244,29 +283,21 @@ def course_page(request, code):
     Notes:
         - Nếu sinh viên được ủy quyền (có quyền truy cập vào khóa học), trang chi tiết khóa học sẽ được hiển thị.
         - Trang chi tiết khóa học bao gồm danh sách thông báo, danh sách bài tập và danh sách tài liệu liên quan đến khóa học.
+        - Ô nhập mã tự check-in chỉ được hiển thị khi khóa học có lượt check-in đang mở.
         - Nếu sinh viên chưa đăng nhập hoặc không có quyền truy cập vào khóa học, sẽ chuyển hướng đến trang đăng nhập ('std_login').
         - Nếu xảy ra lỗi, sẽ hiển thị trang lỗi ('error.html').
     """
     try:
-        course = Course.objects.get(code = code)
+        course = course_cache.get(code)
         if is_student_authorised(request, code):
-            try:
-                # Lấy danh sách thông báo, danh sách bài tập và danh sách tài liệu của khóa học
-                announcements = Announcement.objects.filter(course_code = course)
-                assignments = Assignment.objects.filter(course_code = course.code)
-                materials = Material.objects.filter(course_code = course.code)
-
-            except Exception:
-                announcements = None
-                assignments = None
-                materials = None
-
+            # Chỉ lấy trang đầu tiên của thông báo, bài tập và tài liệu; các trang sau được tải qua loadMore
             context = {
                 'course': course,
-                'announcements': announcements,
-                'assignments': assignments[:3],
-                'materials': materials,
-                'student': Student.objects.get(student_id=request.session['student_id'])
+                'announcements': course_stream(course, 'announcements'),
+                'assignments': course_stream(course, 'assignments'),
+                'materials': course_stream(course, 'materials'),
+                'checkin_open': checkin_windows.get(code) is not None,
+                'student': request.principal
             }
 
             return render(request, 'main/course.html', context)
@@ -299,27 +330,16 @@ def course_page_faculty(request, code):
         - Nếu giảng viên chưa đăng nhập, hàm sẽ chuyển hướng người dùng đến trang đăng nhập ('std_login').
 
     """
-    course = Course.objects.get(code=code)
+    course = course_cache.get(code)
     if request.session.get('faculty_id'):
-        try:
-            # Lấy danh sách thông báo, danh sách bài tập, danh sách tài liệu và số lượng sinh viên tham gia khóa học
-            announcements = Announcement.objects.filter(course_code = course)
-            assignments = Assignment.objects.filter(course_code = course.code)
-            materials = Material.objects.filter(course_code = course.code)
-            studentCount = Student.objects.filter(course = course).count()
-
-        except Exception:
-            announcements = None
-            assignments = None
-            materials = None
-
+        # Chỉ lấy trang đầu tiên của thông báo, bài tập và tài liệu; các trang sau được tải qua loadMore
         context = {
             'course': course,
-            'announcements': announcements,
-            'assignments': assignments[:3],
-            'materials': materials,
-            'faculty': Faculty.objects.get(faculty_id = request.session['faculty_id']),
-            'studentCount': studentCount
+            'announcements': course_stream(course, 'announcements', faculty = True),
+            'assignments': course_stream(course, 'assignments', faculty = True),
+            'materials': course_stream(course, 'materials', faculty = True),
+            'faculty': request.principal,
+            'studentCount': course.enrolled_count
         }
 
         return render(request, 'main/faculty_course.html', context)
@@ -328,6 +348,46 @@ def course_page_faculty(request, code):
         return redirect('std_login')
 
 
+def loadMore(request, code, stream):
+    """
+    Trả về đoạn HTML chứa trang kế tiếp của thông báo, bài tập hoặc tài liệu của khóa học.
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest đại diện cho yêu cầu gửi đến server.
+            Tham số GET 'cursor' là con trỏ nhận được từ trang trước.
+        code (int): Mã khóa học.
+        stream (str): 'announcements', 'assignments' hoặc 'materials'.
+
+    Returns:
+        HttpResponse: Đoạn HTML của trang kế tiếp (kèm nút "Load more" nếu còn trang sau).
+
+    Notes:
+        - Sinh viên phải đã đăng ký khóa học, giảng viên phải phụ trách khóa học.
+        - Nếu con trỏ hoặc stream không hợp lệ, trả về lỗi 400.
+    """
+    if is_student_authorised(request, code):
+        faculty = None
+    elif is_faculty_authorised(request, code):
+        faculty = request.principal
+    else:
+        return redirect('std_login')
+    if stream not in settings.COURSE_STREAM_PAGE_SIZES:
+        return HttpResponseBadRequest('Unknown stream')
+    try:
+        course = course_cache.get(code)
+        page = course_stream(course, stream, request.GET.get('cursor'), faculty = faculty is not None)
+    except (Course.DoesNotExist, ValueError):
+        return HttpResponseBadRequest('Invalid cursor')
+    context = {
+        'course': course,
+        stream: page,
+        'page': page,
+        'faculty': faculty,
+        'studentCount': course.enrolled_count,
+    }
+    return render(request, 'main/course-%s.html' % stream, context)
+
+
 def error(request):
     """
     Hiển thị trang lỗi.
@@ -371,14 +431,14 @@ def profile(request, id):
     """
     try:
         if request.session['student_id'] == id:
-            student = Student.objects.get(student_id = id)
+            student = request.principal
             return render(request, 'main/profile.html', {'student': student})
         else:
             return redirect('std_login')
     except:
         try:
             if request.session['faculty_id'] == id:
-                faculty = Faculty.objects.get(faculty_id = id)
+                faculty = request.principal
                 return render(request, 'main/faculty_profile.html', {'faculty': faculty})
             else:
                 return redirect('std_login')
@@ -411,14 +471,14 @@ def addAnnouncement(request, code):
     if is_faculty_authorised(request, code):
         if request.method == 'POST':
             form = AnnouncementForm(request.POST)
-            form.instance.course_code = Course.objects.get(code = code)
+            form.instance.course_code = course_cache.get(code)
             if form.is_valid():
                 form.save()
                 messages.success(request, 'Announcement added successfully.')
                 return redirect('/faculty/' + str(code))
         else:
             form = AnnouncementForm()
-        return render(request, 'main/announcement.html', {'course': Course.objects.get(code = code), 'faculty': Faculty.objects.get(faculty_id = request.session['faculty_id']), 'form': form})
+        return render(request, 'main/announcement.html', {'course': course_cache.get(code), 'faculty': request.principal, 'form': form})
     else:
         return redirect('std_login')
 
@@ -483,8 +543,8 @@ def editAnnouncement(request, code, id):
         form = AnnouncementForm(instance = announcement)
         context = {
             'announcement': announcement,
-            'course': Course.objects.get(code = code),
-            'faculty': Faculty.objects.get(faculty_id = request.session['faculty_id']),
+            'course': course_cache.get(code),
+            'faculty': request.principal,
             'form': form
         }
         return render(request, 'main/update-announcement.html', context)
@@ -552,14 +612,14 @@ def addAssignment(request, code):
     if is_faculty_authorised(request, code):
         if request.method == 'POST':
             form = AssignmentForm(request.POST, request.FILES)
-            form.instance.course_code = Course.objects.get(code = code)
+            form.instance.course_code = course_cache.get(code)
             if form.is_valid():
                 form.save()
                 messages.success(request, 'Assignment added successfully.')
                 return redirect('/faculty/' + str(code))
         else:
             form = AssignmentForm()
-        return render(request, 'main/assignment.html', {'course': Course.objects.get(code = code), 'faculty': Faculty.objects.get(faculty_id = request.session['faculty_id']), 'form': form})
+        return render(request, 'main/assignment.html', {'course': course_cache.get(code), 'faculty': request.principal, 'form': form})
     else:
         return redirect('std_login')
 
@@ -587,7 +647,7 @@ def assignmentPage(request, code, id):
 
     """
     # Lấy thông tin khóa học
-    course = Course.objects.get(code = code)
+    course = course_cache.get(code)
 
     # Kiểm tra người dùng có quyền truy cập vào khóa học hay không
     if is_student_authorised(request, code):
@@ -596,15 +656,15 @@ def assignmentPage(request, code, id):
 
         try:
             # Kiểm tra nếu sinh viên đã nộp bài tập
-            submission = Submission.objects.get(assignment = assignment, student = Student.objects.get(student_id = request.session['student_id']))
+            submission = Submission.objects.get(assignment = assignment, student = request.principal)
 
             context = {
                 'assignment': assignment,
                 'course': course,
                 'submission': submission,
                 'time': datetime.datetime.now(),
-                'student': Student.objects.get(student_id=request.session['student_id']),
-                'courses': Student.objects.get(student_id=request.session['student_id']).course.all()
+                'student': request.principal,
+                'courses': request.principal.course.all()
             }
 
             # Render trang bài tập với thông tin bài tập và nộp bài tập
@@ -617,8 +677,8 @@ def assignmentPage(request, code, id):
             'course': course,
             'submission': submission,
             'time': datetime.datetime.now(),
-            'student': Student.objects.get(student_id=request.session['student_id']),
-            'courses': Student.objects.get(student_id=request.session['student_id']).course.all()
+            'student': request.principal,
+            'courses': request.principal.course.all()
         }
 
         # Render trang bài tập chỉ với thông tin bài tập (không có nộp bài tập)
@@ -649,18 +709,18 @@ def allAssignments(request, code):
     """
     if is_faculty_authorised(request, code):
         # Lấy thông tin khóa học
-        course = Course.objects.get(code = code)
+        course = course_cache.get(code)
 
         # Lấy danh sách bài tập
         assignments = Assignment.objects.filter(course_code = course)
 
-        # Đếm số lượng sinh viên trong khóa học
-        studentCount = Student.objects.filter(course=course).count()
+        # Số lượng sinh viên trong khóa học
+        studentCount = course.enrolled_count
 
         context = {
             'assignments': assignments,
             'course': course,
-            'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id']),
+            'faculty': request.principal,
             'studentCount': studentCount
         }
 
@@ -692,7 +752,7 @@ def allAssignmentsSTD(request, code):
     """
     if is_student_authorised(request, code):
         # Lấy thông tin khóa học
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
 
         # Lấy danh sách bài tập
         assignments = Assignment.objects.filter(course_code = course)
@@ -700,7 +760,7 @@ def allAssignmentsSTD(request, code):
         context = {
             'assignments': assignments,
             'course': course,
-            'student': Student.objects.get(student_id=request.session['student_id'])
+            'student': request.principal
         }
 
         # Render trang danh sách bài tập cho sinh viên
@@ -734,7 +794,7 @@ def addSubmission(request, code, id):
     """
     try:
         # Lấy thông tin khóa học
-        course = Course.objects.get(code = code)
+        course = course_cache.get(code)
 
         if is_student_authorised(request, code):
             # Kiểm tra xem bài tập có đang mở hay không dựa trên thời hạn nộp
@@ -747,7 +807,7 @@ def addSubmission(request, code, id):
                 assignment = Assignment.objects.get(course_code=course.code, id = id)
                 submission = Submission(
                     assignment=assignment,
-                    student=Student.objects.get(student_id=request.session['student_id']),
+                    student=request.principal,
                     file=request.FILES['file']
                 )
                 submission.status = 'Submitted'
@@ -758,15 +818,15 @@ def addSubmission(request, code, id):
                 assignment = Assignment.objects.get(course_code=course.code, id = id)
                 submission = Submission.objects.get(
                     assignment=assignment,
-                    student=Student.objects.get(student_id=request.session['student_id'])
+                    student=request.principal
                 )
                 context = {
                     'assignment': assignment,
                     'course': course,
                     'submission': submission,
                     'time': datetime.datetime.now(),
-                    'student': Student.objects.get(student_id=request.session['student_id']),
-                    'courses': Student.objects.get(student_id=request.session['student_id']).course.all()
+                    'student': request.principal,
+                    'courses': request.principal.course.all()
                 }
                 return render(request, 'main/assignment-portal.html', context)
         else:
@@ -798,7 +858,7 @@ def viewSubmission(request, code, id):
         - Hiển thị trang xem danh sách bài nộp.
     """
     # Lấy thông tin về khóa học từ mã khóa học được cung cấp
-    course = Course.objects.get(code = code)
+    course = course_cache.get(code)
 
     # Kiểm tra xem người dùng có quyền truy cập là giáo viên của khóa học hay không
     if is_faculty_authorised(request, code):
@@ -814,8 +874,8 @@ def viewSubmission(request, code, id):
                 'course': course,
                 'submissions': submissions,
                 'assignment': assignment,
-                'totalStudents': len(Student.objects.filter(course=course)),
-                'faculty': Faculty.objects.get(faculty_id= request.session['faculty_id']),
+                'totalStudents': course.enrolled_count,
+                'faculty': request.principal,
                 'courses': Course.objects.filter(faculty_id=request.session['faculty_id'])
             }
 
@@ -849,7 +909,7 @@ def gradeSubmission(request, code, id, sub_id):
 
     try:
         # Lấy thông tin về khóa học từ mã khóa học được cung cấp
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
 
         # Kiểm tra xem người dùng có quyền truy cập là giáo viên của khóa học hay không
         if is_faculty_authorised(request, code):
@@ -890,8 +950,8 @@ def gradeSubmission(request, code, id, sub_id):
                     'course': course,
                     'submissions': submissions,
                     'assignment': assignment,
-                    'totalStudents': len(Student.objects.filter(course=course)),
-                    'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id']),
+                    'totalStudents': course.enrolled_count,
+                    'faculty': request.principal,
                     'courses': Course.objects.filter(faculty_id=request.session['faculty_id'])
                 }
 
@@ -925,7 +985,7 @@ def addCourseMaterial(request, code):
         if request.method == 'POST':
             # Xử lý yêu cầu POST - gửi biểu mẫu để thêm tài liệu khóa học
             form = MaterialForm(request.POST, request.FILES)
-            form.instance.course_code = Course.objects.get(code=code)
+            form.instance.course_code = course_cache.get(code)
             if form.is_valid():
                 # Nếu biểu mẫu hợp lệ, lưu tài liệu khóa học vào cơ sở dữ liệu
                 form.save()
@@ -933,11 +993,11 @@ def addCourseMaterial(request, code):
                 return redirect('/faculty/' + str(code))
             else:
                 # Nếu biểu mẫu không hợp lệ, hiển thị lại biểu mẫu với thông báo lỗi
-                return render(request, 'main/course-material.html', {'course': Course.objects.get(code=code), 'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id']), 'form': form})
+                return render(request, 'main/course-material.html', {'course': course_cache.get(code), 'faculty': request.principal, 'form': form})
         else:
             # Xử lý yêu cầu GET - hiển thị biểu mẫu để thêm tài liệu khóa học
             form = MaterialForm()
-            return render(request, 'main/course-material.html', {'course': Course.objects.get(code=code), 'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id']), 'form': form})
+            return render(request, 'main/course-material.html', {'course': course_cache.get(code), 'faculty': request.principal, 'form': form})
     else:
         # Nếu người dùng không có quyền truy cập, chuyển hướng người dùng về trang đăng nhập
         return redirect('std_login')
@@ -960,7 +1020,7 @@ def deleteCourseMaterial(request, code, id):
     """
 
     if is_faculty_authorised(request, code):
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
         course_material = Material.objects.get(course_code=course, id = id)
         course_material.delete()
         messages.warning(request, 'Course material deleted')
@@ -972,46 +1032,69 @@ def deleteCourseMaterial(request, code, id):
 
 def courses(request):
     """
-    Hiển thị danh sách tất cả các khóa học.
+    Hiển thị danh sách tất cả các khóa học (có phân trang, sắp xếp và lọc).
 
     Args:
         request (HttpRequest): Đối tượng HttpRequest chứa thông tin về yêu cầu HTTP.
+            Tham số GET: 'department' (mã bộ môn), 'q' (tiền tố tên khóa học),
+            'sort' (một trong COURSE_SORTS) và 'page'.
 
     Returns:
         HttpResponse: Đối tượng HttpResponse chứa kết quả trả về cho yêu cầu.
 
     Raises:
         N/A
+
+    Notes:
+        - Chỉ tải các cột hiển thị trên thẻ khóa học (.only()), sử dụng chỉ mục (department, name).
+        - Tổng số khóa học của mỗi bộ lọc được lưu trong count_cache và bị vô hiệu hóa khi khóa học thay đổi.
     """
 
     if request.session.get('student_id') or request.session.get('faculty_id'):
 
-        courses = Course.objects.all()
+        courses = Course.objects.select_related('department', 'faculty').only(
+            'code', 'name', 'enrolled_count', 'department__name', 'faculty__name')
+
+        # Lọc theo bộ môn và tiền tố tên khóa học
+        department = request.GET.get('department', '')
+        if department.isdigit():
+            courses = courses.filter(department_id = int(department))
+        else:
+            department = ''
+        prefix = request.GET.get('q', '').strip()
+        if prefix:
+            courses = courses.filter(name__istartswith = prefix)
+        sort = request.GET.get('sort', 'name')
+        if sort not in COURSE_SORTS:
+            sort = 'name'
+        courses = courses.order_by(COURSE_SORTS[sort], 'code')
+
+        page_obj = paginate(request, courses, settings.COURSE_CATALOGUE_PAGE_SIZE, 'courses', (department, prefix.lower()))
 
         # Kiểm tra xem người dùng là sinh viên hay giảng viên
         if request.session.get('student_id'):
-            student = Student.objects.get(
-                student_id=request.session['student_id'])
+            student = request.principal
         else:
             student = None
 
         if request.session.get('faculty_id'):
-            faculty = Faculty.objects.get(
-                faculty_id=request.session['faculty_id'])
+            faculty = request.principal
         else:
             faculty = None
 
-        # Lấy danh sách khóa học mà sinh viên đã đăng ký (nếu là sinh viên) hoặc danh sách khóa học giảng dạy (nếu là giảng viên)
-        enrolled = student.course.all() if student else None
-        accessed = Course.objects.filter(
-            faculty_id=faculty.faculty_id) if faculty else None
-
         context = {
             'faculty': faculty,
-            'courses': courses,
+            'courses': page_obj,
+            'page_obj': page_obj,
             'student': student,
-            'enrolled': enrolled,
-            'accessed': accessed
+            # Mã các khóa học sinh viên đã đăng ký (lấy từ chỉ mục quyền, không truy vấn thêm)
+            'enrolled': request.course_codes if student else None,
+            'departments': Department.objects.only('department_id', 'name').order_by('name'),
+            'department': department,
+            'q': prefix,
+            'sort': sort,
+            'sorts': COURSE_SORTS,
+            'query': query_without_page(request),
         }
 
         return render(request, 'main/all-courses.html', context)
@@ -1036,18 +1119,17 @@ def departments(request):
     """
 
     if request.session.get('student_id') or request.session.get('faculty_id'):
+        # Số sinh viên, giảng viên và khóa học được đọc từ các cột thống kê, chỉ cần một truy vấn
         departments = Department.objects.all()
 
         # Kiểm tra xem người dùng là sinh viên hay giảng viên
         if request.session.get('student_id'):
-            student = Student.objects.get(
-                student_id=request.session['student_id'])
+            student = request.principal
         else:
             student = None
 
         if request.session.get('faculty_id'):
-            faculty = Faculty.objects.get(
-                faculty_id=request.session['faculty_id'])
+            faculty = request.principal
         else:
             faculty = None
 
@@ -1080,8 +1162,8 @@ def access(request, code):
     """
 
     if request.session.get('student_id'):
-        course = Course.objects.get(code=code)
-        student = Student.objects.get(student_id=request.session['student_id'])
+        course = course_cache.get(code)
+        student = request.principal
 
         if request.method == 'POST':
             # Kiểm tra mã khóa nhập vào với mã khóa của khóa học
@@ -1102,7 +1184,7 @@ def access(request, code):
 
 def search(request):
     """
-    Tìm kiếm khóa học dựa trên từ khóa nhập vào.
+    Tìm kiếm khóa học và nội dung khóa học dựa trên từ khóa nhập vào.
 
     Args:
         request (HttpRequest): Đối tượng HttpRequest chứa thông tin về yêu cầu HTTP.
@@ -1112,23 +1194,47 @@ def search(request):
 
     Raises:
         N/A
+
+    Notes:
+        - Khi có chỉ mục FTS5 (main/search.py), kết quả được xếp hạng theo độ liên quan và bao gồm
+          thông báo, tài liệu, bài tập trong các khóa học mà người dùng đã đăng ký hoặc phụ trách.
+        - Nếu không, quay về tìm kiếm icontains trên mã khóa, tên khóa học và tên giảng viên.
     """
 
     if request.session.get('student_id') or request.session.get('faculty_id'):
-        if request.method == 'GET' and request.GET['q']:
+        if request.method == 'GET' and request.GET.get('q'):
             q = request.GET['q']
-            # Tìm kiếm khóa học dựa trên mã khóa, tên khóa học, hoặc tên của khoa giảng dạy
-            courses = Course.objects.filter(Q(code__icontains=q) | Q(
-                name__icontains=q) | Q(faculty__name__icontains=q))
+            results = []
+            if search_index.is_available():
+                hits = search_index.search(q, request.course_codes)
+                # Giữ thứ tự theo độ liên quan của các khóa học tìm được
+                course_ranks = {hit.object_id: i for i, hit in enumerate(hits) if hit.kind == 'course'}
+                courses = sorted(Course.objects.filter(code__in = course_ranks).select_related('department', 'faculty'),
+                                 key = lambda course: course_ranks[course.code])
+                prefix = 'faculty' if request.session.get('faculty_id') else 'my'
+                for hit in hits:
+                    if hit.kind == 'course':
+                        continue
+                    try:
+                        hit.course = course_cache.get(hit.course_code)
+                    except Course.DoesNotExist:
+                        continue
+                    if hit.kind == 'assignment':
+                        hit.url = '/%s/%s/%s/' % ('submission' if prefix == 'faculty' else 'assignment', hit.course_code, hit.object_id)
+                    else:
+                        hit.url = '/%s/%s/' % (prefix, hit.course_code)
+                    results.append(hit)
+            else:
+                # Tìm kiếm khóa học dựa trên mã khóa, tên khóa học, hoặc tên của khoa giảng dạy
+                courses = Course.objects.filter(Q(code__icontains=q) | Q(
+                    name__icontains=q) | Q(faculty__name__icontains=q)).select_related('department', 'faculty')
 
             if request.session.get('student_id'):
-                student = Student.objects.get(
-                    student_id=request.session['student_id'])
+                student = request.principal
             else:
                 student = None
             if request.session.get('faculty_id'):
-                faculty = Faculty.objects.get(
-                    faculty_id=request.session['faculty_id'])
+                faculty = request.principal
             else:
                 faculty = None
             enrolled = student.course.all() if student else None
@@ -1137,6 +1243,7 @@ def search(request):
 
             context = {
                 'courses': courses,
+                'results': results,
                 'faculty': faculty,
                 'student': student,
                 'enrolled': enrolled,
@@ -1152,6 +1259,30 @@ def search(request):
         return redirect('std_login')
 
 
+def autocomplete(request):
+    """
+    Gợi ý khóa học theo tiền tố mã hoặc tên khóa học (JSON).
+
+    Args:
+        request (HttpRequest): Đối tượng HttpRequest chứa thông tin về yêu cầu HTTP.
+            Tham số GET 'q' là chuỗi đang gõ, 'limit' (tùy chọn, tối đa 20) là số gợi ý.
+
+    Returns:
+        JsonResponse: {'results': [{'code', 'name', 'department'}, ...]}.
+
+    Notes:
+        - Dữ liệu lấy từ chỉ mục trong bộ nhớ (main/autocomplete.py), không truy vấn cơ sở dữ liệu cho mỗi lần gõ phím.
+    """
+
+    if not (request.session.get('student_id') or request.session.get('faculty_id')):
+        return JsonResponse({'results': []}, status = 403)
+    try:
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 20)
+    except ValueError:
+        limit = 10
+    return JsonResponse({'results': course_autocomplete.complete(request.GET.get('q', ''), limit)})
+
+
 def changePasswordPrompt(request):
     """
     Hiển thị giao diện yêu cầu thay đổi mật khẩu.
@@ -1167,10 +1298,10 @@ def changePasswordPrompt(request):
     """
 
     if request.session.get('student_id'):
-        student = Student.objects.get(student_id=request.session['student_id'])
+        student = request.principal
         return render(request, 'main/changePassword.html', {'student': student})
     elif request.session.get('faculty_id'):
-        faculty = Faculty.objects.get(faculty_id=request.session['faculty_id'])
+        faculty = request.principal
         return render(request, 'main/changePasswordFaculty.html', {'faculty': faculty})
     else:
         # Nếu người dùng không có quyền truy cập, chuyển hướng người dùng về trang đăng nhập
@@ -1194,13 +1325,13 @@ def changePhotoPrompt(request):
     # Kiểm tra xem người dùng có phải là sinh viên hay không
     if request.session.get('student_id'):
         # Lấy thông tin sinh viên từ session
-        student = Student.objects.get(student_id=request.session['student_id'])
+        student = request.principal
         # Trả về giao diện thay đổi ảnh đại diện cho sinh viên
         return render(request, 'main/changePhoto.html', {'student': student})
     # Kiểm tra xem người dùng có phải là giảng viên hay không
     elif request.session.get('faculty_id'):
         # Lấy thông tin giảng viên từ session
-        faculty = Faculty.objects.get(faculty_id=request.session['faculty_id'])
+        faculty = request.principal
         # Trả về giao diện thay đổi ảnh đại diện cho giảng viên
         return render(request, 'main/changePhotoFaculty.html', {'faculty': faculty})
     else:
@@ -1225,7 +1356,7 @@ def changePassword(request):
     # Kiểm tra xem người dùng có phải là sinh viên hay không
     if request.session.get('student_id'):
         # Lấy thông tin sinh viên từ session
-        student = Student.objects.get(student_id=request.session['student_id'])
+        student = request.principal
         if request.method == 'POST':
             if student.password == request.POST['oldPassword']:
                 # Kiểm tra xem mật khẩu cũ đã đúng hay chưa
@@ -1263,7 +1394,7 @@ def changePasswordFaculty(request):
     # Kiểm tra xem người dùng có phải là giảng viên hay không
     if request.session.get('faculty_id'):
         # Lấy thông tin giảng viên từ session
-        faculty = Faculty.objects.get(faculty_id=request.session['faculty_id'])
+        faculty = request.principal
         if request.method == 'POST':
             if faculty.password == request.POST['oldPassword']:
                 # Kiểm tra xem mật khẩu cũ đã đúng hay chưa
@@ -1301,7 +1432,7 @@ def changePhoto(request):
     # Kiểm tra xem người dùng có phải là sinh viên hay không
     if request.session.get('student_id'):
         # Lấy thông tin sinh viên từ session
-        student = Student.objects.get(student_id=request.session['student_id'])
+        student = request.principal
         if request.method == 'POST':
             if request.FILES['photo']:
                 # Kiểm tra xem người dùng đã chọn ảnh hay chưa
@@ -1338,7 +1469,7 @@ def changePhotoFaculty(request):
     # Kiểm tra xem người dùng có phải là giảng viên hay không
     if request.session.get('faculty_id'):
         # Lấy thông tin giảng viên từ session
-        faculty = Faculty.objects.get(faculty_id=request.session['faculty_id'])
+        faculty = request.principal
         if request.method == 'POST':
             if request.FILES['photo']:
                 # Kiểm tra xem người dùng đã chọn ảnh hay chưa
@@ -1,6 +1,8 @@
 from django.contrib import admin
-from . models import Quiz, Question, StudentAnswer
+from . models import Quiz, Question, StudentAnswer, QuizAttempt, QuizDraft
 # Register your models here.
 admin.site.register(Quiz)
 admin.site.register(Question)
 admin.site.register(StudentAnswer)
+admin.site.register(QuizAttempt)
+admin.site.register(QuizDraft)
@@ -0,0 +1,189 @@
+import threading
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.db.models import Count, Max
+from .models import StudentAnswer
+
+try:
+    import numpy as np
+except ImportError:  # NumPy là phụ thuộc tùy chọn, chỉ cần cho phân tích câu hỏi
+    np = None
+
+
+OPTIONS = ('A', 'B', 'C', 'D')
+
+# Tỷ lệ sinh viên của nhóm điểm cao và nhóm điểm thấp dùng để tính độ phân biệt
+GROUP_FRACTION = 0.27
+
+# Một phương án nhiễu được coi là hiệu quả nếu ít nhất 5% sinh viên chọn và nhóm điểm thấp chọn nhiều hơn nhóm điểm cao
+DISTRACTOR_MIN_SHARE = 0.05
+
+
+Distractor = namedtuple('Distractor', ['option', 'count', 'share', 'upper', 'lower', 'is_key', 'effective'])
+
+ItemStatistics = namedtuple('ItemStatistics', ['question', 'difficulty', 'discrimination', 'point_biserial', 'distractors'])
+
+ItemAnalysis = namedtuple('ItemAnalysis', ['students', 'group_size', 'items'])
+
+
+def is_available():
+    """Kiểm tra NumPy đã được cài đặt hay chưa."""
+    return np is not None
+
+
+def answer_matrix(quiz, questions):
+    """
+    Tải toàn bộ câu trả lời của bài trắc nghiệm vào ma trận sinh viên × câu hỏi bằng một truy vấn.
+
+    Args:
+        quiz (Quiz): Bài trắc nghiệm.
+        questions (list[Question]): Các câu hỏi theo thứ tự cột của ma trận.
+
+    Returns:
+        numpy.ndarray: Ma trận uint8, 0 là bỏ trống và 1-4 là phương án A-D.
+    """
+    columns = {question.id: index for index, question in enumerate(questions)}
+    rows = {}
+    cells = []
+    for student_id, question_id, answer in StudentAnswer.objects.filter(quiz=quiz).values_list('student_id', 'question_id', 'answer'):
+        column = columns.get(question_id)
+        if column is not None:
+            cells.append((rows.setdefault(student_id, len(rows)), column, OPTIONS.index(answer) + 1 if answer in OPTIONS else 0))
+
+    matrix = np.zeros((len(rows), len(questions)), dtype=np.uint8)
+    if cells:
+        row_index, column_index, values = np.array(cells, dtype=np.int64).T
+        matrix[row_index, column_index] = values
+    return matrix
+
+
+def analyse(matrix, key, marks):
+    """
+    Tính các chỉ số của từng câu hỏi từ ma trận câu trả lời.
+
+    Args:
+        matrix (numpy.ndarray): Ma trận sinh viên × câu hỏi (0 là bỏ trống, 1-4 là A-D).
+        key (numpy.ndarray): Đáp án đúng của từng câu hỏi (1-4).
+        marks (numpy.ndarray): Điểm của từng câu hỏi.
+
+    Returns:
+        dict: difficulty, discrimination, point_biserial (mảng theo câu hỏi), shares, upper, lower
+        (mảng phương án × câu hỏi), counts và group_size. discrimination, upper và lower là None
+        (group_size là 0) khi không đủ sinh viên để chia hai nhóm tách rời.
+
+    Notes:
+        - Độ khó là tỷ lệ sinh viên trả lời đúng.
+        - Độ phân biệt là chênh lệch độ khó giữa 27% sinh viên điểm cao nhất và 27% điểm thấp nhất.
+        - Hệ số point-biserial là tương quan giữa việc trả lời đúng và tổng điểm các câu còn lại (đã hiệu chỉnh).
+    """
+    students = matrix.shape[0]
+    correct = (matrix == key).astype(np.float64)
+    scores = correct @ marks
+
+    difficulty = correct.mean(axis=0)
+
+    # Hai nhóm phải tách rời nhau; quá ít sinh viên thì không tính độ phân biệt
+    group_size = int(round(students * GROUP_FRACTION))
+    if group_size < 1 or students < 2 * group_size:
+        group_size = 0
+    order = np.argsort(scores, kind='stable')
+    lower, upper = order[:group_size], order[students - group_size:]
+    discrimination = correct[upper].mean(axis=0) - correct[lower].mean(axis=0) if group_size else None
+
+    # Tương quan giữa cột đúng/sai và tổng điểm các câu còn lại, tính đồng thời cho mọi câu hỏi
+    rest = scores[:, None] - correct * marks
+    correct_centred = correct - difficulty
+    rest_centred = rest - rest.mean(axis=0)
+    denominator = np.sqrt((correct_centred ** 2).sum(axis=0) * (rest_centred ** 2).sum(axis=0))
+    covariance = (correct_centred * rest_centred).sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        point_biserial = np.where(denominator > 0, covariance / denominator, np.nan)
+
+    # Số lần chọn từng phương án (hàng 0 là bỏ trống, 1-4 là A-D)
+    chosen = np.stack([matrix == option for option in range(len(OPTIONS) + 1)])
+    counts = chosen.sum(axis=1)
+    return {
+        'difficulty': difficulty,
+        'discrimination': discrimination,
+        'point_biserial': point_biserial,
+        'counts': counts,
+        'shares': counts / students,
+        'upper': chosen[:, upper].mean(axis=1) if group_size else None,
+        'lower': chosen[:, lower].mean(axis=1) if group_size else None,
+        'group_size': group_size,
+    }
+
+
+def build_analysis(quiz, questions):
+    """Tải ma trận câu trả lời và tạo ItemAnalysis cho các câu hỏi, None nếu chưa có câu trả lời nào."""
+    matrix = answer_matrix(quiz, questions)
+    if not matrix.size:
+        return None
+    key = np.array([OPTIONS.index(question.answer) + 1 for question in questions], dtype=np.uint8)
+    marks = np.array([question.marks for question in questions], dtype=np.float64)
+    stats = analyse(matrix, key, marks)
+
+    items = []
+    for column, question in enumerate(questions):
+        distractors = []
+        for option_index, option in enumerate(OPTIONS, 1):
+            is_key = option_index == key[column]
+            share = float(stats['shares'][option_index, column])
+            if stats['group_size']:
+                upper = float(stats['upper'][option_index, column])
+                lower = float(stats['lower'][option_index, column])
+            else:
+                upper = lower = None
+            distractors.append(Distractor(option, int(stats['counts'][option_index, column]), share, upper, lower, is_key,
+                                          not is_key and upper is not None and share >= DISTRACTOR_MIN_SHARE and lower > upper))
+        point_biserial = stats['point_biserial'][column]
+        discrimination = float(stats['discrimination'][column]) if stats['group_size'] else None
+        items.append(ItemStatistics(question, float(stats['difficulty'][column]), discrimination,
+                                    None if np.isnan(point_biserial) else float(point_biserial), distractors))
+    return ItemAnalysis(matrix.shape[0], stats['group_size'], items)
+
+
+class ItemAnalysisCache:
+    """
+    Cache kết quả phân tích câu hỏi trong bộ nhớ tiến trình.
+
+    Khóa của mỗi mục gồm thời điểm và số lượng câu trả lời mới nhất của bài trắc nghiệm cùng đáp án và điểm
+    của các câu hỏi, nên kết quả tự động được tính lại khi có bài nộp mới hoặc khi đề thay đổi.
+
+    Thuộc tính:
+        - maxsize: Số bài trắc nghiệm tối đa được lưu (cấu hình ITEM_ANALYSIS_CACHE_SIZE).
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize if maxsize is not None else getattr(settings, 'ITEM_ANALYSIS_CACHE_SIZE', 32)
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, quiz, questions):
+        """
+        Trả về ItemAnalysis của bài trắc nghiệm, dùng kết quả đã cache nếu chưa có câu trả lời mới.
+
+        Returns:
+            ItemAnalysis: Kết quả phân tích; None nếu NumPy chưa được cài đặt hoặc chưa có câu trả lời nào.
+        """
+        if not is_available():
+            return None
+        latest = StudentAnswer.objects.filter(quiz=quiz).aggregate(last=Max('created_at'), total=Count('id'))
+        stamp = (latest['last'], latest['total'], tuple((question.id, question.answer, question.marks) for question in questions))
+        with self._lock:
+            entry = self._entries.get(quiz.pk)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(quiz.pk)
+                return entry[1]
+
+        analysis = build_analysis(quiz, questions)
+
+        with self._lock:
+            self._entries[quiz.pk] = (stamp, analysis)
+            self._entries.move_to_end(quiz.pk)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return analysis
+
+
+item_analysis = ItemAnalysisCache()
@@ -0,0 +1,195 @@
+import datetime
+import logging
+import threading
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from .models import QuizAttempt, QuizDraft
+
+
+logger = logging.getLogger(__name__)
+
+OPTIONS = ('A', 'B', 'C', 'D')
+
+
+class AutosaveBuffer:
+    """
+    Bộ đệm ghi sau (write-behind) trong bộ nhớ tiến trình cho các câu trả lời đang làm dở.
+
+    Mỗi lần autosave chỉ gộp thay đổi (question_id -> phương án) vào bộ đệm; các thay đổi được ghi theo lô
+    vào QuizDraft khi bộ đệm có AUTOSAVE_FLUSH_SIZE bài làm chờ ghi, hoặc sau AUTOSAVE_FLUSH_INTERVAL giây.
+    Nhiều lần đổi đáp án của cùng một câu trước lần ghi được gộp thành một, nên số dòng ghi thường ít hơn số thay đổi.
+
+    Thuộc tính:
+        - flush_size: Số bài làm chờ ghi để kích hoạt ghi ngay.
+        - flush_interval: Thời gian (giây) tối đa một thay đổi nằm trong bộ đệm.
+
+    Notes:
+        - Các thay đổi chưa được ghi sẽ mất nếu tiến trình dừng đột ngột, tối đa flush_interval giây.
+        - stats() trả về các bộ đếm để đo hệ số khuếch đại ghi (số dòng ghi / số thay đổi nhận được).
+    """
+
+    def __init__(self, flush_size=None, flush_interval=None):
+        self.flush_size = flush_size if flush_size is not None else getattr(settings, 'AUTOSAVE_FLUSH_SIZE', 50)
+        self.flush_interval = flush_interval if flush_interval is not None else getattr(settings, 'AUTOSAVE_FLUSH_INTERVAL', 5)
+        self._lock = threading.Lock()
+        # Khóa riêng cho việc ghi để chỉ một lần ghi chạy tại một thời điểm
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+        self._timer = None
+        self.requests = 0
+        self.changes = 0
+        self.rows_written = 0
+        self.flushes = 0
+
+    def add(self, student_id, quiz_id, changes):
+        """
+        Gộp các thay đổi của một lần autosave vào bộ đệm.
+
+        Args:
+            student_id (int): Mã sinh viên.
+            quiz_id (int): Mã bài trắc nghiệm.
+            changes (dict): Ánh xạ str(question_id) -> phương án ('A'-'D').
+        """
+        with self._lock:
+            self._pending.setdefault((student_id, quiz_id), {}).update(changes)
+            self.requests += 1
+            self.changes += len(changes)
+            full = len(self._pending) >= self.flush_size
+            if not full and self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+        if full:
+            self.flush()
+
+    def discard(self, student_id, quiz_id):
+        """
+        Xóa bản nháp của một bài làm khi sinh viên nộp bài; phải được gọi trong transaction ghi bài làm.
+
+        Notes:
+            - Dòng QuizDraft được xóa trong transaction hiện tại; các thay đổi chưa ghi chỉ được bỏ khỏi bộ đệm
+              sau khi transaction được commit, nên nếu lưu bài làm lỗi thì bản nháp vẫn còn nguyên.
+        """
+        QuizDraft.objects.filter(student_id=student_id, quiz_id=quiz_id).delete()
+        transaction.on_commit(lambda: self._drop(student_id, quiz_id))
+
+    def _drop(self, student_id, quiz_id):
+        with self._lock:
+            self._pending.pop((student_id, quiz_id), None)
+
+    def pending(self, student_id, quiz_id):
+        """Bản sao các thay đổi chưa ghi của một bài làm."""
+        with self._lock:
+            return dict(self._pending.get((student_id, quiz_id), {}))
+
+    def flush(self):
+        """
+        Ghi mọi thay đổi đang chờ vào QuizDraft trong một transaction.
+
+        Returns:
+            int: Số dòng QuizDraft đã được ghi.
+
+        Notes:
+            - Các bản nháp hiện có được đọc bằng một truy vấn, sau đó được ghi bằng một lệnh bulk_update
+              và một lệnh bulk_create cho các bản nháp mới.
+            - Bài làm đã nộp (đã có QuizAttempt) bị bỏ qua, để bộ đệm của một tiến trình khác không tạo lại
+              bản nháp đã bị xóa khi nộp bài.
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+            if not pending:
+                return 0
+
+            try:
+                written = self._write(pending)
+            except Exception:
+                # Trả các thay đổi về bộ đệm (thay đổi mới hơn được ưu tiên) để lần ghi sau thử lại
+                with self._lock:
+                    for key, changes in pending.items():
+                        self._pending[key] = {**changes, **self._pending.get(key, {})}
+                raise
+
+            with self._lock:
+                self.rows_written += written
+                self.flushes += 1
+            logger.info('quiz autosave flush drafts=%d changes=%d rows_written=%d write_amplification=%.2f',
+                        len(pending), sum(len(changes) for changes in pending.values()), written, self.write_amplification())
+            return written
+
+    def _write(self, pending):
+        lookup = Q()
+        for student_id, quiz_id in pending:
+            lookup |= Q(student_id=student_id, quiz_id=quiz_id)
+        with transaction.atomic():
+            submitted = set(QuizAttempt.objects.filter(lookup).values_list('student_id', 'quiz_id'))
+            drafts = {(draft.student_id, draft.quiz_id): draft for draft in QuizDraft.objects.filter(lookup)}
+            updated, created = [], []
+            # bulk_update không tự cập nhật trường auto_now
+            now = datetime.datetime.now()
+            for (student_id, quiz_id), changes in pending.items():
+                if (student_id, quiz_id) in submitted:
+                    continue
+                draft = drafts.get((student_id, quiz_id))
+                if draft is None:
+                    created.append(QuizDraft(student_id=student_id, quiz_id=quiz_id, answers=changes, writes=1))
+                else:
+                    draft.answers = {**draft.answers, **changes}
+                    draft.writes += 1
+                    draft.updated_at = now
+                    updated.append(draft)
+            if updated:
+                QuizDraft.objects.bulk_update(updated, ['answers', 'writes', 'updated_at'])
+            if created:
+                QuizDraft.objects.bulk_create(created)
+        return len(updated) + len(created)
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('quiz autosave flush failed')
+        finally:
+            # Luồng của Timer có kết nối cơ sở dữ liệu riêng, cần đóng sau khi dùng
+            connection.close()
+
+    def write_amplification(self):
+        """Số dòng đã ghi trên mỗi thay đổi nhận được (nhỏ hơn 1 khi các thay đổi được gộp)."""
+        return self.rows_written / self.changes if self.changes else 0.0
+
+    def stats(self):
+        """Các bộ đếm của bộ đệm: requests, changes, rows_written, flushes, pending và write_amplification."""
+        with self._lock:
+            return {'requests': self.requests, 'changes': self.changes, 'rows_written': self.rows_written,
+                    'flushes': self.flushes, 'pending': len(self._pending), 'write_amplification': self.write_amplification()}
+
+
+def clean_changes(data, question_ids):
+    """
+    Lọc các thay đổi hợp lệ từ dữ liệu autosave.
+
+    Args:
+        data (dict): Dữ liệu gửi lên, str(question_id) -> phương án.
+        question_ids (set): Mã các câu hỏi của bài trắc nghiệm.
+
+    Returns:
+        dict: Các thay đổi có câu hỏi thuộc bài trắc nghiệm và phương án A-D.
+    """
+    changes = {}
+    for key, value in data.items():
+        if str(key).isdigit() and int(key) in question_ids and value in OPTIONS:
+            changes[str(int(key))] = value
+    return changes
+
+
+def draft_answers(student_id, quiz_id):
+    """Các câu trả lời đã lưu nháp của một bài làm, gồm cả các thay đổi chưa được ghi."""
+    saved = QuizDraft.objects.filter(student_id=student_id, quiz_id=quiz_id).values_list('answers', flat=True).first() or {}
+    return {**saved, **autosave_buffer.pending(student_id, quiz_id)}
+
+
+autosave_buffer = AutosaveBuffer()
@@ -0,0 +1,236 @@
+import csv
+import json
+import os
+import re
+import time
+from collections import namedtuple
+from django.db import transaction
+from main.signals import on_commit_and_now
+from .models import Quiz, Question
+from .paper_cache import quiz_papers
+
+
+RowError = namedtuple('RowError', ['line', 'message'])
+
+ImportReport = namedtuple('ImportReport', ['valid', 'created', 'errors', 'elapsed'])
+
+FORMATS = ('csv', 'json', 'gift')
+
+FORMAT_BY_EXTENSION = {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.gift': 'gift', '.txt': 'gift'}
+
+FIELDS = ('question', 'option1', 'option2', 'option3', 'option4', 'answer', 'marks', 'explanation')
+
+# Tên cột thay thế được chấp nhận trong CSV/JSON
+ALIASES = {'a': 'option1', 'b': 'option2', 'c': 'option3', 'd': 'option4'}
+
+
+def detect_format(filename):
+    """Đoán định dạng (csv, json hoặc gift) từ phần mở rộng của tên tệp, None nếu không nhận ra."""
+    return FORMAT_BY_EXTENSION.get(os.path.splitext(filename or '')[1].lower())
+
+
+def parse_csv(stream):
+    """
+    Đọc câu hỏi từ tệp CSV có dòng tiêu đề (question, option1..option4 hoặc A..D, answer, marks, explanation).
+
+    Yields:
+        tuple: (số dòng, dict các trường hoặc RowError nếu tệp CSV bị hỏng từ dòng đó).
+    """
+    reader = csv.DictReader(stream)
+    try:
+        for row in reader:
+            yield reader.line_num, {(key or '').strip().lower(): value for key, value in row.items()}
+    except csv.Error as e:
+        # Lỗi của csv (ví dụ trường quá dài) làm dừng việc đọc: báo như một dòng lỗi thay vì để lỗi lan ra view
+        yield reader.line_num, RowError(reader.line_num, 'Invalid CSV: %s' % e)
+
+
+def parse_json(stream):
+    """
+    Đọc câu hỏi từ một mảng JSON hoặc từ JSON Lines (mỗi dòng một đối tượng).
+
+    JSON Lines được đọc từng dòng nên không cần nạp toàn bộ tệp vào bộ nhớ.
+
+    Yields:
+        tuple: (số dòng hoặc thứ tự phần tử, dict các trường hoặc RowError nếu không đọc được).
+    """
+    first = stream.read(1)
+    while first and first.isspace():
+        first = stream.read(1)
+    if first == '[':
+        try:
+            items = json.loads(first + stream.read())
+        except ValueError as e:
+            yield 1, RowError(1, 'Invalid JSON: %s' % e)
+            return
+        for index, item in enumerate(items, 1):
+            yield index, item
+        return
+
+    for line_no, line in enumerate(_prepend(first, stream), 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line)
+        except ValueError as e:
+            yield line_no, RowError(line_no, 'Invalid JSON: %s' % e)
+
+
+def _prepend(first, stream):
+    # Ký tự đầu tiên đã được đọc để nhận dạng mảng JSON, ghép lại vào dòng đầu tiên
+    yield first + stream.readline()
+    yield from stream
+
+
+GIFT_QUESTION = re.compile(r'^(?:::(?P<title>.*?)::)?(?P<text>.*?)\{(?P<answers>.*)\}(?P<tail>.*)$', re.S)
+GIFT_ANSWER = re.compile(r'(?<!\\)([=~])')
+
+
+def _gift_unescape(text):
+    return re.sub(r'\\([~=#{}:])', r'\1', text).strip()
+
+
+def parse_gift(stream):
+    """
+    Đọc câu hỏi trắc nghiệm một đáp án đúng từ tệp Moodle GIFT.
+
+    Các câu hỏi cách nhau bởi dòng trống; dòng bắt đầu bằng // là chú thích. Mỗi câu cần đúng bốn phương án
+    (một phương án '=' và ba phương án '~'); phần phản hồi chung '####' được dùng làm lời giải thích.
+    Điểm không có trong GIFT nên được để trống (dùng điểm mặc định khi nhập).
+
+    Yields:
+        tuple: (số dòng bắt đầu câu hỏi, dict các trường hoặc RowError nếu không đọc được).
+    """
+    block, start = [], None
+    for line_no, line in enumerate(_chain_blank(stream), 1):
+        if line.lstrip().startswith('//'):
+            continue
+        if line.strip():
+            if start is None:
+                start = line_no
+            block.append(line.rstrip('\r\n'))
+            continue
+        if block:
+            yield start, _parse_gift_block(start, '\n'.join(block))
+            block, start = [], None
+
+
+def _chain_blank(stream):
+    yield from stream
+    # Dòng trống cuối để kết thúc câu hỏi cuối cùng
+    yield ''
+
+
+def _parse_gift_block(line, block):
+    match = GIFT_QUESTION.match(block.strip())
+    if not match:
+        return RowError(line, 'Missing answer block {...}')
+    body = match.group('answers')
+    explanation = None
+    if '####' in body:
+        body, explanation = body.split('####', 1)
+        explanation = _gift_unescape(explanation)
+    parts = GIFT_ANSWER.split(body)
+    options, answer = [], None
+    for marker, text in zip(parts[1::2], parts[2::2]):
+        # Bỏ phần phản hồi riêng của từng phương án
+        text = re.split(r'(?<!\\)#', text, 1)[0]
+        if marker == '=':
+            if answer is not None:
+                return RowError(line, 'More than one correct answer')
+            answer = 'ABCD'[len(options)] if len(options) < 4 else None
+        options.append(_gift_unescape(text))
+    if len(options) != 4:
+        return RowError(line, 'Expected 4 options, found %d' % len(options))
+    if answer is None:
+        return RowError(line, 'Missing correct answer (=)')
+    row = {'question': _gift_unescape(match.group('text') + match.group('tail')), 'answer': answer, 'explanation': explanation}
+    row.update(('option%d' % i, option) for i, option in enumerate(options, 1))
+    return row
+
+
+PARSERS = {'csv': parse_csv, 'json': parse_json, 'gift': parse_gift}
+
+
+def build_question(quiz, row, default_marks=1):
+    """
+    Kiểm tra một dòng dữ liệu và tạo đối tượng Question (chưa lưu).
+
+    Raises:
+        ValueError: Nếu dòng thiếu trường bắt buộc, đáp án không phải A-D hoặc điểm không hợp lệ.
+    """
+    if not isinstance(row, dict):
+        raise ValueError('Expected an object with question fields')
+    row = {ALIASES.get(str(key).strip().lower(), str(key).strip().lower()): value for key, value in row.items()}
+    values = {field: ('' if row.get(field) is None else str(row.get(field)).strip()) for field in FIELDS}
+
+    missing = [field for field in ('question', 'option1', 'option2', 'option3', 'option4', 'answer') if not values[field]]
+    if missing:
+        raise ValueError('Missing %s' % ', '.join(missing))
+    answer = values['answer'].upper()
+    if answer not in ('A', 'B', 'C', 'D'):
+        raise ValueError('Answer must be one of A, B, C, D (got %r)' % values['answer'])
+    try:
+        marks = int(values['marks']) if values['marks'] else default_marks
+    except ValueError:
+        raise ValueError('Marks must be an integer (got %r)' % values['marks'])
+    if marks < 1:
+        raise ValueError('Marks must be at least 1')
+
+    return Question(quiz_id=quiz.pk, question=values['question'], option1=values['option1'], option2=values['option2'],
+                    option3=values['option3'], option4=values['option4'], answer=answer, marks=marks,
+                    explanation=values['explanation'] or None)
+
+
+def import_questions(quiz, stream, fmt, batch_size=500, default_marks=1, dry_run=False):
+    """
+    Nhập câu hỏi từ một luồng văn bản vào bài trắc nghiệm.
+
+    Args:
+        quiz (Quiz): Bài trắc nghiệm nhận câu hỏi.
+        stream (file): Luồng văn bản (đã giải mã) của tệp nhập.
+        fmt (str): Định dạng tệp: 'csv', 'json' hoặc 'gift'.
+        batch_size (int): Số câu hỏi mỗi lệnh bulk_create.
+        default_marks (int): Điểm dùng cho các dòng không có cột marks.
+        dry_run (bool): Chỉ kiểm tra, không ghi.
+
+    Returns:
+        ImportReport: (valid, created, errors, elapsed) - số dòng hợp lệ, số câu hỏi đã thêm, danh sách RowError
+        và thời gian xử lý (giây).
+
+    Notes:
+        - Tệp được đọc và kiểm tra từng dòng; câu hỏi hợp lệ được ghi theo lô trong cùng một transaction.
+        - Nếu có bất kỳ dòng lỗi nào, transaction được hủy và không câu hỏi nào được thêm, để tệp có thể được sửa và nhập lại.
+        - bulk_create không gửi signal, nên các cột đếm của Quiz và đề thi đã cache được cập nhật một lần sau khi nhập.
+    """
+    if fmt not in PARSERS:
+        raise ValueError('Unsupported format %r, expected one of %s' % (fmt, ', '.join(FORMATS)))
+    started = time.perf_counter()
+    errors = []
+    valid = 0
+    with transaction.atomic():
+        batch = []
+        for line, row in PARSERS[fmt](stream):
+            if isinstance(row, RowError):
+                errors.append(row)
+                continue
+            try:
+                batch.append(build_question(quiz, row, default_marks))
+            except ValueError as e:
+                errors.append(RowError(line, str(e)))
+                continue
+            if len(batch) >= batch_size:
+                if not errors and not dry_run:
+                    Question.objects.bulk_create(batch)
+                valid += len(batch)
+                batch = []
+        if batch and not errors and not dry_run:
+            Question.objects.bulk_create(batch)
+        valid += len(batch)
+
+        if errors or dry_run:
+            transaction.set_rollback(True)
+        else:
+            Quiz.update_question_totals([quiz.pk])
+            on_commit_and_now(lambda: quiz_papers.invalidate(quiz.pk))
+    return ImportReport(valid, 0 if errors or dry_run else valid, errors, time.perf_counter() - started)
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from quiz.models import Quiz, QuizAttempt, StudentAnswer
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị xây dựng bảng QuizAttempt từ các câu trả lời đã lưu.
+
+    Cách dùng:
+        python manage.py backfill_quiz_attempts               # Xây dựng lại cho mọi bài trắc nghiệm
+        python manage.py backfill_quiz_attempts --quiz 3 7    # Chỉ các bài trắc nghiệm được chọn
+        python manage.py backfill_quiz_attempts --dry-run     # Chỉ báo cáo, không ghi
+    """
+
+    help = 'Build QuizAttempt rows (one per student and quiz) from historical StudentAnswer rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--quiz', type=int, nargs='+', help='Only rebuild attempts of these quiz IDs.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of rows per bulk insert.')
+        parser.add_argument('--dry-run', action='store_true', help='Only report the number of attempts, do not write.')
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.order_by('id')
+        if options['quiz']:
+            quizzes = quizzes.filter(id__in=options['quiz'])
+
+        total = 0
+        for quiz_id in quizzes.values_list('id', flat=True):
+            # Mỗi bài trắc nghiệm được xây dựng lại trong một transaction riêng
+            with transaction.atomic():
+                rows = QuizAttempt.aggregate_answers(StudentAnswer.objects.filter(quiz_id=quiz_id))
+                attempts = [QuizAttempt.from_row(row) for row in rows]
+                total += len(attempts)
+                if options['dry_run']:
+                    continue
+                QuizAttempt.objects.filter(quiz_id=quiz_id).delete()
+                QuizAttempt.objects.bulk_create(attempts, batch_size=options['batch_size'])
+
+        if options['dry_run']:
+            self.stdout.write('%d attempt(s) would be written.' % total)
+        else:
+            self.stdout.write(self.style.SUCCESS('Backfilled %d attempt(s).' % total))
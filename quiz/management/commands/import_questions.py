@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from quiz.importers import FORMATS, detect_format, import_questions
+from quiz.models import Quiz
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị nhập câu hỏi cho một bài trắc nghiệm từ tệp CSV, JSON hoặc Moodle GIFT.
+
+    Cách dùng:
+        python manage.py import_questions 3 questions.csv                # Nhập vào bài trắc nghiệm có ID 3
+        python manage.py import_questions 3 bank.gift --marks 2          # Điểm mặc định cho các câu không có điểm
+        python manage.py import_questions 3 bank.json --dry-run          # Chỉ kiểm tra, không ghi
+    """
+
+    help = 'Import questions into a quiz from a CSV, JSON/JSON Lines or Moodle GIFT file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('quiz', type=int, help='ID of the quiz receiving the questions.')
+        parser.add_argument('path', help='Path of the file to import.')
+        parser.add_argument('--format', choices=FORMATS, help='File format (default: guessed from the file extension).')
+        parser.add_argument('--marks', type=int, default=1, help='Marks for rows without a marks column.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of questions per bulk insert.')
+        parser.add_argument('--dry-run', action='store_true', help='Only validate the file, do not write.')
+
+    def handle(self, *args, **options):
+        try:
+            quiz = Quiz.objects.get(pk=options['quiz'])
+        except Quiz.DoesNotExist:
+            raise CommandError('Quiz %s does not exist.' % options['quiz'])
+        fmt = options['format'] or detect_format(options['path'])
+        if fmt is None:
+            raise CommandError('Cannot guess the format of %s, use --format.' % options['path'])
+
+        with open(options['path'], encoding='utf-8-sig', newline='') as stream:
+            report = import_questions(quiz, stream, fmt, batch_size=options['batch_size'],
+                                      default_marks=options['marks'], dry_run=options['dry_run'])
+
+        for error in report.errors:
+            self.stderr.write('Line %d: %s' % (error.line, error.message))
+        if report.errors:
+            raise CommandError('%d row(s) have errors, no questions imported.' % len(report.errors))
+        if options['dry_run']:
+            self.stdout.write('%d valid question(s), nothing written (%.2fs).' % (report.valid, report.elapsed))
+            return
+        self.stdout.write(self.style.SUCCESS('Imported %d question(s) into "%s" in %.2fs.' % (report.created, quiz.title, report.elapsed)))
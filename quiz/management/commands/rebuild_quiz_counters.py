@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Q, Sum
+from quiz.models import Quiz, Question, StudentAnswer
+
+
+class Command(BaseCommand):
+    """
+    Lệnh quản trị kiểm tra và tính lại các cột đếm của Quiz (question_count, total_marks)
+    và Question (correct_count, wrong_count).
+
+    Cách dùng:
+        python manage.py rebuild_quiz_counters            # Tính lại và báo cáo các dòng bị lệch
+        python manage.py rebuild_quiz_counters --dry-run  # Chỉ báo cáo, không ghi
+    """
+
+    help = 'Check and rebuild the question/marks counters on Quiz and the answer tallies on Question.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report mismatched counters, do not write.')
+
+    def handle(self, *args, **options):
+        totals = {row['quiz_id']: (row['count'], row['marks'] or 0) for row in
+                  Question.objects.order_by().values('quiz_id').annotate(count=Count('pk'), marks=Sum('marks'))}
+        mismatched_quizzes = 0
+        for quiz in Quiz.objects.order_by('pk').only('title', 'question_count', 'total_marks'):
+            stored = (quiz.question_count, quiz.total_marks)
+            actual = totals.get(quiz.pk, (0, 0))
+            if stored != actual:
+                mismatched_quizzes += 1
+                self.stdout.write('Quiz %s (%s): stored %s, actual %s' % (quiz.title, quiz.pk, stored, actual))
+
+        tallies = {row['question_id']: (row['correct'], row['total'] - row['correct']) for row in
+                   StudentAnswer.objects.order_by().values('question_id').annotate(
+                       total=Count('pk'), correct=Count('pk', filter=Q(answer=F('question__answer'))))}
+        mismatched_questions = 0
+        for question in Question.objects.order_by('pk').only('correct_count', 'wrong_count'):
+            stored = (question.correct_count, question.wrong_count)
+            actual = tallies.get(question.pk, (0, 0))
+            if stored != actual:
+                mismatched_questions += 1
+                self.stdout.write('Question %s: stored %s, actual %s' % (question.pk, stored, actual))
+
+        if options['dry_run']:
+            self.stdout.write('%d quiz(zes) and %d question(s) out of sync.' % (mismatched_quizzes, mismatched_questions))
+            return
+
+        Quiz.update_question_totals()
+        Question.update_answer_tallies()
+        self.stdout.write(self.style.SUCCESS('Reconciled %d quiz(zes) and %d question(s).' % (mismatched_quizzes, mismatched_questions)))
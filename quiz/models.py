@@ -1,9 +1,30 @@
+import datetime
 from venv import create
 from django.db import models
+from django.db.models.functions import Coalesce
 from main.models import Student, Course
 
 
 # Create your models here.
+class QuizQuerySet(models.QuerySet):
+    """Các truy vấn chỉ đọc dùng cho danh sách bài trắc nghiệm."""
+
+    def with_status(self, now=None):
+        """
+        Gắn trạng thái 'status' (scheduled/open/closed) được tính từ start và end tại thời điểm truy vấn.
+
+        Args:
+            now (datetime): Thời điểm so sánh, mặc định là thời điểm hiện tại.
+        """
+        now = now or datetime.datetime.now()
+        return self.annotate(status=models.Case(
+            models.When(start__gt=now, then=models.Value(Quiz.SCHEDULED)),
+            models.When(end__lte=now, then=models.Value(Quiz.CLOSED)),
+            default=models.Value(Quiz.OPEN),
+            output_field=models.CharField(),
+        ))
+
+
 class Quiz(models.Model):
     """Đại diện cho một bài trắc nghiệm trong hệ thống."""
     title = models.CharField(max_length=100)
@@ -14,7 +35,17 @@ class Quiz(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     publish_status = models.BooleanField(default=False, null=True, blank=True)
-    started = models.BooleanField(default=False, null=True, blank=True)
+    # Số câu hỏi và tổng điểm, được cập nhật bởi signal của Question (quiz/signals.py).
+    # total_marks thay cho phương thức total_marks() trước đây: đọc thuộc tính, không gọi và không gán để hiển thị
+    question_count = models.IntegerField(default=0)
+    total_marks = models.IntegerField(default=0)
+
+    # Trạng thái của bài trắc nghiệm, được tính từ start và end (không lưu trong cơ sở dữ liệu)
+    SCHEDULED = 'scheduled'
+    OPEN = 'open'
+    CLOSED = 'closed'
+
+    objects = QuizQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = "Quizzes"
@@ -34,15 +65,11 @@ class Quiz(models.Model):
 
     def total_questions(self):
         """Trả về tổng số câu hỏi trong bài trắc nghiệm."""
-        return Question.objects.filter(quiz=self).count()
+        return self.question_count
 
     def question_sl(self):
-        """Trả về số câu hỏi hiện tại của bài trắc nghiệm."""
-        return Question.objects.filter(quiz=self).count() + 1
-
-    def total_marks(self):
-        """Trả về tổng số điểm của bài trắc nghiệm."""
-        return Question.objects.filter(quiz=self).aggregate(total_marks=models.Sum('marks'))['total_marks']
+        """Trả về số thứ tự của câu hỏi tiếp theo."""
+        return self.question_count + 1
 
     def starts(self):
         """Trả về thời điểm bắt đầu của bài trắc nghiệm dưới dạng chuỗi định dạng."""
@@ -52,9 +79,40 @@ class Quiz(models.Model):
         """Trả về thời điểm kết thúc của bài trắc nghiệm dưới dạng chuỗi định dạng."""
         return self.end.strftime("%a, %d-%b-%y at %I:%M %p")
 
+    def current_status(self, now=None):
+        """Trả về trạng thái của bài trắc nghiệm (SCHEDULED, OPEN hoặc CLOSED) tại thời điểm now."""
+        now = now or datetime.datetime.now()
+        if self.start > now:
+            return self.SCHEDULED
+        return self.CLOSED if self.end <= now else self.OPEN
+
+    @property
+    def started(self):
+        """Bài trắc nghiệm đã bắt đầu hay chưa, dùng trạng thái đã được with_status() tính sẵn nếu có."""
+        status = getattr(self, 'status', None) or self.current_status()
+        return status != self.SCHEDULED
+
     def attempted_students(self):
         """Trả về số lượng sinh viên đã tham gia làm bài trắc nghiệm."""
-        return Student.objects.filter(studentanswer__quiz=self).distinct().count()
+        return QuizAttempt.objects.filter(quiz=self).count()
+
+    @staticmethod
+    def update_question_totals(quiz_ids=None):
+        """
+        Tính lại question_count và total_marks bằng một câu lệnh UPDATE duy nhất.
+
+        Args:
+            quiz_ids (iterable, optional): Mã các bài trắc nghiệm cần cập nhật. None để cập nhật tất cả.
+
+        Returns:
+            int: Số bài trắc nghiệm đã được cập nhật.
+        """
+        questions = Question.objects.filter(quiz_id=models.OuterRef('pk')).order_by().values('quiz_id')
+        quizzes = Quiz.objects.all() if quiz_ids is None else Quiz.objects.filter(pk__in=list(quiz_ids))
+        return quizzes.update(
+            question_count=Coalesce(models.Subquery(questions.annotate(total=models.Count('pk')).values('total')), 0),
+            total_marks=Coalesce(models.Subquery(questions.annotate(total=models.Sum('marks')).values('total')), 0),
+        )
 
 
 class Question(models.Model):
@@ -70,6 +128,9 @@ class Question(models.Model):
     answer = models.CharField(max_length=1, choices=(
         ('A', 'A'), ('B', 'B'), ('C', 'C'), ('D', 'D')), default='A')
     explanation = models.TextField(null=True, blank=True)
+    # Số câu trả lời đúng và sai (kể cả bỏ trống), được cập nhật khi sinh viên nộp bài
+    correct_count = models.IntegerField(default=0)
+    wrong_count = models.IntegerField(default=0)
 
     def __str__(self):
         """Trả về một chuỗi biểu diễn cho đối tượng Question."""
@@ -87,11 +148,31 @@ class Question(models.Model):
 
     def total_correct_answers(self):
         """Trả về số lượng câu trả lời đúng cho câu hỏi."""
-        return StudentAnswer.objects.filter(question=self, answer=self.answer).count()
+        return self.correct_count
 
     def total_wrong_answers(self):
         """Trả về số lượng câu trả lời sai cho câu hỏi."""
-        return StudentAnswer.objects.filter(question=self).exclude(answer=self.answer).count()
+        return self.wrong_count
+
+    @staticmethod
+    def update_answer_tallies(question_ids=None):
+        """
+        Tính lại correct_count và wrong_count bằng một câu lệnh UPDATE duy nhất.
+
+        Args:
+            question_ids (iterable, optional): Mã các câu hỏi cần cập nhật. None để cập nhật tất cả.
+
+        Returns:
+            int: Số câu hỏi đã được cập nhật.
+        """
+        answers = StudentAnswer.objects.filter(question_id=models.OuterRef('pk')).order_by().values('question_id')
+        correct = answers.filter(answer=models.OuterRef('answer'))
+        wrong = answers.exclude(answer=models.OuterRef('answer'))
+        questions = Question.objects.all() if question_ids is None else Question.objects.filter(pk__in=list(question_ids))
+        return questions.update(
+            correct_count=Coalesce(models.Subquery(correct.annotate(total=models.Count('pk')).values('total')), 0),
+            wrong_count=Coalesce(models.Subquery(wrong.annotate(total=models.Count('pk')).values('total')), 0),
+        )
 
 
 class StudentAnswer(models.Model):
@@ -110,4 +191,92 @@ class StudentAnswer(models.Model):
         return self.student.name + ' ' + self.quiz.title + ' ' + self.question.question
 
     class Meta:
-        unique_together = ('student', 'quiz', 'question')
\ No newline at end of file
+        unique_together = ('student', 'quiz', 'question')
+
+
+class QuizAttempt(models.Model):
+    """
+    Kết quả đã tính sẵn của một sinh viên cho một bài trắc nghiệm (một dòng cho mỗi cặp sinh viên, bài trắc nghiệm).
+
+    Được ghi trong cùng transaction với các câu trả lời (studentAnswer) nên các trang kết quả chỉ cần đọc dòng này.
+    Dữ liệu cũ được xây dựng lại bằng lệnh `python manage.py backfill_quiz_attempts`.
+    """
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    marks_obtained = models.IntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+    wrong_count = models.PositiveIntegerField(default=0)
+    submitted_at = models.DateTimeField()
+    duration = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ('student', 'quiz')
+
+    def __str__(self):
+        """Trả về một chuỗi biểu diễn cho đối tượng QuizAttempt."""
+        return self.student.name + ' ' + self.quiz.title
+
+    def submission_time(self):
+        """Trả về thời điểm nộp bài dưới dạng chuỗi định dạng."""
+        return self.submitted_at.strftime("%a, %d-%b-%y at %I:%M %p")
+
+    def percentage(self, total_marks):
+        """Trả về tỷ lệ phần trăm điểm đạt được trên tổng điểm."""
+        return round(self.marks_obtained / total_marks * 100, 2) if total_marks else 0
+
+    @staticmethod
+    def aggregate_answers(answers):
+        """
+        Tổng hợp câu trả lời theo (sinh viên, bài trắc nghiệm) trong một truy vấn.
+
+        Returns:
+            QuerySet: Các dict gồm student_id, quiz_id, quiz_start, marks_obtained, correct_count, answered và submitted_at.
+        """
+        correct = models.Q(answer=models.F('question__answer'))
+        return answers.order_by().values('student_id', 'quiz_id').annotate(
+            quiz_start=models.Max('quiz__start'),
+            marks_obtained=Coalesce(models.Sum('question__marks', filter=correct), 0),
+            correct_count=models.Count('id', filter=correct),
+            answered=models.Count('id'),
+            submitted_at=models.Max('created_at'),
+        )
+
+    @staticmethod
+    def from_row(row):
+        """Tạo một QuizAttempt (chưa lưu) từ một dòng của aggregate_answers."""
+        return QuizAttempt(
+            student_id=row['student_id'],
+            quiz_id=row['quiz_id'],
+            marks_obtained=row['marks_obtained'],
+            correct_count=row['correct_count'],
+            wrong_count=row['answered'] - row['correct_count'],
+            submitted_at=row['submitted_at'],
+            duration=row['submitted_at'] - row['quiz_start'] if row['submitted_at'] else None,
+        )
+
+
+class QuizDraft(models.Model):
+    """
+    Bài làm đang dở của một sinh viên (một dòng cho mỗi cặp sinh viên, bài trắc nghiệm).
+
+    Được ghi theo lô từ bộ đệm autosave (quiz/autosave.py) và được chuyển thành câu trả lời chính thức
+    rồi xóa khi sinh viên nộp bài.
+
+    Thuộc tính:
+        - answers: Ánh xạ str(question_id) -> phương án đã chọn ('A'-'D').
+        - writes: Số lần dòng này được ghi, dùng để đo hệ số khuếch đại ghi.
+    """
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    answers = models.JSONField(default=dict)
+    writes = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('student', 'quiz')
+
+    def __str__(self):
+        """Trả về một chuỗi biểu diễn cho đối tượng QuizDraft."""
+        return self.student.name + ' ' + self.quiz.title
@@ -0,0 +1,84 @@
+import threading
+from collections import OrderedDict, namedtuple
+from django.conf import settings
+from django.template.loader import render_to_string
+from .models import Question
+
+
+PaperQuestion = namedtuple('PaperQuestion', ['id', 'question', 'marks', 'option1', 'option2', 'option3', 'option4'])
+
+
+class QuizPaper(namedtuple('QuizPaper', ['quiz_id', 'version', 'questions', 'total_questions', 'total_marks', 'html'])):
+    """
+    Ảnh chụp bất biến của đề thi: danh sách câu hỏi (không có đáp án), tổng số câu, tổng điểm
+    và khối HTML câu hỏi đã được render sẵn.
+    """
+    __slots__ = ()
+
+
+class QuizPaperCache:
+    """
+    Cache đề thi trong bộ nhớ tiến trình, khóa theo mã bài trắc nghiệm.
+
+    Thuộc tính:
+        - maxsize: Số đề thi tối đa được lưu (cấu hình QUIZ_PAPER_CACHE_SIZE).
+
+    Notes:
+        - Mỗi bài trắc nghiệm có một số phiên bản, được tăng khi câu hỏi hoặc bài trắc nghiệm thay đổi (quiz/signals.py).
+          Đề thi được xây dựng trong lúc phiên bản thay đổi sẽ không được lưu.
+        - Khi nhiều sinh viên cùng bắt đầu làm bài, chỉ một request xây dựng đề thi; các request khác chờ và dùng lại kết quả.
+    """
+
+    def __init__(self, maxsize=None):
+        self.maxsize = maxsize if maxsize is not None else getattr(settings, 'QUIZ_PAPER_CACHE_SIZE', 64)
+        self._lock = threading.Lock()
+        self._papers = OrderedDict()
+        self._versions = {}
+        self._build_locks = {}
+        self.hits = 0
+        self.builds = 0
+
+    def get(self, quiz):
+        """Trả về đề thi của bài trắc nghiệm, xây dựng nếu chưa có trong cache."""
+        with self._lock:
+            paper = self._papers.get(quiz.id)
+            if paper is not None:
+                self._papers.move_to_end(quiz.id)
+                self.hits += 1
+                return paper
+            build_lock = self._build_locks.setdefault(quiz.id, threading.Lock())
+
+        # Chỉ một luồng xây dựng đề thi cho mỗi bài trắc nghiệm
+        with build_lock:
+            with self._lock:
+                paper = self._papers.get(quiz.id)
+                if paper is not None:
+                    self.hits += 1
+                    return paper
+                version = self._versions.get(quiz.id, 0)
+
+            paper = self._build(quiz, version)
+
+            with self._lock:
+                self.builds += 1
+                if version == self._versions.get(quiz.id, 0) and self.maxsize > 0:
+                    self._papers[quiz.id] = paper
+                    while len(self._papers) > self.maxsize:
+                        evicted, _ = self._papers.popitem(last=False)
+                        self._build_locks.pop(evicted, None)
+        return paper
+
+    def _build(self, quiz, version):
+        questions = tuple(PaperQuestion(*row) for row in Question.objects.filter(quiz_id=quiz.id).order_by('id').values_list(
+            'id', 'question', 'marks', 'option1', 'option2', 'option3', 'option4'))
+        html = render_to_string('quiz/paper.html', {'quiz': quiz, 'questions': questions, 'total_questions': len(questions)})
+        return QuizPaper(quiz.id, version, questions, len(questions), sum(question.marks for question in questions), html)
+
+    def invalidate(self, quiz_id):
+        """Vô hiệu hóa đề thi của một bài trắc nghiệm."""
+        with self._lock:
+            self._versions[quiz_id] = self._versions.get(quiz_id, 0) + 1
+            self._papers.pop(quiz_id, None)
+
+
+quiz_papers = QuizPaperCache()
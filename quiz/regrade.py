@@ -0,0 +1,104 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Exists, F, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from .models import Question, QuizAttempt, StudentAnswer
+
+
+logger = logging.getLogger(__name__)
+
+RegradeReport = namedtuple('RegradeReport', ['question_id', 'quiz_id', 'answers_changed', 'attempts_changed',
+                                             'marks_delta', 'background', 'elapsed'])
+
+# Một luồng nền duy nhất để các lần chấm lại không ghi đồng thời vào SQLite
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='quiz-regrade')
+_lock = threading.Lock()
+_reports = {}
+
+
+def regrade_question(question_id, background=False):
+    """
+    Chấm lại mọi câu trả lời của một câu hỏi theo đáp án và điểm hiện tại, bằng các câu lệnh UPDATE theo tập hợp.
+
+    Args:
+        question_id (int): Mã câu hỏi đã được sửa.
+        background (bool): Lần chấm lại có chạy trong luồng nền hay không (chỉ dùng cho báo cáo).
+
+    Returns:
+        RegradeReport: Số câu trả lời và số bài làm bị thay đổi, tổng điểm chênh lệch và thời gian xử lý.
+
+    Notes:
+        - Điểm mới của mỗi câu trả lời là Case(answer = đáp án -> điểm câu hỏi, còn lại -> 0).
+        - QuizAttempt được cộng phần chênh lệch giữa điểm mới và điểm đã lưu của câu trả lời (không tính lại toàn bài),
+          trước khi StudentAnswer được cập nhật, trong cùng một transaction.
+        - Trạng thái đúng/sai trước khi chấm lại được lấy từ điểm đã lưu (điểm câu hỏi luôn ≥ 1, nên câu đúng có điểm > 0),
+          không phụ thuộc đáp án cũ; vì vậy nhiều lần sửa đáp án liên tiếp, kể cả khi chấm lại theo thứ tự bất kỳ,
+          đều cho kết quả đúng và chấm lại lần hai không thay đổi gì.
+    """
+    started = time.perf_counter()
+    question = Question.objects.only('quiz_id', 'answer', 'marks').get(pk=question_id)
+    new_marks = Case(When(answer=question.answer, then=Value(question.marks)), default=Value(0), output_field=IntegerField())
+    answers = StudentAnswer.objects.filter(question_id=question.pk)
+    # Các câu trả lời đổi điểm (đổi trạng thái đúng/sai luôn làm đổi điểm, vì điểm câu đúng ≥ 1)
+    changed = answers.filter(~Q(marks=new_marks) | Q(marks__isnull=True))
+
+    # Câu trả lời của sinh viên (của dòng QuizAttempt đang cập nhật) cho câu hỏi này
+    answer = answers.filter(student_id=OuterRef('student_id'))
+    delta = answer.annotate(delta=new_marks - Coalesce('marks', 0)).values('delta')[:1]
+    was_correct = Case(When(Exists(answer.filter(marks__gt=0)), then=Value(1)), default=Value(0))
+    is_correct = Case(When(Exists(answer.filter(answer=question.answer)), then=Value(1)), default=Value(0))
+
+    with transaction.atomic():
+        marks_delta = changed.aggregate(total=Sum(new_marks - Coalesce('marks', 0)))['total'] or 0
+        attempts_changed = QuizAttempt.objects.filter(quiz_id=question.quiz_id, student_id__in=changed.values('student_id')).update(
+            marks_obtained=F('marks_obtained') + Coalesce(Subquery(delta, output_field=IntegerField()), 0),
+            correct_count=F('correct_count') + is_correct - was_correct,
+            wrong_count=F('wrong_count') - is_correct + was_correct,
+        )
+        answers_changed = changed.update(marks=new_marks)
+
+    report = RegradeReport(question.pk, question.quiz_id, answers_changed, attempts_changed, marks_delta, background,
+                           time.perf_counter() - started)
+    with _lock:
+        _reports[question.quiz_id] = report
+    logger.info('quiz regrade question=%s quiz=%s answers=%d attempts=%d marks_delta=%+d elapsed=%.1fms',
+                question.pk, question.quiz_id, answers_changed, attempts_changed, marks_delta, report.elapsed * 1000)
+    return report
+
+
+def _run_in_background(question_id):
+    try:
+        regrade_question(question_id, background=True)
+    except Exception:
+        logger.exception('quiz regrade failed for question %s', question_id)
+    finally:
+        # Luồng nền có kết nối cơ sở dữ liệu riêng, cần đóng sau khi dùng
+        connection.close()
+
+
+def schedule_regrade(question):
+    """
+    Chấm lại câu hỏi vừa được sửa.
+
+    Câu hỏi có nhiều hơn QUIZ_REGRADE_BACKGROUND_THRESHOLD câu trả lời được chấm lại trong luồng nền
+    sau khi transaction hiện tại được commit; các câu hỏi nhỏ được chấm lại ngay.
+
+    Returns:
+        RegradeReport: Báo cáo nếu đã chấm lại ngay, None nếu đã chuyển sang luồng nền.
+    """
+    threshold = getattr(settings, 'QUIZ_REGRADE_BACKGROUND_THRESHOLD', 500)
+    if StudentAnswer.objects.filter(question_id=question.pk).count() <= threshold:
+        return regrade_question(question.pk)
+    transaction.on_commit(lambda: _executor.submit(_run_in_background, question.pk))
+    return None
+
+
+def last_report(quiz_id):
+    """Báo cáo của lần chấm lại gần nhất của bài trắc nghiệm trong tiến trình này, None nếu chưa có."""
+    with _lock:
+        return _reports.get(quiz_id)
@@ -0,0 +1,222 @@
+import datetime
+import logging
+import time
+from collections import namedtuple
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, Exists, F, OuterRef, Q, Subquery, Value, When
+from main.models import Student
+from .models import Question, Quiz, QuizAttempt, StudentAnswer
+from .autosave import autosave_buffer, draft_answers
+
+
+logger = logging.getLogger(__name__)
+
+SubmitResult = namedtuple('SubmitResult', ['attempt', 'created', 'elapsed'])
+
+QuizDashboard = namedtuple('QuizDashboard', ['active', 'previous'])
+
+
+OPTIONS = ('A', 'B', 'C', 'D')
+
+
+class QuizSummary:
+    """
+    Kết quả tổng hợp của một bài trắc nghiệm.
+
+    Thuộc tính:
+        - quiz: Bài trắc nghiệm.
+        - questions: Danh sách câu hỏi, mỗi câu có thêm A, B, C, D (số lần chọn mỗi phương án),
+          answered, correct và wrong.
+        - students: Danh sách sinh viên của khóa học, mỗi sinh viên có thêm total_marks_obtained,
+          attempted, attempt (QuizAttempt), submitted_at và submission_time.
+        - total_questions, total_marks: Số câu hỏi và tổng điểm của bài trắc nghiệm.
+        - attempted_students: Số sinh viên của khóa học đã làm bài.
+    """
+
+    def __init__(self, quiz, questions, students):
+        self.quiz = quiz
+        self.questions = questions
+        self.students = students
+        self.total_questions = len(questions)
+        self.total_marks = sum(question.marks for question in questions) if questions else None
+        self.attempted_students = sum(1 for student in students if student.attempted)
+
+
+def question_statistics(quiz):
+    """
+    Thống kê câu trả lời của từng câu hỏi trong một truy vấn (tổng hợp có điều kiện).
+
+    Returns:
+        list[Question]: Các câu hỏi kèm A, B, C, D, answered, correct và wrong.
+    """
+    histogram = {option: Count('studentanswer', filter = Q(studentanswer__answer = option)) for option in OPTIONS}
+    questions = list(Question.objects.filter(quiz = quiz).order_by('id').annotate(
+        answered = Count('studentanswer'),
+        correct = Count('studentanswer', filter = Q(studentanswer__answer = F('answer'))),
+        **histogram,
+    ))
+    for question in questions:
+        question.wrong = question.answered - question.correct
+    return questions
+
+
+def student_results(quiz, course):
+    """
+    Điểm, trạng thái làm bài và thời gian nộp của mọi sinh viên trong khóa học.
+
+    Kết quả được đọc từ QuizAttempt (đã tính sẵn khi nộp bài) nên chỉ cần hai truy vấn.
+
+    Returns:
+        list[Student]: Các sinh viên kèm total_marks_obtained, attempted, attempt, submitted_at và submission_time.
+    """
+    attempts = {attempt.student_id: attempt for attempt in QuizAttempt.objects.filter(quiz = quiz)}
+    students = list(Student.objects.filter(course = course).only('student_id', 'name', 'photo').order_by('student_id'))
+    for student in students:
+        attempt = attempts.get(student.student_id)
+        student.attempt = attempt
+        student.attempted = attempt is not None
+        student.total_marks_obtained = attempt.marks_obtained if attempt else 0
+        student.submitted_at = attempt.submitted_at if attempt else None
+        student.submission_time = attempt.submission_time() if attempt else None
+    return students
+
+
+def quiz_summary(quiz, course):
+    """
+    Tổng hợp kết quả bài trắc nghiệm với số truy vấn cố định (ba truy vấn), không phụ thuộc số câu hỏi hay số sinh viên.
+
+    Args:
+        quiz (Quiz): Bài trắc nghiệm.
+        course (Course): Khóa học chứa bài trắc nghiệm.
+
+    Returns:
+        QuizSummary: Kết quả tổng hợp.
+    """
+    return QuizSummary(quiz, question_statistics(quiz), student_results(quiz, course))
+
+
+def student_dashboard(student, course, now=None):
+    """
+    Danh sách bài trắc nghiệm của sinh viên trong khóa học, chia thành đang diễn ra và đã kết thúc, trong một truy vấn.
+
+    Args:
+        student (Student): Sinh viên.
+        course (Course): Khóa học.
+        now (datetime): Thời điểm so sánh, mặc định là thời điểm hiện tại.
+
+    Returns:
+        QuizDashboard: (active, previous) - mỗi bài trắc nghiệm có thêm attempted, total_marks_obtained và percentage.
+
+    Notes:
+        - Số câu hỏi và tổng điểm là các cột đếm của Quiz; điểm đạt được lấy từ QuizAttempt bằng subquery.
+        - Bài trắc nghiệm đã làm được xếp vào danh sách đã kết thúc kể cả khi chưa hết giờ.
+    """
+    now = now or datetime.datetime.now()
+    attempts = QuizAttempt.objects.filter(student_id=student.pk, quiz=OuterRef('pk'))
+    quizzes = Quiz.objects.filter(course=course).annotate(
+        attempted=Exists(attempts),
+        total_marks_obtained=Subquery(attempts.values('marks_obtained')[:1]),
+    )
+
+    dashboard = QuizDashboard([], [])
+    for quiz in quizzes:
+        quiz.total_marks_obtained = quiz.total_marks_obtained or 0
+        quiz.percentage = round(quiz.total_marks_obtained / quiz.total_marks * 100, 2) if quiz.total_marks else 0
+        if quiz.end < now or quiz.attempted:
+            dashboard.previous.append(quiz)
+        else:
+            dashboard.active.append(quiz)
+    return dashboard
+
+
+def dashboard_entry(quiz):
+    """
+    Biểu diễn JSON của một bài trắc nghiệm trong danh sách của sinh viên.
+
+    Điểm và phần trăm chỉ được trả về khi sinh viên đã làm bài và kết quả đã được công bố.
+    """
+    entry = {
+        'id': quiz.id,
+        'title': quiz.title,
+        'start': quiz.start.isoformat(),
+        'end': quiz.end.isoformat(),
+        'question_count': quiz.question_count,
+        'total_marks': quiz.total_marks,
+        'attempted': quiz.attempted,
+        'published': bool(quiz.publish_status),
+    }
+    if quiz.attempted and quiz.publish_status:
+        entry['marks_obtained'] = quiz.total_marks_obtained
+        entry['percentage'] = quiz.percentage
+    return entry
+
+
+def submit_answers(student, quiz, responses):
+    """
+    Chấm và lưu toàn bộ bài làm của sinh viên trong một transaction.
+
+    Args:
+        student (Student): Sinh viên nộp bài.
+        quiz (Quiz): Bài trắc nghiệm.
+        responses (dict): Ánh xạ str(question_id) -> phương án đã chọn ('A'-'D'); câu không trả lời được lưu là None.
+            Chỉ các câu không có trong responses mới được lấy từ bản nháp autosave (nếu có); câu gửi kèm giá trị rỗng
+            là câu sinh viên đã bỏ chọn.
+
+    Returns:
+        SubmitResult: (attempt, created, elapsed) - kết quả đã lưu, False nếu bài làm đã được nộp trước đó
+        (lần nộp lặp lại bị bỏ qua, không thay đổi dữ liệu), và thời gian xử lý tính bằng giây.
+
+    Notes:
+        - Đáp án được tải một lần; mọi câu trả lời được chèn bằng một lệnh bulk_create,
+          cùng transaction với dòng QuizAttempt và một lệnh UPDATE cộng dồn correct_count/wrong_count của các câu hỏi.
+        - Bản nháp autosave (QuizDraft và bộ đệm) được đọc trước transaction và chỉ bị xóa trong transaction ghi bài làm,
+          nên nếu ghi lỗi bản nháp vẫn còn; câu trả lời gửi kèm lần nộp được ưu tiên.
+          Lần nộp lặp lại trả về bài làm đã lưu ngay, không đụng đến bản nháp.
+        - Thời gian xử lý được ghi vào logger 'quiz.services' để đo tải khi cả lớp nộp bài cùng lúc.
+    """
+    started = time.perf_counter()
+    attempt = QuizAttempt.objects.filter(student_id=student.pk, quiz_id=quiz.pk).first()
+    if attempt is not None:
+        elapsed = time.perf_counter() - started
+        logger.info('quiz submit student=%s quiz=%s duplicate elapsed=%.1fms', student.pk, quiz.pk, elapsed * 1000)
+        return SubmitResult(attempt, False, elapsed)
+
+    draft = draft_answers(student.pk, quiz.pk)
+    answer_key = list(Question.objects.filter(quiz=quiz).values_list('id', 'answer', 'marks'))
+    now = datetime.datetime.now()
+
+    answers = []
+    correct_ids = []
+    marks_obtained = 0
+    for question_id, correct_answer, marks in answer_key:
+        key = str(question_id)
+        answer = (responses.get(key) if key in responses else draft.get(key)) or None
+        is_correct = answer == correct_answer
+        answers.append(StudentAnswer(student_id=student.pk, quiz_id=quiz.pk, question_id=question_id,
+                                     answer=answer, marks=marks if is_correct else 0))
+        if is_correct:
+            correct_ids.append(question_id)
+            marks_obtained += marks
+    correct_count = len(correct_ids)
+
+    created = False
+    try:
+        with transaction.atomic():
+            StudentAnswer.objects.bulk_create(answers)
+            is_correct = Case(When(pk__in=correct_ids, then=Value(1)), default=Value(0))
+            Question.objects.filter(pk__in=[answer.question_id for answer in answers]).update(
+                correct_count=F('correct_count') + is_correct, wrong_count=F('wrong_count') + 1 - is_correct)
+            attempt = QuizAttempt.objects.create(
+                student_id=student.pk, quiz_id=quiz.pk, marks_obtained=marks_obtained,
+                correct_count=correct_count, wrong_count=len(answers) - correct_count,
+                submitted_at=now, duration=now - quiz.start)
+            autosave_buffer.discard(student.pk, quiz.pk)
+            created = True
+    except IntegrityError:
+        # Một request nộp bài khác của cùng sinh viên đã ghi trước: giữ nguyên bài làm đã lưu
+        attempt = QuizAttempt.objects.filter(student_id=student.pk, quiz_id=quiz.pk).first()
+
+    elapsed = time.perf_counter() - started
+    logger.info('quiz submit student=%s quiz=%s answers=%d created=%s elapsed=%.1fms',
+                student.pk, quiz.pk, len(answers), created, elapsed * 1000)
+    return SubmitResult(attempt, created, elapsed)
@@ -0,0 +1,50 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from main.signals import on_commit_and_now
+from .models import Quiz, Question, StudentAnswer
+from .paper_cache import quiz_papers
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_changed(sender, instance, **kwargs):
+    """Vô hiệu hóa đề thi đã cache khi câu hỏi được thêm, sửa hoặc xóa."""
+    on_commit_and_now(lambda: quiz_papers.invalidate(instance.quiz_id))
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def quiz_changed(sender, instance, **kwargs):
+    """Vô hiệu hóa đề thi đã cache khi bài trắc nghiệm thay đổi."""
+    on_commit_and_now(lambda: quiz_papers.invalidate(instance.pk))
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def question_totals_changed(sender, instance, **kwargs):
+    """Cập nhật số câu hỏi và tổng điểm của bài trắc nghiệm khi câu hỏi được thêm, sửa hoặc xóa."""
+    Quiz.update_question_totals([instance.quiz_id])
+
+
+@receiver(post_save, sender=Question)
+def question_saved(sender, instance, created, **kwargs):
+    # Đáp án có thể đã thay đổi, hoặc một đối tượng cũ được lưu lại đã ghi đè các cột đếm, nên tính lại cho câu hỏi này
+    if not created:
+        Question.update_answer_tallies([instance.pk])
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_saved(sender, instance, **kwargs):
+    # Một đối tượng cũ được lưu lại có thể ghi đè question_count và total_marks, nên tính lại cho bài trắc nghiệm này
+    Quiz.update_question_totals([instance.pk])
+
+
+@receiver(post_save, sender=StudentAnswer)
+@receiver(post_delete, sender=StudentAnswer)
+def answer_changed(sender, instance, **kwargs):
+    """
+    Cập nhật số câu trả lời đúng/sai khi một câu trả lời được lưu hoặc xóa riêng lẻ.
+
+    Bài nộp qua submit_answers dùng bulk_create (không gửi signal) và tự cập nhật các cột đếm.
+    """
+    Question.update_answer_tallies([instance.question_id])
@@ -1,3 +1,607 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+from django.conf import settings
+from django.contrib.messages import constants as message_constants
+from django.contrib.messages.storage.base import Message
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.db.models import F, Sum
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from main.models import Course, Department, Faculty, Student
+from . import analytics
+from .autosave import AutosaveBuffer, autosave_buffer
+from .importers import import_questions
+from .models import Question, Quiz, QuizAttempt, QuizDraft, StudentAnswer
+from .paper_cache import QuizPaperCache, quiz_papers
+from .regrade import regrade_question
+from .services import quiz_summary, student_dashboard, submit_answers
 
-# Create your tests here.
+
+class RegradeQuestionTests(TestCase):
+    """Chấm lại câu hỏi sau khi đáp án bị sửa nhiều lần."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=course, start=now - datetime.timedelta(hours=1),
+                                        end=now + datetime.timedelta(hours=1), publish_status=True)
+        self.question = Question.objects.create(quiz=self.quiz, question='Q1', marks=2, answer='A')
+        other = Question.objects.create(quiz=self.quiz, question='Q2', marks=3, answer='A')
+        self.students = []
+        for student_id, choice in ((1, 'A'), (2, 'B'), (3, 'C'), (4, None)):
+            student = Student.objects.create(student_id=student_id, name='Student %d' % student_id, password='test',
+                                             department=department)
+            course.students.add(student)
+            submit_answers(student, self.quiz, {str(self.question.pk): choice, str(other.pk): 'A'})
+            self.students.append(student)
+
+    def set_answer(self, answer):
+        self.question.answer = answer
+        self.question.save()
+
+    def assertAttemptsMatchAnswers(self):
+        """Mỗi QuizAttempt phải bằng kết quả tính lại từ toàn bộ StudentAnswer của sinh viên."""
+        for student in self.students:
+            attempt = QuizAttempt.objects.get(student=student, quiz=self.quiz)
+            answers = StudentAnswer.objects.filter(student=student, quiz=self.quiz)
+            correct = answers.filter(answer=F('question__answer')).count()
+            self.assertEqual(attempt.marks_obtained, answers.aggregate(total=Sum('marks'))['total'])
+            self.assertEqual(attempt.correct_count, correct)
+            self.assertEqual(attempt.wrong_count, answers.count() - correct)
+
+    def test_regrade_after_each_edit(self):
+        for answer in ('B', 'C', 'A'):
+            self.set_answer(answer)
+            regrade_question(self.question.pk)
+            self.assertAttemptsMatchAnswers()
+
+    def test_regrades_queued_after_repeated_edits(self):
+        # Hai lần sửa A -> B -> C trước khi lần chấm lại (trong luồng nền) nào chạy, rồi cả hai lần chấm lại cùng chạy
+        self.set_answer('B')
+        self.set_answer('C')
+        first = regrade_question(self.question.pk)
+        second = regrade_question(self.question.pk)
+        self.assertEqual((first.answers_changed, first.attempts_changed), (2, 2))
+        self.assertEqual((second.answers_changed, second.attempts_changed, second.marks_delta), (0, 0, 0))
+        self.assertAttemptsMatchAnswers()
+        self.assertEqual(QuizAttempt.objects.get(student=self.students[2], quiz=self.quiz).marks_obtained, 5)
+
+
+class QuizAttemptTests(TestCase):
+    """QuizAttempt được ghi khi nộp bài và có thể được xây dựng lại từ câu trả lời bằng lệnh backfill."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1)
+        now = datetime.datetime.now()
+        self.quizzes = [Quiz.objects.create(title='Quiz %d' % i, course=course, start=now - datetime.timedelta(hours=1),
+                                            end=now + datetime.timedelta(hours=1), publish_status=True) for i in (1, 2)]
+        self.students = [Student.objects.create(student_id=student_id, name='Student %d' % student_id, password='test',
+                                                department=department) for student_id in (1, 2)]
+        course.students.add(*self.students)
+        for quiz in self.quizzes:
+            first = Question.objects.create(quiz=quiz, question='Q1', marks=2, answer='A')
+            second = Question.objects.create(quiz=quiz, question='Q2', marks=3, answer='B')
+            submit_answers(self.students[0], quiz, {str(first.pk): 'A', str(second.pk): 'B'})
+            submit_answers(self.students[1], quiz, {str(first.pk): 'A', str(second.pk): 'C'})
+
+    def attempts(self):
+        return sorted(QuizAttempt.objects.values_list('student_id', 'quiz_id', 'marks_obtained', 'correct_count', 'wrong_count'))
+
+    def test_written_on_submit(self):
+        attempt = QuizAttempt.objects.get(student=self.students[1], quiz=self.quizzes[0])
+        self.assertEqual((attempt.marks_obtained, attempt.correct_count, attempt.wrong_count), (2, 1, 1))
+        self.assertEqual(attempt.percentage(5), 40.0)
+        self.assertGreater(attempt.duration, datetime.timedelta(minutes=59))
+
+    def test_backfill(self):
+        expected = self.attempts()
+        QuizAttempt.objects.all().delete()
+
+        stdout = io.StringIO()
+        call_command('backfill_quiz_attempts', '--dry-run', stdout=stdout)
+        self.assertIn('4 attempt(s) would be written.', stdout.getvalue())
+        self.assertFalse(QuizAttempt.objects.exists())
+
+        call_command('backfill_quiz_attempts', '--quiz', str(self.quizzes[1].pk), stdout=io.StringIO())
+        self.assertEqual(self.attempts(), [row for row in expected if row[1] == self.quizzes[1].pk])
+        # Chạy lại cho mọi bài trắc nghiệm không tạo dòng trùng
+        call_command('backfill_quiz_attempts', stdout=io.StringIO())
+        call_command('backfill_quiz_attempts', stdout=io.StringIO())
+        self.assertEqual(self.attempts(), expected)
+
+
+class DuplicateSubmitTests(TestCase):
+    """Nộp bài lặp lại và lưu nháp sau khi đã nộp bài."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        self.course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=self.course, start=now - datetime.timedelta(hours=1),
+                                        end=now + datetime.timedelta(hours=1), publish_status=True)
+        self.question = Question.objects.create(quiz=self.quiz, question='Q1', marks=2, answer='A')
+        self.student = Student.objects.create(student_id=1, name='Student 1', password='test', department=department)
+        self.course.students.add(self.student)
+
+    def test_duplicate_submit_keeps_drafts(self):
+        first = submit_answers(self.student, self.quiz, {str(self.question.pk): 'A'})
+        QuizDraft.objects.create(student=self.student, quiz=self.quiz, answers={str(self.question.pk): 'B'})
+        second = submit_answers(self.student, self.quiz, {})
+        self.assertTrue(first.created)
+        self.assertFalse(second.created)
+        self.assertEqual(second.attempt.pk, first.attempt.pk)
+        self.assertTrue(QuizDraft.objects.filter(student=self.student, quiz=self.quiz).exists())
+
+    def test_autosave_rejected_after_submit(self):
+        session = self.client.session
+        session['student_id'] = self.student.student_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        url = reverse('autosave', args=[self.course.code, self.quiz.pk])
+        body = json.dumps({str(self.question.pk): 'B'})
+
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            submit_answers(self.student, self.quiz, {})
+        response = self.client.post(url, body, content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(autosave_buffer.pending(self.student.pk, self.quiz.pk), {})
+
+    def test_cleared_answer_is_not_restored_from_draft(self):
+        QuizDraft.objects.create(student=self.student, quiz=self.quiz, answers={str(self.question.pk): 'A'})
+        result = submit_answers(self.student, self.quiz, {str(self.question.pk): ''})
+        self.assertEqual(result.attempt.marks_obtained, 0)
+        self.assertIsNone(StudentAnswer.objects.get(student=self.student, quiz=self.quiz).answer)
+        self.assertFalse(QuizDraft.objects.filter(student=self.student, quiz=self.quiz).exists())
+
+    def test_failed_submit_keeps_draft(self):
+        QuizDraft.objects.create(student=self.student, quiz=self.quiz, answers={str(self.question.pk): 'A'})
+        with mock.patch.object(QuizAttempt.objects, 'create', side_effect=OperationalError('database is locked')):
+            with self.assertRaises(OperationalError):
+                submit_answers(self.student, self.quiz, {})
+        self.assertFalse(StudentAnswer.objects.filter(student=self.student, quiz=self.quiz).exists())
+        self.assertEqual(QuizDraft.objects.get(student=self.student, quiz=self.quiz).answers, {str(self.question.pk): 'A'})
+
+
+class AutosaveBufferTests(TestCase):
+    """Ghi theo lô bản nháp autosave vào QuizDraft."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=course, start=now - datetime.timedelta(hours=1),
+                                        end=now + datetime.timedelta(hours=1), publish_status=True)
+        self.question = Question.objects.create(quiz=self.quiz, question='Q1', marks=2, answer='A')
+        self.student = Student.objects.create(student_id=1, name='Student 1', password='test', department=department)
+        self.buffer = AutosaveBuffer(flush_interval=3600)
+        self.addCleanup(self.buffer.flush)
+
+    def test_flush_updates_existing_draft(self):
+        draft = QuizDraft.objects.create(student=self.student, quiz=self.quiz, answers={str(self.question.pk): 'A'}, writes=1)
+        stale = datetime.datetime.now() - datetime.timedelta(hours=1)
+        QuizDraft.objects.filter(pk=draft.pk).update(updated_at=stale)
+
+        self.buffer.add(self.student.pk, self.quiz.pk, {str(self.question.pk): 'B'})
+        self.assertEqual(self.buffer.flush(), 1)
+        draft.refresh_from_db()
+        self.assertEqual(draft.answers, {str(self.question.pk): 'B'})
+        self.assertEqual(draft.writes, 2)
+        self.assertGreater(draft.updated_at, stale)
+
+    def test_flush_skips_submitted_attempts(self):
+        submit_answers(self.student, self.quiz, {str(self.question.pk): 'A'})
+        self.buffer.add(self.student.pk, self.quiz.pk, {str(self.question.pk): 'B'})
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertFalse(QuizDraft.objects.filter(student=self.student, quiz=self.quiz).exists())
+
+
+CSV_QUESTIONS = """question,A,B,C,D,answer,marks,explanation
+What is 1 + 1?,1,2,3,4,b,2,
+"Capital of France, in English?",Rome,Paris,Berlin,Madrid,B,,Paris
+"""
+
+JSON_QUESTIONS = """[
+  {"question": "What is 1 + 1?", "option1": "1", "option2": "2", "option3": "3", "option4": "4", "answer": "B", "marks": 2},
+  {"question": "Capital of France?", "a": "Rome", "b": "Paris", "c": "Berlin", "d": "Madrid", "answer": "b"}
+]"""
+
+JSONL_QUESTIONS = """{"question": "What is 1 + 1?", "option1": "1", "option2": "2", "option3": "3", "option4": "4", "answer": "B", "marks": 2}
+
+{"question": "Capital of France?", "option1": "Rome", "option2": "Paris", "option3": "Berlin", "option4": "Madrid", "answer": "B"}
+"""
+
+GIFT_QUESTIONS = """// Hai câu hỏi một đáp án đúng
+::Q1:: What is 1 + 1? {~1 =2 ~3 ~4}
+
+Capital of France? {
+  ~Rome
+  =Paris#Correct
+  ~Berlin
+  ~Madrid
+  ####Paris has been the capital since 987
+}
+"""
+
+
+class ImportQuestionsTests(TestCase):
+    """Nhập câu hỏi từ tệp CSV, JSON/JSON Lines và GIFT."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        self.faculty = Faculty.objects.create(faculty_id=1, name='Faculty', password='test', department=department)
+        self.course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1,
+                                            faculty=self.faculty)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=self.course, start=now, end=now + datetime.timedelta(hours=1))
+        Question.objects.create(quiz=self.quiz, question='Existing', marks=5, answer='A')
+
+    def assertImported(self, report, marks):
+        self.assertEqual((report.valid, report.created, report.errors), (len(marks), len(marks), []))
+        questions = list(Question.objects.filter(quiz=self.quiz).exclude(question='Existing').order_by('id'))
+        self.assertEqual([question.marks for question in questions], marks)
+        self.assertEqual([question.answer for question in questions], ['B'] * len(marks))
+        self.assertEqual(questions[1].option2, 'Paris')
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.question_count, self.quiz.total_marks), (len(marks) + 1, sum(marks) + 5))
+        return questions
+
+    def test_csv(self):
+        questions = self.assertImported(import_questions(self.quiz, io.StringIO(CSV_QUESTIONS), 'csv'), [2, 1])
+        self.assertEqual(questions[1].question, 'Capital of France, in English?')
+        self.assertEqual(questions[1].explanation, 'Paris')
+
+    def test_json_array(self):
+        self.assertImported(import_questions(self.quiz, io.StringIO(JSON_QUESTIONS), 'json'), [2, 1])
+
+    def test_json_lines(self):
+        self.assertImported(import_questions(self.quiz, io.StringIO(JSONL_QUESTIONS), 'json'), [2, 1])
+
+    def test_gift(self):
+        questions = self.assertImported(import_questions(self.quiz, io.StringIO(GIFT_QUESTIONS), 'gift', default_marks=3), [3, 3])
+        self.assertEqual(questions[0].question, 'What is 1 + 1?')
+        self.assertEqual(questions[1].explanation, 'Paris has been the capital since 987')
+
+    def test_bad_row_rolls_back_import(self):
+        rows = CSV_QUESTIONS + 'Missing answer,1,2,3,4,,1,\n' + 'Bad marks,1,2,3,4,A,x,\n'
+        report = import_questions(self.quiz, io.StringIO(rows), 'csv', batch_size=1)
+        self.assertEqual(report.created, 0)
+        self.assertEqual([error.line for error in report.errors], [4, 5])
+        self.assertEqual(Question.objects.filter(quiz=self.quiz).count(), 1)
+        self.quiz.refresh_from_db()
+        self.assertEqual((self.quiz.question_count, self.quiz.total_marks), (1, 5))
+
+    def test_malformed_csv_is_reported(self):
+        rows = CSV_QUESTIONS + 'Long,%s,2,3,4,A,1,\n' % ('x' * (csv.field_size_limit() + 1))
+        report = import_questions(self.quiz, io.StringIO(rows), 'csv')
+        self.assertEqual(report.created, 0)
+        self.assertEqual(len(report.errors), 1)
+        self.assertIn('Invalid CSV', report.errors[0].message)
+
+        session = self.client.session
+        session['faculty_id'] = self.faculty.faculty_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        upload = io.BytesIO(rows.encode())
+        upload.name = 'questions.csv'
+        response = self.client.post(reverse('importQuestions', args=[self.course.code, self.quiz.pk]), {'file': upload})
+        self.assertRedirects(response, reverse('addQuestion', args=[self.course.code, self.quiz.pk]), fetch_redirect_response=False)
+        self.assertEqual(Question.objects.filter(quiz=self.quiz).count(), 1)
+
+
+class QuizStatusTests(TestCase):
+    """Trạng thái bài trắc nghiệm được tính khi truy vấn; trang danh sách bài trắc nghiệm không ghi vào cơ sở dữ liệu."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        faculty = Faculty.objects.create(faculty_id=1, name='Faculty', password='test', department=department)
+        self.course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1, faculty=faculty)
+        self.now = datetime.datetime.now()
+        hour = datetime.timedelta(hours=1)
+        for title, start in (('Scheduled', self.now + hour), ('Open', self.now - hour), ('Closed', self.now - 3 * hour)):
+            Quiz.objects.create(title=title, course=self.course, start=start, end=start + 2 * hour)
+        session = self.client.session
+        session['faculty_id'] = faculty.faculty_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def test_with_status(self):
+        quizzes = Quiz.objects.with_status(self.now).order_by('id')
+        self.assertEqual([(quiz.title, quiz.status) for quiz in quizzes],
+                         [('Scheduled', Quiz.SCHEDULED), ('Open', Quiz.OPEN), ('Closed', Quiz.CLOSED)])
+        self.assertEqual([quiz.current_status(self.now) for quiz in quizzes], [quiz.status for quiz in quizzes])
+        self.assertEqual([quiz.started for quiz in quizzes], [False, True, True])
+
+    def test_all_quizzes_is_read_only(self):
+        updated = list(Quiz.objects.order_by('id').values_list('updated_at', flat=True))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('allQuizzes', args=[self.course.code]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse([query['sql'] for query in queries if not query['sql'].startswith('SELECT')])
+        self.assertEqual(list(Quiz.objects.order_by('id').values_list('updated_at', flat=True)), updated)
+        self.assertEqual(sorted(quiz.status for quiz in response.context['quizzes']), [Quiz.CLOSED, Quiz.OPEN, Quiz.SCHEDULED])
+
+
+class QuizPaperCacheTests(TestCase):
+    """Đề thi được xây dựng một lần, không chứa đáp án và được làm mới khi câu hỏi thay đổi."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=course, start=now, end=now + datetime.timedelta(hours=1))
+        self.question = Question.objects.create(quiz=self.quiz, question='Capital of France?', marks=2, option1='Paris',
+                                                option2='Rome', option3='Oslo', option4='Bern', answer='A')
+
+    def test_built_once(self):
+        cache = QuizPaperCache()
+        paper = cache.get(self.quiz)
+        self.assertEqual((paper.total_questions, paper.total_marks), (1, 2))
+        self.assertIn('Capital of France?', paper.html)
+        self.assertFalse(hasattr(paper.questions[0], 'answer'))
+        with self.assertNumQueries(0):
+            self.assertIs(cache.get(self.quiz), paper)
+
+        cache.invalidate(self.quiz.pk)
+        rebuilt = cache.get(self.quiz)
+        self.assertIsNot(rebuilt, paper)
+        self.assertEqual(rebuilt.version, paper.version + 1)
+
+    def test_invalidated_on_question_change(self):
+        quiz_papers.invalidate(self.quiz.pk)
+        self.addCleanup(quiz_papers.invalidate, self.quiz.pk)
+        self.assertEqual(quiz_papers.get(self.quiz).total_marks, 2)
+        self.question.marks = 5
+        self.question.save()
+        self.assertEqual(quiz_papers.get(self.quiz).total_marks, 5)
+        Question.objects.create(quiz=self.quiz, question='Capital of Italy?', marks=1, answer='B')
+        self.assertEqual(quiz_papers.get(self.quiz).total_questions, 2)
+
+    def test_concurrent_start_builds_once(self):
+        cache = QuizPaperCache()
+        paper = cache._build(self.quiz, 0)
+        start = threading.Barrier(8)
+        building = threading.Event()
+
+        def slow_build(quiz, version):
+            # Giữ luồng xây dựng đề thi cho đến khi các luồng khác đã chờ
+            building.wait(1)
+            return paper
+
+        def get(_):
+            start.wait()
+            return cache.get(self.quiz)
+
+        with mock.patch.object(cache, '_build', slow_build), ThreadPoolExecutor(max_workers=8) as pool:
+            results = pool.map(get, range(8))
+            building.set()
+            papers = list(results)
+        self.assertEqual(cache.builds, 1)
+        self.assertEqual(cache.hits, 7)
+        self.assertTrue(all(paper is papers[0] for paper in papers))
+
+    def test_paper_built_during_change_is_not_stored(self):
+        cache = QuizPaperCache()
+        build = cache._build
+
+        def racing_build(quiz, version):
+            paper = build(quiz, version)
+            # Câu hỏi được sửa trong lúc đề thi đang được xây dựng
+            cache.invalidate(quiz.pk)
+            return paper
+
+        with mock.patch.object(cache, '_build', racing_build):
+            cache.get(self.quiz)
+        self.assertEqual(cache.get(self.quiz).version, 1)
+        self.assertEqual(cache.builds, 2)
+
+
+class QuizCountersTests(TestCase):
+    """Quiz.question_count/total_marks được cập nhật khi câu hỏi thay đổi và hiển thị ở trang làm bài."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        self.course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=self.course, start=now - datetime.timedelta(hours=1),
+                                        end=now + datetime.timedelta(hours=1), publish_status=True)
+        self.student = Student.objects.create(student_id=1, name='Student 1', password='test', department=department)
+        self.course.students.add(self.student)
+
+    def counters(self):
+        self.quiz.refresh_from_db()
+        return self.quiz.question_count, self.quiz.total_marks
+
+    def test_question_changes(self):
+        first = Question.objects.create(quiz=self.quiz, question='Q1', marks=2, answer='A')
+        Question.objects.create(quiz=self.quiz, question='Q2', marks=3, answer='B')
+        self.assertEqual(self.counters(), (2, 5))
+        first.marks = 4
+        first.save()
+        self.assertEqual(self.counters(), (2, 7))
+        first.delete()
+        self.assertEqual(self.counters(), (1, 3))
+
+    def test_start_page_shows_total_without_changing_quiz(self):
+        Question.objects.create(quiz=self.quiz, question='Q1', marks=2, answer='A')
+        session = self.client.session
+        session['student_id'] = self.student.student_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        # Tổng điểm trong cơ sở dữ liệu bị lệch: trang hiển thị tổng của đề thi, không ghi vào đối tượng Quiz
+        Quiz.objects.filter(pk=self.quiz.pk).update(total_marks=99)
+        response = self.client.get(reverse('startQuiz', args=[self.course.code, self.quiz.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total_marks'], 2)
+        self.assertEqual(response.context['quiz'].total_marks, 99)
+
+
+class StudentDashboardTests(TestCase):
+    """Danh sách bài trắc nghiệm của sinh viên được lấy trong một truy vấn và chia theo trạng thái làm bài."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        self.course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1)
+        self.student = Student.objects.create(student_id=1, name='Student 1', password='test', department=department)
+        self.course.students.add(self.student)
+        now = datetime.datetime.now()
+        hour = datetime.timedelta(hours=1)
+        self.open, self.attempted, self.closed = [
+            Quiz.objects.create(title=title, course=self.course, start=start, end=start + 2 * hour, publish_status=published)
+            for title, start, published in (('Open', now - hour, False), ('Attempted', now - hour, True),
+                                            ('Closed', now - 3 * hour, True))]
+        for quiz in (self.open, self.attempted, self.closed):
+            Question.objects.create(quiz=quiz, question='Q1', marks=2, answer='A')
+            Question.objects.create(quiz=quiz, question='Q2', marks=2, answer='B')
+        first, second = self.attempted.question_set.order_by('id')
+        submit_answers(self.student, self.attempted, {str(first.pk): 'A', str(second.pk): 'C'})
+
+    def test_dashboard(self):
+        with self.assertNumQueries(1):
+            dashboard = student_dashboard(self.student, self.course)
+        self.assertEqual([quiz.title for quiz in dashboard.active], ['Open'])
+        self.assertEqual(sorted(quiz.title for quiz in dashboard.previous), ['Attempted', 'Closed'])
+        attempted = next(quiz for quiz in dashboard.previous if quiz.pk == self.attempted.pk)
+        self.assertEqual((attempted.attempted, attempted.total_marks_obtained, attempted.percentage), (True, 2, 50.0))
+        closed = next(quiz for quiz in dashboard.previous if quiz.pk == self.closed.pk)
+        self.assertEqual((closed.attempted, closed.total_marks_obtained, closed.percentage), (False, 0, 0.0))
+
+    def test_json(self):
+        url = reverse('myQuizzesData', args=[self.course.code])
+        self.assertEqual(self.client.get(url).status_code, 403)
+        session = self.client.session
+        session['student_id'] = self.student.student_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        data = self.client.get(url).json()
+        self.assertEqual([(entry['title'], entry['question_count'], entry['total_marks']) for entry in data['active']],
+                         [('Open', 2, 4)])
+        previous = {entry['title']: entry for entry in data['previous']}
+        self.assertEqual((previous['Attempted']['marks_obtained'], previous['Attempted']['percentage']), (2, 50.0))
+        # Kết quả chỉ được trả về khi sinh viên đã làm bài
+        self.assertNotIn('marks_obtained', previous['Closed'])
+
+
+class QuizSummaryTests(TestCase):
+    """Trang tổng hợp bài trắc nghiệm được tính với số truy vấn cố định."""
+
+    def setUp(self):
+        self.department = Department.objects.create(department_id=1, name='Test')
+        self.course = Course.objects.create(code=1, name='Test', department=self.department, studentKey=1, facultyKey=1)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=self.course, start=now - datetime.timedelta(hours=1),
+                                        end=now + datetime.timedelta(hours=1), publish_status=True)
+        self.questions = [Question.objects.create(quiz=self.quiz, question='Q1', marks=2, answer='A'),
+                          Question.objects.create(quiz=self.quiz, question='Q2', marks=3, answer='B')]
+        self.students = [Student.objects.create(student_id=student_id, name='Student %d' % student_id, password='test',
+                                                department=self.department) for student_id in (1, 2, 3)]
+        self.course.students.add(*self.students)
+        first, second = (str(question.pk) for question in self.questions)
+        submit_answers(self.students[0], self.quiz, {first: 'A', second: 'B'})
+        submit_answers(self.students[1], self.quiz, {first: 'B', second: 'C'})
+
+    def test_summary(self):
+        with self.assertNumQueries(3):
+            summary = quiz_summary(self.quiz, self.course)
+        self.assertEqual((summary.total_questions, summary.total_marks, summary.attempted_students), (2, 5, 2))
+        self.assertEqual([(question.A, question.B, question.C, question.D, question.answered, question.correct, question.wrong)
+                          for question in summary.questions], [(1, 1, 0, 0, 2, 1, 1), (0, 1, 1, 0, 2, 1, 1)])
+        self.assertEqual([(student.student_id, student.attempted, student.total_marks_obtained) for student in summary.students],
+                         [(1, True, 5), (2, True, 0), (3, False, 0)])
+        self.assertIsNone(summary.students[2].submitted_at)
+
+    def test_query_count_does_not_grow(self):
+        extra = [Question.objects.create(quiz=self.quiz, question='Q%d' % i, marks=1, answer='C') for i in range(3, 8)]
+        student = Student.objects.create(student_id=4, name='Student 4', password='test', department=self.department)
+        self.course.students.add(student)
+        submit_answers(student, self.quiz, {str(question.pk): 'C' for question in extra})
+        with self.assertNumQueries(3):
+            summary = quiz_summary(self.quiz, self.course)
+        self.assertEqual((summary.total_questions, summary.total_marks, summary.attempted_students), (7, 10, 3))
+        self.assertEqual(summary.students[3].total_marks_obtained, 5)
+
+
+class QuizSummaryMessagesTests(TestCase):
+    """Thông báo trên trang tổng hợp bài trắc nghiệm được tô màu theo mức độ."""
+
+    def setUp(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        faculty = Faculty.objects.create(faculty_id=1, name='Faculty', password='test', department=department)
+        self.course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1, faculty=faculty)
+        now = datetime.datetime.now()
+        self.quiz = Quiz.objects.create(title='Test', course=self.course, start=now, end=now + datetime.timedelta(hours=1))
+        session = self.client.session
+        session['faculty_id'] = faculty.faculty_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    def test_message_levels(self):
+        storage = CookieStorage(RequestFactory().get('/'))
+        self.client.cookies[storage.cookie_name] = storage._encode([
+            Message(message_constants.ERROR, 'Regrade failed'), Message(message_constants.WARNING, 'Regrade pending'),
+            Message(message_constants.SUCCESS, 'Question updated')])
+        response = self.client.get(reverse('quizSummary', args=[self.course.code, self.quiz.pk]))
+        self.assertContains(response, 'alert alert-danger', count=1)
+        self.assertContains(response, 'alert alert-warning', count=1)
+        self.assertContains(response, 'alert alert-success', count=1)
+
+
+@skipUnless(analytics.is_available(), 'NumPy is not installed')
+class ItemAnalysisTests(TestCase):
+    """Nhóm điểm cao và nhóm điểm thấp của phân tích câu hỏi không được chồng lên nhau."""
+
+    def analyse(self, answers):
+        matrix = analytics.np.array([[answer] for answer in answers], dtype=analytics.np.uint8)
+        return analytics.analyse(matrix, analytics.np.array([1], dtype=analytics.np.uint8), analytics.np.array([1.0]))
+
+    def test_too_few_students(self):
+        stats = self.analyse([1])
+        self.assertEqual(stats['group_size'], 0)
+        self.assertIsNone(stats['discrimination'])
+        self.assertIsNone(stats['upper'])
+        self.assertEqual(stats['difficulty'][0], 1.0)
+
+    def test_groups_are_disjoint(self):
+        # 27% của 4 sinh viên là 1: sinh viên đúng duy nhất thuộc nhóm cao, không đồng thời thuộc nhóm thấp
+        stats = self.analyse([2, 1, 3, 0])
+        self.assertEqual(stats['group_size'], 1)
+        self.assertEqual(stats['discrimination'][0], 1.0)
+        self.assertEqual(stats['upper'][1, 0], 1.0)
+        self.assertEqual(stats['lower'][1, 0], 0.0)
+
+        stats = self.analyse([1] * 10 + [2] * 10)
+        self.assertEqual(stats['group_size'], 5)
+        self.assertEqual(stats['discrimination'][0], 1.0)
+
+    def test_summary_page_with_one_student(self):
+        department = Department.objects.create(department_id=1, name='Test')
+        faculty = Faculty.objects.create(faculty_id=1, name='Faculty', password='test', department=department)
+        course = Course.objects.create(code=1, name='Test', department=department, studentKey=1, facultyKey=1, faculty=faculty)
+        now = datetime.datetime.now()
+        quiz = Quiz.objects.create(title='Test', course=course, start=now, end=now + datetime.timedelta(hours=1))
+        question = Question.objects.create(quiz=quiz, question='Q1', marks=1, answer='A')
+        student = Student.objects.create(student_id=1, name='Student 1', password='test', department=department)
+        StudentAnswer.objects.create(student=student, quiz=quiz, question=question, answer='B')
+
+        analysis = analytics.build_analysis(quiz, [question])
+        self.assertEqual(analysis.group_size, 0)
+        self.assertIsNone(analysis.items[0].discrimination)
+        self.assertFalse(any(option.effective for option in analysis.items[0].distractors))
+
+        session = self.client.session
+        session['faculty_id'] = faculty.faculty_id
+        session.save()
+        self.client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        response = self.client.get(reverse('quizSummary', args=[course.code, quiz.pk]))
+        self.assertContains(response, 'too few students for upper/lower groups')
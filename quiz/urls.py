@@ -4,10 +4,14 @@ from . import views
 urlpatterns = [
     path('quiz/<int:code>', views.quiz, name='quiz'),
     path('addQuestion/<int:code>/<int:quiz_id>', views.addQuestion, name='addQuestion'),
+    path('editQuestion/<int:code>/<int:quiz_id>/<int:question_id>', views.editQuestion, name='editQuestion'),
+    path('importQuestions/<int:code>/<int:quiz_id>', views.importQuestions, name='importQuestions'),
     path('allQuizzes/<int:code>', views.allQuizzes, name='allQuizzes'),
     path('quizSummary/<int:code>/<int:quiz_id>', views.quizSummary, name='quizSummary'),
     path('myQuizzes/<int:code>', views.myQuizzes, name='myQuizzes'),
+    path('myQuizzes/<int:code>/data', views.myQuizzesData, name='myQuizzesData'),
     path('startQuiz/<int:code>/<int:quiz_id>', views.startQuiz, name='startQuiz'),
+    path('autosave/<int:code>/<int:quiz_id>', views.autosave, name='autosave'),
     path('studentAnswer/<int:code>/<int:quiz_id>', views.studentAnswer, name='studentAnswer'),
     path('quizResult/<int:code>/<int:quiz_id>', views.quizResult, name='quizResult'),
 ]
\ No newline at end of file
@@ -1,9 +1,20 @@
 import datetime
+import io
+import json
 from django.shortcuts import render, redirect, get_object_or_404
-from .models import Quiz, Question, StudentAnswer
+from .models import Quiz, Question, StudentAnswer, QuizAttempt
 from main.models import Student, Course, Faculty
 from main.views import is_faculty_authorised, is_student_authorised
+from main.course_cache import course_cache
+from .services import dashboard_entry, quiz_summary, student_dashboard, submit_answers
+from .paper_cache import quiz_papers
+from .importers import FORMATS, detect_format, import_questions
+from . import analytics
+from .regrade import last_report, schedule_regrade
+from .autosave import autosave_buffer, clean_changes, draft_answers
 from django.contrib import messages
+from django.http import JsonResponse
+from django.db import transaction
 from django.utils import timezone
 from django.db.models import Count, Sum, F, FloatField, Q, Prefetch
 from django.db.models.functions import Cast
@@ -27,7 +38,7 @@ def quiz(request, code):
 
     """
     try:
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
         if is_faculty_authorised(request, code):
             if request.method == 'POST':
                 # Xử lý thông tin bài trắc nghiệm được submit
@@ -42,7 +53,7 @@ def quiz(request, code):
                 return redirect('addQuestion', code=code, quiz_id=quiz.id)
             else:
                 # Hiển thị trang tạo bài trắc nghiệm
-                return render(request, 'quiz/quiz.html', {'course': course, 'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id'])})
+                return render(request, 'quiz/quiz.html', {'course': course, 'faculty': request.principal})
         else:
             # Người dùng không có quyền truy cập
             return redirect('std_login')
@@ -71,7 +82,7 @@ def addQuestion(request, code, quiz_id):
 
     """
     try:
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
         if is_faculty_authorised(request, code):
             quiz = Quiz.objects.get(id=quiz_id)
             if request.method == 'POST':
@@ -87,15 +98,17 @@ def addQuestion(request, code, quiz_id):
                 question = Question(question=question, option1=option1, option2=option2,
                                     option3=option3, option4=option4, answer=answer, quiz=quiz, marks=marks, explanation=explanation)
                 question.save()
+                # Signal của Question đã cập nhật question_count/total_marks trong cơ sở dữ liệu, tải lại để nhãn câu hỏi tăng
+                quiz.refresh_from_db(fields=['question_count', 'total_marks'])
                 messages.success(request, 'Question added successfully')
             else:
                 # Hiển thị trang thêm câu hỏi cho bài trắc nghiệm
-                return render(request, 'quiz/addQuestion.html', {'course': course, 'quiz': quiz, 'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id'])})
+                return render(request, 'quiz/addQuestion.html', {'course': course, 'quiz': quiz, 'faculty': request.principal})
             if 'saveOnly' in request.POST:
                 # Chuyển hướng đến danh sách tất cả các bài trắc nghiệm
                 return redirect('allQuizzes', code=code)
             # Hiển thị trang thêm câu hỏi cho bài trắc nghiệm
-            return render(request, 'quiz/addQuestion.html', {'course': course, 'quiz': quiz, 'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id'])})
+            return render(request, 'quiz/addQuestion.html', {'course': course, 'quiz': quiz, 'faculty': request.principal})
         else:
             # Người dùng không có quyền truy cập
             return redirect('std_login')
@@ -104,6 +117,115 @@ def addQuestion(request, code, quiz_id):
         return render(request, 'error.html')
 
 
+def editQuestion(request, code, quiz_id, question_id):
+    """
+    Sửa một câu hỏi của bài trắc nghiệm; nếu đáp án hoặc điểm thay đổi, các câu trả lời đã nộp được chấm lại.
+
+    Args:
+        request: Đối tượng HttpRequest đại diện cho request được gửi đến server.
+        code: Mã khóa học của khóa học được chọn.
+        quiz_id: ID của bài trắc nghiệm.
+        question_id: ID của câu hỏi.
+
+    Returns:
+        Nếu request method là GET, hiển thị trang sửa câu hỏi.
+        Nếu request method là POST, lưu câu hỏi, chấm lại nếu cần và chuyển hướng đến trang tổng kết bài trắc nghiệm.
+        Nếu người dùng không có quyền truy cập, chuyển hướng đến trang đăng nhập.
+
+    Notes:
+        - Việc chấm lại dùng các câu lệnh UPDATE theo tập hợp (quiz/regrade.py); câu hỏi có nhiều câu trả lời
+          được chấm lại trong luồng nền.
+    """
+    if not is_faculty_authorised(request, code):
+        return redirect('std_login')
+    course = course_cache.get(code)
+    question = get_object_or_404(Question.objects.select_related('quiz'), id=question_id, quiz_id=quiz_id, quiz__course_id=code)
+    quiz = question.quiz
+
+    if request.method != 'POST':
+        return render(request, 'quiz/editQuestion.html', {'course': course, 'quiz': quiz, 'question': question, 'faculty': request.principal})
+
+    old_answer, old_marks = question.answer, question.marks
+    question.question = request.POST.get('question')
+    question.option1 = request.POST.get('option1')
+    question.option2 = request.POST.get('option2')
+    question.option3 = request.POST.get('option3')
+    question.option4 = request.POST.get('option4')
+    question.explanation = request.POST.get('explanation')
+    answer = request.POST.get('answer')
+    try:
+        marks = int(request.POST.get('marks'))
+    except (TypeError, ValueError):
+        marks = 0
+    if answer not in ('A', 'B', 'C', 'D') or marks < 1:
+        messages.error(request, 'Choose an answer and enter marks of at least 1')
+        return render(request, 'quiz/editQuestion.html', {'course': course, 'quiz': quiz, 'question': question, 'faculty': request.principal})
+    question.answer, question.marks = answer, marks
+
+    with transaction.atomic():
+        question.save()
+        report = None
+        if (answer, marks) != (old_answer, old_marks):
+            report = schedule_regrade(question)
+            if report is None:
+                messages.success(request, 'Question updated, regrading submitted answers in the background')
+
+    if report is not None:
+        messages.success(request, 'Question updated, %d answer(s) and %d attempt(s) regraded (%+d marks)'
+                         % (report.answers_changed, report.attempts_changed, report.marks_delta))
+    elif (answer, marks) == (old_answer, old_marks):
+        messages.success(request, 'Question updated')
+    return redirect('quizSummary', code=code, quiz_id=quiz.id)
+
+
+# Số lỗi tối đa được hiển thị sau một lần nhập câu hỏi
+IMPORT_ERRORS_SHOWN = 20
+
+
+def importQuestions(request, code, quiz_id):
+    """
+    Nhập nhiều câu hỏi cùng lúc từ tệp CSV, JSON hoặc Moodle GIFT.
+
+    Args:
+        request: Đối tượng HttpRequest; tệp nằm trong trường 'file', định dạng (tùy chọn) trong trường 'format'.
+        code: Mã khóa học của khóa học được chọn.
+        quiz_id: ID của bài trắc nghiệm.
+
+    Returns:
+        Chuyển hướng về trang thêm câu hỏi kèm thông báo số câu hỏi đã nhập hoặc danh sách dòng lỗi.
+        Nếu người dùng không có quyền truy cập, chuyển hướng đến trang đăng nhập.
+
+    Notes:
+        - Tệp được đọc từng dòng và ghi theo lô trong một transaction; nếu có dòng lỗi thì không câu hỏi nào được thêm.
+    """
+    if not is_faculty_authorised(request, code):
+        return redirect('std_login')
+    quiz = get_object_or_404(Quiz, id=quiz_id, course_id=code)
+    upload = request.FILES.get('file')
+    if request.method != 'POST' or upload is None:
+        messages.error(request, 'Choose a file to import')
+        return redirect('addQuestion', code=code, quiz_id=quiz.id)
+
+    fmt = request.POST.get('format') or detect_format(upload.name)
+    if fmt not in FORMATS:
+        messages.error(request, 'Unsupported file type, use CSV, JSON or GIFT')
+        return redirect('addQuestion', code=code, quiz_id=quiz.id)
+
+    try:
+        report = import_questions(quiz, io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''), fmt)
+    except UnicodeDecodeError:
+        messages.error(request, 'The file must be UTF-8 encoded')
+        return redirect('addQuestion', code=code, quiz_id=quiz.id)
+
+    if report.errors:
+        messages.error(request, 'No questions imported: %d row(s) have errors' % len(report.errors))
+        for error in report.errors[:IMPORT_ERRORS_SHOWN]:
+            messages.error(request, 'Line %d: %s' % (error.line, error.message))
+    else:
+        messages.success(request, '%d question(s) imported successfully' % report.created)
+    return redirect('addQuestion', code=code, quiz_id=quiz.id)
+
+
 def allQuizzes(request, code):
     """
     Hiển thị danh sách tất cả các bài trắc nghiệm của một khóa học.
@@ -122,25 +244,14 @@ def allQuizzes(request, code):
     """
     if is_faculty_authorised(request, code):
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code=code)
-        
-        # Lấy danh sách các bài trắc nghiệm của khóa học
-        quizzes = Quiz.objects.filter(course=course)
-        
-        # Cập nhật thông tin cho mỗi bài trắc nghiệm
-        for quiz in quizzes:
-            # Đếm số câu hỏi trong bài trắc nghiệm
-            quiz.total_questions = Question.objects.filter(quiz=quiz).count()
-            
-            # Kiểm tra xem bài trắc nghiệm đã bắt đầu hay chưa
-            if quiz.start < datetime.datetime.now():
-                quiz.started = True
-            else:
-                quiz.started = False
-            quiz.save()
+        course = course_cache.get(code)
         
+        # Lấy danh sách các bài trắc nghiệm của khóa học kèm trạng thái trong một truy vấn chỉ đọc
+        # (số câu hỏi và tổng điểm là các cột đếm của Quiz)
+        quizzes = Quiz.objects.filter(course=course).with_status()
+
         # Hiển thị trang danh sách tất cả các bài trắc nghiệm của khóa học
-        return render(request, 'quiz/allQuizzes.html', {'course': course, 'quizzes': quizzes, 'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id'])})
+        return render(request, 'quiz/allQuizzes.html', {'course': course, 'quizzes': quizzes, 'faculty': request.principal})
     else:
         # Người dùng không có quyền truy cập, chuyển hướng đến trang đăng nhập
         return redirect('std_login')
@@ -164,46 +275,20 @@ def myQuizzes(request, code):
     """
     if is_student_authorised(request, code):
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code=code)
-        
-        # Lấy danh sách các bài trắc nghiệm của khóa học
-        quizzes = Quiz.objects.filter(course=course)
+        course = course_cache.get(code)
         
         # Lấy thông tin sinh viên dựa trên session
-        student = Student.objects.get(student_id=request.session['student_id'])
-        
-        # Xác định các bài trắc nghiệm đang diễn ra và các bài trắc nghiệm đã kết thúc
-        active_quizzes = []
-        previous_quizzes = []
-        for quiz in quizzes:
-            if quiz.end < timezone.now() or quiz.studentanswer_set.filter(student=student).exists():
-                previous_quizzes.append(quiz)
-            else:
-                active_quizzes.append(quiz)
-
-        # Thêm cờ "attempted" cho từng bài trắc nghiệm
-        for quiz in quizzes:
-            quiz.attempted = quiz.studentanswer_set.filter(student=student).exists()
-
-        # Thêm thông tin tổng điểm đạt được, phần trăm, và số câu hỏi cho các bài trắc nghiệm đã kết thúc
-        for quiz in previous_quizzes:
-            student_answers = quiz.studentanswer_set.filter(student=student)
-            total_marks_obtained = sum([student_answer.question.marks if student_answer.answer == student_answer.question.answer else 0 for student_answer in student_answers])
-            quiz.total_marks_obtained = total_marks_obtained
-            quiz.total_marks = sum([question.marks for question in quiz.question_set.all()])
-            quiz.percentage = round(total_marks_obtained / quiz.total_marks * 100, 2) if quiz.total_marks != 0 else 0
-            quiz.total_questions = quiz.question_set.count()
+        student = request.principal
 
-        # Thêm số câu hỏi cho các bài trắc nghiệm đang diễn ra
-        for quiz in active_quizzes:
-            quiz.total_questions = quiz.question_set.count()
+        # Lấy các bài trắc nghiệm đang diễn ra và đã kết thúc kèm số câu hỏi, tổng điểm, điểm đạt được và phần trăm (một truy vấn)
+        dashboard = student_dashboard(student, course)
 
         # Hiển thị trang danh sách các bài trắc nghiệm của sinh viên trong khóa học
         return render(request, 'quiz/myQuizzes.html', {
             'course': course,
-            'quizzes': quizzes,
-            'active_quizzes': active_quizzes,
-            'previous_quizzes': previous_quizzes,
+            'quizzes': dashboard.active + dashboard.previous,
+            'active_quizzes': dashboard.active,
+            'previous_quizzes': dashboard.previous,
             'student': student,
         })
     else:
@@ -211,6 +296,28 @@ def myQuizzes(request, code):
         return redirect('std_login')
 
 
+def myQuizzesData(request, code):
+    """
+    Danh sách bài trắc nghiệm của sinh viên trong một khóa học dưới dạng JSON, dùng để làm mới trang mà không render lại.
+
+    Args:
+        request: Đối tượng HttpRequest đại diện cho request được gửi đến server.
+        code: Mã khóa học của khóa học được chọn.
+
+    Returns:
+        JsonResponse: {'active': [...], 'previous': [...]}, mỗi phần tử theo định dạng của dashboard_entry.
+        Nếu người dùng không có quyền truy cập, trả về mã 403.
+
+    """
+    if not is_student_authorised(request, code):
+        return JsonResponse({'active': [], 'previous': []}, status=403)
+    dashboard = student_dashboard(request.principal, course_cache.get(code))
+    return JsonResponse({
+        'active': [dashboard_entry(quiz) for quiz in dashboard.active],
+        'previous': [dashboard_entry(quiz) for quiz in dashboard.previous],
+    })
+
+
 def startQuiz(request, code, quiz_id):
     """
     Bắt đầu bài trắc nghiệm và hiển thị trang bắt đầu làm bài.
@@ -230,36 +337,68 @@ def startQuiz(request, code, quiz_id):
     """
     if is_student_authorised(request, code):
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
         
         # Lấy thông tin bài trắc nghiệm dựa trên ID bài trắc nghiệm
         quiz = Quiz.objects.get(id=quiz_id)
         
-        # Lấy danh sách các câu hỏi của bài trắc nghiệm
-        questions = Question.objects.filter(quiz=quiz)
-        
-        # Đếm số câu hỏi
-        total_questions = questions.count()
+        # Lấy đề thi (câu hỏi, tổng điểm và khối câu hỏi đã render) từ cache
+        paper = quiz_papers.get(quiz)
 
-        # Tính tổng điểm của bài trắc nghiệm
-        marks = 0
-        for question in questions:
-            marks += question.marks
-        quiz.total_marks = marks
-
-        # Hiển thị trang bắt đầu làm bài trắc nghiệm
+        # Hiển thị trang bắt đầu làm bài trắc nghiệm, kèm bản nháp autosave để khôi phục các câu đã chọn
         return render(request, 'quiz/portalStdNew.html', {
             'course': course,
             'quiz': quiz,
-            'questions': questions,
-            'total_questions': total_questions,
-            'student': Student.objects.get(student_id=request.session['student_id'])
+            'paper': paper,
+            'total_questions': paper.total_questions,
+            'total_marks': paper.total_marks,
+            'draft': draft_answers(request.principal.pk, quiz.id),
+            'student': request.principal
         })
     else:
         # Người dùng không có quyền truy cập hoặc không phải là sinh viên, chuyển hướng đến trang đăng nhập
         return redirect('std_login')
 
 
+def autosave(request, code, quiz_id):
+    """
+    Lưu nháp các câu trả lời đang làm dở (JSON).
+
+    Args:
+        request: Đối tượng HttpRequest; thân request là JSON {question_id: phương án} chỉ gồm các câu vừa thay đổi.
+        code: Mã khóa học của khóa học được chọn.
+        quiz_id: ID của bài trắc nghiệm.
+
+    Returns:
+        JsonResponse: {'saved': số thay đổi hợp lệ}. Mã 403 nếu không có quyền, 400 nếu dữ liệu không hợp lệ,
+        409 nếu bài trắc nghiệm không trong thời gian làm bài hoặc sinh viên đã nộp bài.
+
+    Notes:
+        - Thay đổi được gộp vào bộ đệm ghi sau (quiz/autosave.py) và ghi theo lô vào QuizDraft, không ghi ở mỗi request.
+    """
+    if request.method != 'POST' or not is_student_authorised(request, code):
+        return JsonResponse({'saved': 0}, status=403)
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return JsonResponse({'saved': 0}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({'saved': 0}, status=400)
+
+    quiz = get_object_or_404(Quiz.objects.only('id', 'course_id', 'start', 'end'), id=quiz_id, course_id=code)
+    if quiz.current_status() != Quiz.OPEN:
+        return JsonResponse({'saved': 0}, status=409)
+    # Bài làm đã nộp: không tạo lại bản nháp đã bị xóa khi nộp bài
+    if QuizAttempt.objects.filter(student_id=request.principal.pk, quiz_id=quiz.id).exists():
+        return JsonResponse({'saved': 0}, status=409)
+
+    # Mã câu hỏi lấy từ đề thi đã cache, không cần truy vấn
+    changes = clean_changes(data, {question.id for question in quiz_papers.get(quiz).questions})
+    if changes:
+        autosave_buffer.add(request.principal.pk, quiz.id, changes)
+    return JsonResponse({'saved': len(changes)})
+
+
 def studentAnswer(request, code, quiz_id):
     """
     Xử lý và lưu câu trả lời của sinh viên cho bài trắc nghiệm.
@@ -279,31 +418,19 @@ def studentAnswer(request, code, quiz_id):
     """
     if is_student_authorised(request, code):
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
         
         # Lấy thông tin bài trắc nghiệm dựa trên ID bài trắc nghiệm
         quiz = Quiz.objects.get(id=quiz_id)
-        
-        # Lấy danh sách các câu hỏi của bài trắc nghiệm
-        questions = Question.objects.filter(quiz=quiz)
-        
-        # Lấy thông tin sinh viên
-        student = Student.objects.get(student_id=request.session['student_id'])
 
-        # Lưu câu trả lời của sinh viên cho từng câu hỏi
-        for question in questions:
-            answer = request.POST.get(str(question.id))
-            student_answer = StudentAnswer(student=student, quiz=quiz, question=question,
-                                           answer=answer, marks=question.marks if answer == question.answer else 0)
-            # Ngăn không cho câu trả lời bị trùng lặp và ngăn không cho sinh viên làm nhiều lần
-            try:
-                student_answer.save()
-            except:
-                # Nếu có lỗi xảy ra khi lưu câu trả lời, chuyển hướng đến trang danh sách bài trắc nghiệm của sinh viên
-                redirect('myQuizzes', code=code)
-        
+        # Chấm và lưu toàn bộ bài làm trong một transaction; lần nộp lặp lại không thay đổi bài làm đã lưu
+        result = submit_answers(request.principal, quiz, request.POST)
+
         # Sau khi lưu câu trả lời thành công, chuyển hướng đến trang danh sách bài trắc nghiệm của sinh viên
-        return redirect('myQuizzes', code=code)
+        response = redirect('myQuizzes', code=code)
+        # Báo thời gian xử lý để đo tải khi nộp bài đồng loạt
+        response['Server-Timing'] = 'submit;dur=%.1f' % (result.elapsed * 1000)
+        return response
     else:
         # Người dùng không có quyền truy cập hoặc không phải là sinh viên, chuyển hướng đến trang đăng nhập
         return redirect('std_login')
@@ -328,7 +455,7 @@ def quizResult(request, code, quiz_id):
     """
     if is_student_authorised(request, code):
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
         
         # Lấy thông tin bài trắc nghiệm dựa trên ID bài trắc nghiệm
         quiz = Quiz.objects.get(id=quiz_id)
@@ -336,52 +463,27 @@ def quizResult(request, code, quiz_id):
         # Lấy danh sách câu hỏi của bài trắc nghiệm
         questions = Question.objects.filter(quiz=quiz)
         
-        try:
-            # Lấy thông tin sinh viên
-            student = Student.objects.get(
-                student_id=request.session['student_id'])
-            
-            # Lấy danh sách câu trả lời của sinh viên cho bài trắc nghiệm
-            student_answers = StudentAnswer.objects.filter(
-                student=student, quiz=quiz)
-            
-            # Tính tổng số điểm sinh viên đạt được
-            total_marks_obtained = 0
-            for student_answer in student_answers:
-                total_marks_obtained += student_answer.question.marks if student_answer.answer == student_answer.question.answer else 0
-            
-            # Cập nhật thông tin về tổng số điểm và tỷ lệ phần trăm
-            quiz.total_marks_obtained = total_marks_obtained
-            quiz.total_marks = 0
-            for question in questions:
-                quiz.total_marks += question.marks
-            quiz.percentage = (total_marks_obtained / quiz.total_marks) * 100
-            quiz.percentage = round(quiz.percentage, 2)
-        
-        except:
-            # Nếu không tìm thấy thông tin sinh viên hoặc câu trả lời của sinh viên, đặt các giá trị mặc định
+        # Lấy thông tin sinh viên
+        student = request.principal
+
+        # Lấy kết quả đã tính sẵn khi sinh viên nộp bài
+        attempt = QuizAttempt.objects.filter(student=student, quiz=quiz).first()
+        if attempt:
+            quiz.total_marks_obtained = attempt.marks_obtained
+            quiz.percentage = attempt.percentage(quiz.total_marks)
+            quiz.time_taken = round(attempt.duration.total_seconds(), 2) if attempt.duration else 0
+            quiz.submission_time = attempt.submission_time()
+        else:
+            # Nếu sinh viên chưa làm bài, đặt các giá trị mặc định
             quiz.total_marks_obtained = 0
-            quiz.total_marks = 0
             quiz.percentage = 0
+            quiz.time_taken = 0
 
         # Thêm thông tin câu trả lời của sinh viên cho từng câu hỏi
+        answers = dict(StudentAnswer.objects.filter(student=student, quiz=quiz).values_list('question_id', 'answer'))
         for question in questions:
-            student_answer = StudentAnswer.objects.get(
-                student=student, question=question)
-            question.student_answer = student_answer.answer
+            question.student_answer = answers.get(question.id)
 
-        # Lấy danh sách câu trả lời của sinh viên cho bài trắc nghiệm
-        student_answers = StudentAnswer.objects.filter(
-            student=student, quiz=quiz)
-        
-        # Cập nhật thông tin về thời gian làm bài và thời gian nộp bài
-        for student_answer in student_answers:
-            quiz.time_taken = student_answer.created_at - quiz.start
-            quiz.time_taken = quiz.time_taken.total_seconds()
-            quiz.time_taken = round(quiz.time_taken, 2)
-            quiz.submission_time = student_answer.created_at.strftime(
-                "%a, %d-%b-%y at %I:%M %p")
-        
         # Hiển thị trang kết quả của bài trắc nghiệm cho sinh viên
         return render(request, 'quiz/quizResult.html', {'course': course, 'quiz': quiz, 'questions': questions, 'student': student})
     else:
@@ -408,65 +510,33 @@ def quizSummary(request, code, quiz_id):
     """
     if is_faculty_authorised(request, code):
         # Lấy thông tin khóa học dựa trên mã khóa học
-        course = Course.objects.get(code=code)
+        course = course_cache.get(code)
         
         # Lấy thông tin bài trắc nghiệm dựa trên ID bài trắc nghiệm
         quiz = Quiz.objects.get(id=quiz_id)
 
-        # Lấy danh sách câu hỏi của bài trắc nghiệm
-        questions = Question.objects.filter(quiz=quiz)
-        
-        # Lấy thời gian hiện tại
-        time = datetime.datetime.now()
-        
-        # Lấy số lượng sinh viên đã đăng ký khóa học
-        total_students = Student.objects.filter(course=course).count()
-        
-        # Đếm số lần câu trả lời A, B, C, D cho từng câu hỏi
-        for question in questions:
-            question.A = StudentAnswer.objects.filter(
-                question=question, answer='A').count()
-            question.B = StudentAnswer.objects.filter(
-                question=question, answer='B').count()
-            question.C = StudentAnswer.objects.filter(
-                question=question, answer='C').count()
-            question.D = StudentAnswer.objects.filter(
-                question=question, answer='D').count()
-        
-        # Lấy danh sách sinh viên đã làm bài và điểm số của họ
-        students = Student.objects.filter(course=course)
-        for student in students:
-            student_answers = StudentAnswer.objects.filter(
-                student=student, quiz=quiz)
-            total_marks_obtained = 0
-            for student_answer in student_answers:
-                total_marks_obtained += student_answer.question.marks if student_answer.answer == student_answer.question.answer else 0
-            student.total_marks_obtained = total_marks_obtained
-
         if request.method == 'POST':
             # Cập nhật trạng thái công bố cho bài trắc nghiệm và lưu vào cơ sở dữ liệu
             quiz.publish_status = True
             quiz.save()
             return redirect('quizSummary', code=code, quiz_id=quiz.id)
 
-        # Kiểm tra xem sinh viên đã làm bài trắc nghiệm hay chưa
-        for student in students:
-            if StudentAnswer.objects.filter(student=student, quiz=quiz).count() > 0:
-                student.attempted = True
-            else:
-                student.attempted = False
-        
-        # Lấy thời gian nộp bài và định dạng thời gian
-        for student in students:
-            student_answers = StudentAnswer.objects.filter(
-                student=student, quiz=quiz)
-            for student_answer in student_answers:
-                student.submission_time = student_answer.created_at.strftime(
-                    "%a, %d-%b-%y at %I:%M %p")
+        # Lấy thời gian hiện tại
+        time = datetime.datetime.now()
+
+        # Lấy số lượng sinh viên đã đăng ký khóa học
+        total_students = course.enrolled_count
+
+        # Tổng hợp biểu đồ phương án, điểm, trạng thái làm bài và thời gian nộp của sinh viên (số truy vấn cố định)
+        summary = quiz_summary(quiz, course)
+
+        # Phân tích câu hỏi (độ khó, độ phân biệt, point-biserial, phương án nhiễu), được cache đến khi có bài nộp mới
+        analysis = analytics.item_analysis.get(quiz, summary.questions)
 
         # Tạo context chứa các thông tin cần thiết để hiển thị trang tổng kết cho giảng viên
-        context = {'course': course, 'quiz': quiz, 'questions': questions, 'time': time, 'total_students': total_students,
-                   'students': students, 'faculty': Faculty.objects.get(faculty_id=request.session['faculty_id'])}
+        context = {'course': course, 'quiz': quiz, 'questions': summary.questions, 'time': time, 'total_students': total_students,
+                   'students': summary.students, 'summary': summary, 'analysis': analysis, 'regrade': last_report(quiz.id),
+                   'analysis_available': analytics.is_available(), 'faculty': request.principal}
         return render(request, 'quiz/quizSummaryFaculty.html', context)
     else:
         # Người dùng không có quyền truy cập hoặc không phải là giảng viên, chuyển hướng đến trang đăng nhập